@@ -0,0 +1,241 @@
+# laticinios_armazem/agendador.py
+
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import models
+import relatorios
+
+logger = logging.getLogger(__name__)
+
+# Nome da extensão registrada em app.extensions por init_app().
+EXTENSAO_FLASK = 'laticinios_agendador'
+
+# Intervalo padrão (em segundos) de cada tarefa de manutenção.
+INTERVALOS_PADRAO: Dict[str, float] = {
+    'resumos': 60 * 60,
+    'alertas_validade': 5 * 60,
+    'manutencao_banco': 6 * 60 * 60,
+}
+
+# Páginas livres devolvidas ao sistema de arquivos por execução de incremental_vacuum.
+PAGINAS_VACUUM_INCREMENTAL = 1000
+
+# Maior espera entre duas verificações do laço do agendador, em segundos.
+ESPERA_MAXIMA = 1.0
+
+
+class Tarefa:
+    """Uma tarefa periódica do agendador, com as medições de suas execuções."""
+
+    def __init__(self, nome: str, funcao: Callable[[], Any], intervalo: float,
+                 atraso_inicial: Optional[float] = None):
+        self.nome = nome
+        self.funcao = funcao
+        self.intervalo = intervalo
+        self.proxima_execucao = time.monotonic() + (intervalo if atraso_inicial is None else atraso_inicial)
+        self.execucoes = 0
+        self.falhas = 0
+        self.duracao_total = 0.0
+        self.duracao_maxima = 0.0
+        self.ultima_duracao: Optional[float] = None
+        self.ultima_execucao: Optional[str] = None
+        self.ultimo_erro: Optional[str] = None
+
+    def executar(self) -> bool:
+        """Executa a tarefa, registrando duração e erro. Retorna True se não houve exceção."""
+        inicio = time.perf_counter()
+        erro = None
+        try:
+            self.funcao()
+        except Exception as e:
+            erro = f"{type(e).__name__}: {e}"
+            logger.exception("Falha na tarefa agendada '%s'.", self.nome)
+        duracao = time.perf_counter() - inicio
+
+        self.execucoes += 1
+        self.duracao_total += duracao
+        self.duracao_maxima = max(self.duracao_maxima, duracao)
+        self.ultima_duracao = duracao
+        self.ultima_execucao = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if erro:
+            self.falhas += 1
+            self.ultimo_erro = erro
+        logger.info("Tarefa agendada '%s' concluída em %.1f ms.", self.nome, duracao * 1000)
+        return erro is None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte as medições da tarefa para um dicionário (durações em segundos)."""
+        return {
+            'intervalo': self.intervalo,
+            'execucoes': self.execucoes,
+            'falhas': self.falhas,
+            'duracao_media': (self.duracao_total / self.execucoes) if self.execucoes else None,
+            'duracao_maxima': self.duracao_maxima,
+            'ultima_duracao': self.ultima_duracao,
+            'ultima_execucao': self.ultima_execucao,
+            'ultimo_erro': self.ultimo_erro,
+        }
+
+
+class Agendador:
+    """Executa tarefas periódicas em uma thread própria, fora dos requests.
+
+    As tarefas rodam uma de cada vez, na ordem em que vencem. Cada execução
+    usa suas próprias conexões do pool, como qualquer script fora do Flask.
+    """
+
+    def __init__(self):
+        self._tarefas: Dict[str, Tarefa] = {}
+        self._lock = threading.Lock()
+        # Serializa as execuções (laço e executar_agora) sem bloquear estatisticas().
+        self._lock_execucao = threading.Lock()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def em_execucao(self) -> bool:
+        """Indica se a thread do agendador está ativa."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def adicionar(self, nome: str, funcao: Callable[[], Any], intervalo: float,
+                  atraso_inicial: Optional[float] = None) -> Tarefa:
+        """Registra (ou substitui) uma tarefa executada a cada 'intervalo' segundos."""
+        tarefa = Tarefa(nome, funcao, intervalo, atraso_inicial)
+        with self._lock:
+            self._tarefas[nome] = tarefa
+        return tarefa
+
+    def executar_pendentes(self, agora: Optional[float] = None) -> List[str]:
+        """Executa as tarefas cujo horário já chegou e retorna seus nomes."""
+        agora = time.monotonic() if agora is None else agora
+        with self._lock:
+            pendentes = sorted((t for t in self._tarefas.values() if t.proxima_execucao <= agora),
+                               key=lambda t: t.proxima_execucao)
+        for tarefa in pendentes:
+            with self._lock_execucao:
+                tarefa.executar()
+                tarefa.proxima_execucao = time.monotonic() + tarefa.intervalo
+        return [t.nome for t in pendentes]
+
+    def executar_agora(self, nome: str) -> bool:
+        """Executa imediatamente a tarefa informada, fora do horário.
+
+        Raises:
+            KeyError: Se a tarefa não estiver registrada.
+        """
+        with self._lock:
+            tarefa = self._tarefas[nome]
+        with self._lock_execucao:
+            return tarefa.executar()
+
+    def iniciar(self) -> None:
+        """Inicia a thread do agendador (sem efeito se já estiver ativa)."""
+        with self._lock:
+            if self.em_execucao:
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._laco, name='agendador-laticinios', daemon=True)
+            self._thread.start()
+
+    def parar(self, timeout: float = 5.0) -> None:
+        """Sinaliza o fim do laço e aguarda a thread terminar a tarefa em andamento."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _laco(self) -> None:
+        while not self._parar.is_set():
+            self.executar_pendentes()
+            with self._lock:
+                proxima = min((t.proxima_execucao for t in self._tarefas.values()), default=None)
+            espera = ESPERA_MAXIMA if proxima is None else proxima - time.monotonic()
+            self._parar.wait(min(max(espera, 0.0), ESPERA_MAXIMA))
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Retorna o estado do agendador e as medições de cada tarefa."""
+        with self._lock:
+            return {
+                'em_execucao': self.em_execucao,
+                'tarefas': {nome: tarefa.to_dict() for nome, tarefa in self._tarefas.items()},
+            }
+
+
+def atualizar_resumos() -> None:
+    """Confere os resumos do estoque e a consolidação de vendas de ontem e de hoje.
+
+    Ambos são mantidos por triggers; uma divergência (ex.: edição manual do
+    banco com os triggers desativados) é registrada e corrigida aqui. Sem
+    divergência nada é gravado, então a tarefa não disputa o bloqueio de escrita.
+    """
+    divergencias = relatorios.verificar_resumo_estoque()
+    if divergencias:
+        logger.warning("Resumo do estoque divergente em %d linha(s); reconstruindo.", len(divergencias))
+        relatorios.reconstruir_resumo_estoque()
+    hoje = date.today()
+    inicio, fim = (hoje - timedelta(days=1)).isoformat(), hoje.isoformat()
+    divergencias = relatorios.verificar_vendas_diarias(inicio, fim)
+    if divergencias:
+        logger.warning("Consolidação de vendas divergente em %d linha(s); reconstruindo.", len(divergencias))
+        relatorios.reconstruir_vendas_diarias(inicio, fim)
+
+
+def aquecer_alertas_validade(app=None) -> None:
+    """Mantém o cache dos alertas de validade pronto para o próximo request.
+
+    A cada execução só a marca do cache é lida (uma consulta); os alertas são
+    recalculados apenas quando ela muda: virada do dia, escrita no estoque ou
+    nas áreas, ou outra configuração das janelas. As janelas vêm de app.config,
+    por isso a tarefa roda dentro do contexto do app informado.
+    """
+    if app is None:
+        relatorios.aquecer_alertas_validade()
+        return
+    with app.app_context():
+        relatorios.aquecer_alertas_validade()
+
+
+def manutencao_banco() -> None:
+    """Atualiza as estatísticas do planejador (PRAGMA optimize) e devolve páginas livres ao disco.
+
+    O incremental_vacuum só tem efeito em bancos com auto_vacuum=INCREMENTAL
+    (ver PRAGMAS_PERSISTENTES em conexao.py).
+    """
+    conn = models.get_db_connection()
+    try:
+        conn.execute('PRAGMA optimize')
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            # Cada passo da instrução libera uma página: fetchall() executa todos.
+            conn.execute(f'PRAGMA incremental_vacuum({PAGINAS_VACUUM_INCREMENTAL})').fetchall()
+    finally:
+        conn.close()
+
+
+# Agendador do processo, configurado por init_app().
+agendador = Agendador()
+
+
+def init_app(app) -> None:
+    """Registra as tarefas de manutenção e inicia o agendador no primeiro request.
+
+    Configurações lidas de app.config:
+        AGENDADOR_ATIVO: inicia a thread do agendador (padrão True; nunca em modo de teste).
+        AGENDADOR_INTERVALOS: intervalos em segundos por tarefa (ver INTERVALOS_PADRAO).
+    """
+    app.config.setdefault('AGENDADOR_ATIVO', True)
+    intervalos = {**INTERVALOS_PADRAO, **app.config.get('AGENDADOR_INTERVALOS', {})}
+    app.config['AGENDADOR_INTERVALOS'] = intervalos
+    agendador.adicionar('resumos', atualizar_resumos, intervalos['resumos'])
+    agendador.adicionar('alertas_validade', lambda: aquecer_alertas_validade(app), intervalos['alertas_validade'],
+                        atraso_inicial=0)
+    agendador.adicionar('manutencao_banco', manutencao_banco, intervalos['manutencao_banco'])
+    app.extensions[EXTENSAO_FLASK] = agendador
+
+    @app.before_request
+    def iniciar_agendador():
+        if app.config['AGENDADOR_ATIVO'] and not app.testing and not agendador.em_execucao:
+            agendador.iniciar()
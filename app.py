@@ -1,12 +1,30 @@
 # laticinios_armazem/app.py
 
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import (
+    Flask, render_template, request, redirect, url_for, flash, session, jsonify, g,
+    Response, stream_with_context
+)
 from datetime import datetime, timedelta, date
+from typing import Optional
+from werkzeug.exceptions import RequestEntityTooLarge
 import functools
+import io
 import logging
+import os
+import secrets
+import click
+import agendador
+import conexao
+import consultas_lentas
+import importacao
+import instrumentacao
+import metricas
+import perfilador
+import relatorios
 from models import (
     Usuario, ProdutoLacteo, AreaArmazem, Venda, ProdutoCatalogo,
-    popular_dados_iniciais, init_db 
+    popular_dados_iniciais, init_db, FILTROS_VENDAS, VENDAS_POR_PAGINA,
+    estatisticas_caches, converter_data_iso
 )
 
 # Inicializa a aplicação Flask
@@ -14,6 +32,58 @@ app = Flask(__name__)
 # Define uma chave secreta para a sessão. Em produção, use uma chave mais segura e gerada aleatoriamente.
 app.secret_key = 'chave_secreta_para_sessoes_flask_laticinios_minerva'
 
+# Pool de conexões SQLite: cada request usa uma única conexão, devolvida ao pool no teardown.
+app.config['DB_POOL_TAMANHO'] = 5
+app.config['DB_POOL_TIMEOUT'] = 30.0
+# Perfil de armazenamento do SQLite: 'desempenho' (WAL + synchronous=NORMAL) ou
+# 'duravel' (WAL + synchronous=FULL). Ver PERFIS_ARMAZENAMENTO em conexao.py.
+app.config['DB_PERFIL_ARMAZENAMENTO'] = 'desempenho'
+conexao.init_app(app)
+
+# Tempo (em segundos) que uma autenticação válida fica em cache no processo. 0 desativa o cache.
+# Lido a cada request. O cache é de cada processo, mas é validado pela geração da tabela
+# usuarios (migracoes/0008_geracao_usuarios.sql): uma senha ou função alterada vale
+# imediatamente em todos os processos.
+app.config['CACHE_USUARIO_TTL'] = 0
+
+# Janela (em dias) dos alertas de validade por tipo de armazenamento, por exemplo
+# {'refrigerado': 7, 'congelado': 30, 'seco': 15}. Tipos ausentes usam 7 dias.
+# Lido a cada cálculo dos alertas (ver relatorios.janelas_alerta_validade); chaves que não
+# são tipos de armazenamento são ignoradas, com um aviso no log.
+app.config['ALERTA_VALIDADE_DIAS_POR_TIPO'] = {}
+
+# Tarefas de manutenção em segundo plano (conferência dos resumos, cache dos alertas de
+# validade, PRAGMA optimize), iniciadas no primeiro request. Intervalos em segundos; ver agendador.INTERVALOS_PADRAO.
+app.config['AGENDADOR_ATIVO'] = True
+agendador.init_app(app)
+
+# Tamanho máximo do corpo de um request (uploads de CSV em /admin/estoque/importar); acima
+# dele o Flask responde 413. O número de linhas é limitado por importacao.LINHAS_IMPORTACAO_MAX.
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+
+# Contagem e tempo das consultas SQL de cada request (cabeçalho Server-Timing e log em DEBUG).
+# Pode ser ligada e desligada em execução por POST /api/monitoramento/instrumentacao.
+app.config['INSTRUMENTACAO_SQL'] = False
+instrumentacao.init_app(app)
+
+# Métricas no formato do Prometheus em /metrics: requests por rota, vendas, recebimentos,
+# bloqueios do SQLite, uso do pool e caches. Sem METRICAS_TOKEN, a coleta só é aceita
+# de conexões locais; defina o token para exigir 'Authorization: Bearer <token>' ou
+# METRICAS_PUBLICO para liberar a coleta sem autenticação.
+app.config['METRICAS_ATIVAS'] = True
+app.config['METRICAS_TOKEN'] = os.environ.get('LATICINIOS_METRICAS_TOKEN')
+app.config['METRICAS_PUBLICO'] = False
+metricas.init_app(app)
+metricas.monitorar_pool(conexao.estatisticas_pool)
+metricas.monitorar_caches(estatisticas_caches)
+
+# Log de consultas lentas: instruções acima do limite (em ms) são registradas com os
+# parâmetros redigidos, o método de origem e o EXPLAIN QUERY PLAN, por uma fila de log
+# que não bloqueia o request. None desativa; sem arquivo, o log vai para stderr.
+app.config['CONSULTA_LENTA_LIMITE_MS'] = None
+app.config['CONSULTA_LENTA_ARQUIVO'] = None
+consultas_lentas.init_app(app)
+
 # Configura o logging básico para a aplicação, útil para depuração.
 logging.basicConfig(level=logging.DEBUG)
 
@@ -26,13 +96,21 @@ def to_date_filter(value):
     if isinstance(value, date):
         return value
     try:
-        return datetime.strptime(value, '%Y-%m-%d').date()
+        return converter_data_iso(value)
     except (ValueError, TypeError) as e:
         logging.error(f"Erro ao converter data: {value}, erro: {e}")
         return value
 
-# Registra o filtro personalizado no ambiente Jinja2 da aplicação.
+def dateformat_filter(value, formato='%d/%m/%Y'):
+    """Formata uma data (objeto date ou string AAAA-MM-DD) para exibição, por padrão DD/MM/AAAA."""
+    data = to_date_filter(value)
+    if isinstance(data, date):
+        return data.strftime(formato)
+    return value
+
+# Registra os filtros personalizados no ambiente Jinja2 da aplicação.
 app.jinja_env.filters['to_date'] = to_date_filter
+app.jinja_env.filters['dateformat'] = dateformat_filter
 
 # Inicializa o banco de dados (cria tabelas se não existirem).
 init_db()
@@ -41,6 +119,22 @@ init_db()
 popular_dados_iniciais()
 
 # --- Autenticação e Controle de Acesso ---
+def obter_usuario_logado() -> Optional[Usuario]:
+    """Retorna o usuário da sessão atual, consultando o banco no máximo uma vez por request.
+
+    O resultado fica em flask.g durante o request (compartilhado entre
+    login_necessario e o context_processor) e, se CACHE_USUARIO_TTL > 0, no
+    cache de autenticação do processo, indexado pelo id da sessão, evitando a
+    verificação da senha em requests seguintes.
+    """
+    if '_usuario_logado' not in g:
+        usuario = None
+        if 'username' in session and 'password' in session:
+            usuario = Usuario.autenticar(session['username'], session['password'],
+                                         app.config['CACHE_USUARIO_TTL'], session.get('id_sessao'))
+        g._usuario_logado = usuario
+    return g._usuario_logado
+
 def login_necessario(permissao_requerida: str = None):
     """Decorador para proteger rotas que exigem login e, opcionalmente, uma permissão específica."""
     def decorator(view_func):
@@ -50,16 +144,12 @@ def login_necessario(permissao_requerida: str = None):
                 flash("Por favor, faça login para acessar esta página.", "warning")
                 return redirect(url_for('login', next=request.url))
             
-            usuario_logado = Usuario.verificar_senha(session['username'], session.get('password'))
+            usuario_logado = obter_usuario_logado()
             if not usuario_logado:
                 session.clear()
                 flash("Sua sessão é inválida ou expirou. Por favor, faça login novamente.", "danger")
                 return redirect(url_for('login'))
 
-            # Armazena o objeto usuário na sessão para uso pelo context_processor
-            # session['usuario_obj'] = usuario_logado # Não é ideal armazenar objetos complexos diretamente na sessão
-                                                # O context_processor deve buscar o objeto a cada request se necessário.
-
             if permissao_requerida and not usuario_logado.tem_permissao(permissao_requerida):
                 flash("Você não tem permissão para realizar esta ação ou acessar esta página.", "danger")
                 return redirect(request.referrer or url_for('pagina_inicial_armazem')) 
@@ -68,6 +158,18 @@ def login_necessario(permissao_requerida: str = None):
         return wrapper
     return decorator
 
+def requisicao_de_gerente(environ) -> bool:
+    """Indica se o request WSGI vem de um gerente logado (lê a sessão fora do dispatch do Flask)."""
+    with app.request_context(environ):
+        usuario = obter_usuario_logado()
+        return bool(usuario and usuario.tem_permissao('gerente'))
+
+# Perfilador (cProfile) de uma amostra dos requests, gravado por endpoint em PERFILADOR_DIRETORIO.
+# Um gerente pode pedir o perfil de um request específico com o cabeçalho X-Perfilar: 1.
+# Os resultados são listados em /admin/perfis. Configuração (PERFILADOR_*) e valores
+# padrão em perfilador.init_app.
+perfilador.init_app(app, requisicao_de_gerente)
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """Rota para login de usuários."""
@@ -81,6 +183,7 @@ def login():
             session['user_funcao'] = usuario.funcao # Mantido para referência rápida, mas o objeto é rei
             session['user_nome'] = usuario.nome   # Mantido para referência rápida
             session['password'] = senha # ATENÇÃO: Prática insegura para produção.
+            session['id_sessao'] = secrets.token_hex(16)  # Chave do cache de autenticação
             app.logger.debug(f"Sessão criada para usuário: {usuario.username}")
             flash(f"Login bem-sucedido! Bem-vindo(a), {usuario.nome}.", "success")
             
@@ -207,38 +310,9 @@ def vender_produto_da_area(id_area):
             flash("A quantidade para venda deve ser positiva.", "warning")
             return redirect(url_for('detalhes_da_area', id_area=id_area))
 
-        produto_para_venda = ProdutoLacteo.buscar_instancia_por_id(id_instancia_venda)
-
-        if not produto_para_venda:
-            flash(f"Produto com ID de instância '{id_instancia_venda}' não encontrado.", "danger")
-            return redirect(url_for('detalhes_da_area', id_area=id_area))
-        
-        produto_na_area_correta = any(p.id == id_instancia_venda for p in area.listar_produtos())
-        if not produto_na_area_correta:
-            flash(f"Produto com ID de instância '{id_instancia_venda}' não pertence à área '{area.nome}'.", "danger")
-            return redirect(url_for('detalhes_da_area', id_area=id_area))
-
-        if produto_para_venda.quantidade < quantidade_venda:
-            flash(f"Quantidade insuficiente em estoque para '{produto_para_venda.nome}' (Lote: {produto_para_venda.lote}). Disponível: {produto_para_venda.quantidade}", "warning")
-            return redirect(url_for('detalhes_da_area', id_area=id_area))
-
-        sucesso_remocao = area.remover_produto(produto_para_venda.id, quantidade_venda)
-
-        if sucesso_remocao:
-            nova_venda = Venda(
-                id_catalogo_produto=produto_para_venda.id_catalogo_produto,
-                nome=produto_para_venda.nome,
-                lote=produto_para_venda.lote,
-                data_validade_produto=produto_para_venda.data_validade.strftime('%Y-%m-%d'),
-                quantidade_vendida=quantidade_venda,
-                destino=destino_venda.strip(),
-                area_origem_id=id_area,
-                usuario_responsavel=session['username']
-            )
-            Venda.registrar(nova_venda)
-            flash(f"Venda de {quantidade_venda} unidade(s) de '{produto_para_venda.nome}' (Lote: {produto_para_venda.lote}) registrada com sucesso!", "success")
-        else:
-            flash(f"Falha ao tentar vender {quantidade_venda} unidade(s) de '{produto_para_venda.nome}'. Verifique o estoque ou ID do produto.", "danger")
+        sucesso, mensagem = Venda.vender(id_area, id_instancia_venda, quantidade_venda,
+                                         destino_venda.strip(), session['username'])
+        flash(mensagem, "success" if sucesso else "danger")
     
     except ValueError: 
         flash("Quantidade para venda inválida ou ID do produto inválido. Devem ser números.", "danger")
@@ -248,6 +322,55 @@ def vender_produto_da_area(id_area):
 
     return redirect(url_for('detalhes_da_area', id_area=id_area))
 
+@app.route('/api/vendas/lote', methods=['POST'])
+@login_necessario(permissao_requerida='registrar_venda')
+def api_vender_lote():
+    """Endpoint da API para registrar uma venda com várias linhas (ex.: carga de um caminhão).
+
+    Corpo JSON: {"destino": str, "itens": [{"id_instancia": int, "quantidade": int, "id_area": str (opcional)}]}.
+    A venda é atômica: ou todas as linhas são registradas, ou nenhuma.
+    """
+    dados = request.get_json(silent=True)
+    if not isinstance(dados, dict) or not isinstance(dados.get('itens'), list) or not dados['itens']:
+        return jsonify({"erro": "Envie um JSON com 'destino' e uma lista não vazia de 'itens'."}), 400
+    destino = str(dados.get('destino') or '').strip()
+    if not destino:
+        return jsonify({"erro": "O destino da venda é obrigatório."}), 400
+    if not all(isinstance(item, dict) for item in dados['itens']):
+        return jsonify({"erro": "Cada item deve ser um objeto com 'id_instancia' e 'quantidade'."}), 400
+
+    sucesso, resultados = Venda.vender_lote(dados['itens'], destino, session['username'])
+    if not sucesso:
+        app.logger.info(f"Venda em lote para '{destino}' recusada: {sum(not r['sucesso'] for r in resultados)} linha(s) com erro.")
+    return jsonify({"sucesso": sucesso, "resultados": resultados}), (200 if sucesso else 409)
+
+@app.route('/api/vendas/fefo', methods=['POST'])
+@login_necessario(permissao_requerida='registrar_venda')
+def api_vender_fefo():
+    """Endpoint da API para vender um produto do catálogo com alocação automática de lotes (FEFO).
+
+    Corpo JSON: {"id_catalogo_produto": str, "quantidade": int, "destino": str,
+                 "id_area": str (opcional), "tipo_armazenamento": str (opcional)}.
+    """
+    dados = request.get_json(silent=True)
+    if not isinstance(dados, dict):
+        return jsonify({"erro": "Envie um JSON com 'id_catalogo_produto', 'quantidade' e 'destino'."}), 400
+    id_catalogo_produto = dados.get('id_catalogo_produto')
+    destino = str(dados.get('destino') or '').strip()
+    try:
+        quantidade = int(dados.get('quantidade'))
+    except (TypeError, ValueError):
+        return jsonify({"erro": "A quantidade deve ser um número."}), 400
+    if not id_catalogo_produto or not destino:
+        return jsonify({"erro": "Produto do catálogo e destino são obrigatórios."}), 400
+
+    sucesso, mensagem, vendas = Venda.vender_fefo(
+        id_catalogo_produto, quantidade, destino, session['username'],
+        id_area=dados.get('id_area'), tipo_armazenamento=dados.get('tipo_armazenamento')
+    )
+    return jsonify({"sucesso": sucesso, "mensagem": mensagem,
+                    "vendas": [v.to_dict() for v in vendas]}), (200 if sucesso else 409)
+
 # --- Rotas de Gerenciamento (CRUD) ---
 
 @app.route('/admin/areas')
@@ -377,6 +500,13 @@ def excluir_produto_catalogo(id_produto_catalogo):
             flash(mensagem, "danger")
     return redirect(url_for('listar_produtos_catalogo_admin'))
 
+def mensagem_instancia_fora_da_area(area: AreaArmazem, id_instancia_produto: int) -> str:
+    """Mensagem de erro para uma instância que não foi encontrada na área informada."""
+    # Caminho de erro (raro): uma consulta extra distingue instância inexistente de instância de outra área.
+    if ProdutoLacteo.buscar_instancia_por_id(id_instancia_produto) is None:
+        return f"Instância de produto com ID '{id_instancia_produto}' não encontrada."
+    return f"Produto com ID de instância '{id_instancia_produto}' não pertence à área '{area.nome}'."
+
 @app.route('/admin/area/<id_area>/produto/<int:id_instancia_produto>/editar', methods=['GET', 'POST'])
 @login_necessario(permissao_requerida='gerenciar_produtos_em_areas')
 def editar_produto_em_area(id_area, id_instancia_produto):
@@ -386,14 +516,9 @@ def editar_produto_em_area(id_area, id_instancia_produto):
         flash(f"Área com ID '{id_area}' não encontrada.", "danger")
         return redirect(url_for('pagina_inicial_armazem'))
 
-    produto_instancia = ProdutoLacteo.buscar_instancia_por_id(id_instancia_produto)
+    produto_instancia = ProdutoLacteo.buscar_instancia_na_area(id_area, id_instancia_produto)
     if not produto_instancia:
-        flash(f"Instância de produto com ID '{id_instancia_produto}' não encontrada.", "danger")
-        return redirect(url_for('detalhes_da_area', id_area=id_area))
-    
-    produto_encontrado_na_area = any(p.id == id_instancia_produto for p in area.listar_produtos())
-    if not produto_encontrado_na_area:
-        flash(f"Produto com ID de instância '{id_instancia_produto}' não pertence à área '{area.nome}'.", "danger")
+        flash(mensagem_instancia_fora_da_area(area, id_instancia_produto), "danger")
         return redirect(url_for('detalhes_da_area', id_area=id_area))
 
     if request.method == 'POST':
@@ -433,63 +558,93 @@ def excluir_produto_de_area(id_area, id_instancia_produto):
         flash(f"Área com ID '{id_area}' não encontrada.", "danger")
         return redirect(url_for('pagina_inicial_armazem'))
 
-    produto_instancia = ProdutoLacteo.buscar_instancia_por_id(id_instancia_produto)
+    produto_instancia = ProdutoLacteo.buscar_instancia_na_area(id_area, id_instancia_produto)
     if not produto_instancia:
-        flash(f"Instância de produto com ID '{id_instancia_produto}' não encontrada.", "danger")
+        flash(mensagem_instancia_fora_da_area(area, id_instancia_produto), "danger")
+    elif produto_instancia.deletar_instancia():
+        flash(f"Produto '{produto_instancia.nome}' (Lote: {produto_instancia.lote}) excluído com sucesso da área {area.nome}!", "success")
     else:
-        produto_na_area_correta = any(p.id == id_instancia_produto for p in area.listar_produtos())
-        if not produto_na_area_correta:
-            flash(f"Produto com ID de instância '{id_instancia_produto}' não pertence à área '{area.nome}'.", "danger")
-        elif produto_instancia.deletar_instancia():
-            flash(f"Produto '{produto_instancia.nome}' (Lote: {produto_instancia.lote}) excluído com sucesso da área {area.nome}!", "success")
-        else:
-            flash(f"Erro ao excluir o produto '{produto_instancia.nome}' da área.", "danger")
+        flash(f"Erro ao excluir o produto '{produto_instancia.nome}' da área.", "danger")
             
     return redirect(url_for('detalhes_da_area', id_area=id_area))
 
+@app.errorhandler(RequestEntityTooLarge)
+def requisicao_muito_grande(erro):
+    """Responde 413 a uploads acima de MAX_CONTENT_LENGTH, com a mensagem na própria página de importação."""
+    if request.endpoint != 'importar_estoque':
+        return erro
+    limite_mb = app.config['MAX_CONTENT_LENGTH'] / (1024 * 1024)
+    flash(f"Arquivo maior que o limite de {limite_mb:g} MB. Divida o recebimento em arquivos menores.", "danger")
+    return render_template('admin_importar_estoque.html', relatorio=None,
+                           colunas=importacao.COLUNAS_IMPORTACAO_ESTOQUE), 413
+
+@app.route('/admin/estoque/importar', methods=['GET', 'POST'])
+@login_necessario(permissao_requerida='gerenciar_produtos_em_areas')
+def importar_estoque():
+    """Rota para importar um recebimento de estoque (vários lotes) a partir de um arquivo CSV."""
+    relatorio = None
+    if request.method == 'POST':
+        arquivo = request.files.get('arquivo')
+        if not arquivo or not arquivo.filename:
+            flash("Selecione um arquivo CSV para importar.", "warning")
+        else:
+            # utf-8-sig aceita arquivos exportados por planilhas, que começam com BOM.
+            texto = io.TextIOWrapper(arquivo.stream, encoding='utf-8-sig', newline='')
+            sucesso, relatorio = importacao.importar_estoque_csv(texto)
+            if sucesso:
+                flash(f"Importação concluída: {relatorio['aplicadas']} lote(s) registrados.", "success")
+            else:
+                flash(f"Importação não realizada: {relatorio['total_erros']} erro(s) encontrados. Nenhum lote foi gravado.", "danger")
+    return render_template('admin_importar_estoque.html', relatorio=relatorio,
+                           colunas=importacao.COLUNAS_IMPORTACAO_ESTOQUE)
+
+@app.route('/admin/perfis', methods=['GET'])
+@login_necessario(permissao_requerida='gerente')
+def listar_perfis_admin():
+    """Rota que lista as funções mais custosas de cada endpoint, a partir dos perfis gravados."""
+    ordenar_por = request.args.get('ordenar', 'tottime')
+    if ordenar_por not in perfilador.ORDENACOES:
+        ordenar_por = 'tottime'
+    perfis = perfilador.funcoes_mais_lentas(app.config['PERFILADOR_DIRETORIO'], ordenar_por=ordenar_por)
+    return render_template('admin_perfis.html', perfis=perfis, ordenar_por=ordenar_por,
+                           ordenacoes=perfilador.ORDENACOES,
+                           ativo=app.config['PERFILADOR_ATIVO'],
+                           amostragem=app.config['PERFILADOR_AMOSTRAGEM'],
+                           cabecalho=perfilador.CABECALHO_PERFILAR)
+
+def filtros_vendas_da_requisicao() -> dict:
+    """Extrai da query string os filtros aceitos por Venda.listar_pagina."""
+    chaves = FILTROS_VENDAS + ('data_inicio', 'data_fim')
+    return {chave: request.args[chave] for chave in chaves if request.args.get(chave)}
+
 @app.route('/relatorios')
 @login_necessario(permissao_requerida='gerente')
 def pagina_relatorios():
     """Rota para a página de relatórios."""
-    estoque_total = {}
-    for area_obj in AreaArmazem.listar_todas():
-        for prod_instancia in area_obj.listar_produtos():
-            chave_produto = prod_instancia.id_catalogo_produto 
-            if chave_produto not in estoque_total:
-                estoque_total[chave_produto] = {"nome": prod_instancia.nome, "quantidade_total": 0}
-            estoque_total[chave_produto]["quantidade_total"] += prod_instancia.quantidade
+    estoque_total = relatorios.estoque_total_por_produto()
     
-    vendas = sorted([v.to_dict() for v in Venda.listar_todas()], key=lambda x: datetime.strptime(x['data_hora'], '%d/%m/%Y %H:%M:%S'), reverse=True)
-
-    dias_alerta_antecedencia = 7 
-    data_hoje_obj = date.today()
-    limite_alerta = data_hoje_obj + timedelta(days=dias_alerta_antecedencia)
-    produtos_alerta_validade = []
-
-    for area_obj in AreaArmazem.listar_todas():
-        for produto_obj in area_obj.listar_produtos(): 
-            status_validade = ""
-            dias_para_vencer_calc = (produto_obj.data_validade - data_hoje_obj).days
-
-            if produto_obj.data_validade < data_hoje_obj:
-                status_validade = "VENCIDO"
-            elif produto_obj.data_validade <= limite_alerta:
-                status_validade = "PROXIMO_VENCIMENTO"
-            
-            if status_validade:
-                produtos_alerta_validade.append({
-                    "area_id": area_obj.id_area,
-                    "nome_area": area_obj.nome,
-                    "produto": produto_obj.to_dict(), 
-                    "status_validade": status_validade,
-                    "dias_para_vencer": dias_para_vencer_calc
-                })
-    
-    produtos_alerta_validade.sort(key=lambda x: (x["status_validade"] != "VENCIDO", x["dias_para_vencer"]))
+    cursor_vendas = request.args.get('cursor')
+    filtros_vendas = filtros_vendas_da_requisicao()
+    try:
+        pagina_vendas, proximo_cursor_vendas = Venda.listar_pagina(cursor_vendas, filtros=filtros_vendas)
+    except ValueError as e:
+        flash(f"Não foi possível carregar o histórico de vendas: {e}", "warning")
+        cursor_vendas = None
+        filtros_vendas = {}
+        pagina_vendas, proximo_cursor_vendas = Venda.listar_pagina()
+    vendas = [v.to_dict() for v in pagina_vendas]
+
+    janelas = relatorios.janelas_alerta_validade().values()
+    dias_alerta_antecedencia = (f'{min(janelas)}' if min(janelas) == max(janelas)
+                                else f'{min(janelas)} a {max(janelas)}')
+    produtos_alerta_validade = relatorios.alertas_validade_atuais()
 
     return render_template('relatorios.html', 
                          estoque_total=estoque_total, 
                          vendas_registradas=vendas, 
+                         cursor_vendas=cursor_vendas,
+                         proximo_cursor_vendas=proximo_cursor_vendas,
+                         filtros_vendas=filtros_vendas,
                          produtos_alerta_validade=produtos_alerta_validade,
                          dias_alerta=dias_alerta_antecedencia)
 
@@ -502,23 +657,118 @@ def api_produtos_por_area(id_area):
         return jsonify({"erro": "Área não encontrada"}), 404
     return jsonify(area.to_dict())
 
+@app.route('/api/vendas', methods=['GET'])
+@login_necessario(permissao_requerida='gerente')
+def api_vendas():
+    """Endpoint da API para o histórico de vendas paginado (parâmetros: cursor, limite e filtros)."""
+    try:
+        limite = int(request.args.get('limite', VENDAS_POR_PAGINA))
+        vendas, proximo_cursor = Venda.listar_pagina(request.args.get('cursor'), limite, filtros_vendas_da_requisicao())
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    return jsonify({"vendas": [v.to_dict() for v in vendas], "proximo_cursor": proximo_cursor})
+
+@app.route('/api/vendas/diarias', methods=['GET'])
+@login_necessario(permissao_requerida='gerente')
+def api_vendas_diarias():
+    """Endpoint da API com as vendas consolidadas por dia.
+
+    Parâmetros: data_inicio, data_fim (AAAA-MM-DD), agrupar (dimensões separadas
+    por vírgula, padrão 'data,id_catalogo_produto') e os filtros id_catalogo_produto,
+    area_origem_id e destino.
+    """
+    agrupar = request.args.get('agrupar', 'data,id_catalogo_produto')
+    filtros = {chave: request.args[chave] for chave in relatorios.FILTROS_VENDAS_DIARIAS if request.args.get(chave)}
+    try:
+        linhas = relatorios.vendas_por_periodo(request.args.get('data_inicio'), request.args.get('data_fim'),
+                                               [d for d in agrupar.split(',') if d], filtros)
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    return jsonify([dict(linha) for linha in linhas])
+
 @app.route('/api/estoque_geral', methods=['GET'])
 @login_necessario(permissao_requerida='gerente')
 def api_estoque_geral():
-    """Endpoint da API para listar o estoque completo de todas as áreas em formato JSON."""
-    estoque_completo = [area.to_dict() for area in AreaArmazem.listar_todas()]
-    return jsonify(estoque_completo)
+    """Endpoint da API para listar o estoque completo de todas as áreas em formato JSON.
+
+    A resposta é gerada a partir de uma única consulta e enviada em partes
+    (streaming), mantendo o uso de memória constante mesmo com muitos lotes.
+    """
+    return Response(stream_with_context(relatorios.estoque_geral_json()), mimetype='application/json')
+
+@app.route('/api/monitoramento/agendador', methods=['GET'])
+@login_necessario(permissao_requerida='gerente')
+def api_estatisticas_agendador():
+    """Endpoint da API com o estado e os tempos das tarefas em segundo plano."""
+    return jsonify(agendador.agendador.estatisticas())
+
+@app.route('/api/monitoramento/caches', methods=['GET'])
+@login_necessario(permissao_requerida='gerente')
+def api_estatisticas_caches():
+    """Endpoint da API com os acertos e falhas dos caches deste processo."""
+    return jsonify(estatisticas_caches())
+
+@app.route('/api/monitoramento/instrumentacao', methods=['GET', 'POST'])
+@login_necessario(permissao_requerida='gerente')
+def api_instrumentacao_sql():
+    """Consulta ou altera (POST com {"ativa": true/false}) a instrumentação das consultas SQL."""
+    if request.method == 'POST':
+        dados = request.get_json(silent=True) or {}
+        if not isinstance(dados.get('ativa'), bool):
+            return jsonify({"erro": "Informe 'ativa' como true ou false."}), 400
+        if dados['ativa']:
+            instrumentacao.ativar()
+        else:
+            instrumentacao.desativar()
+        app.logger.info(f"Instrumentação SQL {'ativada' if dados['ativa'] else 'desativada'} "
+                        f"por {obter_usuario_logado().username}.")
+    return jsonify({'ativa': instrumentacao.esta_ativa()})
 
 # --- Context Processor ---
 @app.context_processor
 def injetar_dados_globais():
     """Disponibiliza o objeto Usuario logado para todos os templates."""
-    usuario_obj = None
-    if 'username' in session and 'password' in session: # Verifica se há um usuário logado
-        # Busca o objeto Usuario completo para disponibilizar seus métodos (como tem_permissao)
-        usuario_obj = Usuario.verificar_senha(session['username'], session['password'])
+    # Reaproveita o usuário já carregado por login_necessario neste request.
+    usuario_obj = obter_usuario_logado()
     return dict(usuario_logado=usuario_obj, data_hoje_global=date.today())
 
+# --- Comandos de Manutenção (flask --app app <comando>) ---
+@app.cli.command('resumo-estoque')
+@click.option('--reconstruir', is_flag=True, help='Recalcula o resumo a partir de produtos_areas antes de verificar.')
+def comando_resumo_estoque(reconstruir):
+    """Verifica (e opcionalmente reconstrói) as tabelas de resumo do estoque."""
+    if reconstruir:
+        relatorios.reconstruir_resumo_estoque()
+        click.echo('Resumo do estoque reconstruído.')
+    divergencias = relatorios.verificar_resumo_estoque()
+    for d in divergencias:
+        click.echo(f"{d['tabela']} {d['chave']}: esperado {d['esperado']}, atual {d['atual']}")
+    if divergencias:
+        raise SystemExit(1)
+    click.echo('Resumo do estoque consistente com produtos_areas.')
+
+@app.cli.command('vendas-diarias')
+@click.option('--data-inicio', help='Primeiro dia a recalcular (AAAA-MM-DD).')
+@click.option('--data-fim', help='Último dia a recalcular (AAAA-MM-DD).')
+def comando_vendas_diarias(data_inicio, data_fim):
+    """Recalcula a consolidação diária de vendas a partir do histórico (backfill)."""
+    gravadas = relatorios.reconstruir_vendas_diarias(data_inicio, data_fim)
+    click.echo(f'Consolidação diária de vendas recalculada: {gravadas} linha(s).')
+
+@app.cli.command('importar-estoque')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+def comando_importar_estoque(arquivo):
+    """Importa um recebimento de estoque de um CSV (id_area, id_catalogo_produto, quantidade, data_validade, lote)."""
+    # newline='' preserva quebras de linha dentro de campos entre aspas, como pede o módulo csv.
+    with open(arquivo, encoding='utf-8-sig', newline='') as texto:
+        sucesso, relatorio = importacao.importar_estoque_csv(texto)
+    for erro in relatorio['erros']:
+        click.echo(f"Linha {erro['linha']}: {erro['mensagem']}", err=True)
+    if not sucesso:
+        click.echo(f"Importação não realizada: {relatorio['total_erros']} erro(s).", err=True)
+        raise SystemExit(1)
+    click.echo(f"Importação concluída: {relatorio['aplicadas']} lote(s) registrados.")
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001)
 
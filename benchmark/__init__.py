@@ -0,0 +1,10 @@
+# laticinios_armazem/benchmark/__init__.py
+"""Benchmark da aplicação com dados sintéticos em escala de produção.
+
+Uso: python -m benchmark --help
+"""
+
+from benchmark.dados import PARAMETROS_PADRAO, gerar_dados
+from benchmark.cenarios import CENARIOS, comparar_resultados, executar_cenarios
+
+__all__ = ['PARAMETROS_PADRAO', 'gerar_dados', 'CENARIOS', 'executar_cenarios', 'comparar_resultados']
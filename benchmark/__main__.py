@@ -0,0 +1,56 @@
+# laticinios_armazem/benchmark/__main__.py
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from benchmark.cenarios import CENARIOS, comparar_resultados, executar_cenarios
+from benchmark.dados import PARAMETROS_PADRAO, gerar_dados
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmark',
+                                     description='Mede os tempos das principais rotas com dados sintéticos.')
+    parser.add_argument('--banco', help='Banco de benchmark. Se não existir, é gerado; padrão: arquivo temporário.')
+    for nome, valor in PARAMETROS_PADRAO.items():
+        parser.add_argument(f"--{nome.replace('_', '-')}", type=type(valor), default=valor,
+                            help=f'Geração dos dados (padrão: {valor}).')
+    parser.add_argument('--repeticoes', type=int, default=50, help='Requisições medidas por cenário.')
+    parser.add_argument('--aquecimento', type=int, default=5, help='Requisições descartadas antes de medir.')
+    parser.add_argument('--cenarios', default=','.join(CENARIOS),
+                        help=f"Cenários separados por vírgula (padrão: {','.join(CENARIOS)}).")
+    parser.add_argument('--saida', help='Arquivo JSON de saída (padrão: saída padrão).')
+    parser.add_argument('--comparar', help='Resultado JSON anterior; regressões fazem o comando sair com código 1.')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='Piora aceita na comparação (padrão: 0.25).')
+    args = parser.parse_args(argv)
+
+    parametros = {nome: getattr(args, nome) for nome in PARAMETROS_PADRAO}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        banco = args.banco or os.path.join(tmpdir, 'benchmark.db')
+        dados = gerar_dados(banco, **parametros) if not os.path.exists(banco) else None
+        cenarios = executar_cenarios(banco, args.repeticoes, args.aquecimento,
+                                     [c for c in args.cenarios.split(',') if c], semente=args.semente)
+
+    resultado = {'parametros': parametros, 'dados': dados, 'cenarios': cenarios}
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+        regressoes = comparar_resultados(base['cenarios'], cenarios, args.tolerancia)
+        for regressao in regressoes:
+            print(f'Regressão: {regressao}', file=sys.stderr)
+        if regressoes:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+# laticinios_armazem/benchmark/cenarios.py
+
+import math
+import random
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import conexao
+import instrumentacao
+import models
+from benchmark.dados import USUARIOS_BENCHMARK
+
+# Percentis reportados para cada cenário.
+PERCENTIS = (50, 95, 99)
+
+
+def percentil(valores_ordenados: Sequence[float], p: float) -> float:
+    """Percentil pelo método do posto mais próximo (valores já ordenados)."""
+    if not valores_ordenados:
+        return 0.0
+    posto = max(1, math.ceil(len(valores_ordenados) * p / 100))
+    return valores_ordenados[posto - 1]
+
+
+def _lotes_disponiveis() -> List[sqlite3.Row]:
+    conn = models.get_db_connection()
+    try:
+        return conn.execute('SELECT id, id_area FROM produtos_areas WHERE quantidade > 0 ORDER BY id').fetchall()
+    finally:
+        conn.close()
+
+
+# Cada cenário recebe o cliente de teste, o gerador aleatório e os lotes disponíveis
+# e faz uma requisição, retornando a resposta.
+def _cenario_login(cliente, rng, lotes):
+    username, senha = USUARIOS_BENCHMARK[0][:2]
+    return cliente.post('/login', data={'username': username, 'password': senha})
+
+
+def _cenario_armazem(cliente, rng, lotes):
+    return cliente.get('/armazem')
+
+
+def _cenario_area(cliente, rng, lotes):
+    return cliente.get(f"/armazem/{rng.choice(lotes)['id_area']}")
+
+
+def _cenario_relatorios(cliente, rng, lotes):
+    return cliente.get('/relatorios')
+
+
+def _cenario_estoque_geral(cliente, rng, lotes):
+    return cliente.get('/api/estoque_geral')
+
+
+def _cenario_venda(cliente, rng, lotes):
+    lote = rng.choice(lotes)
+    return cliente.post(f"/armazem/{lote['id_area']}/vender_produto", data={
+        'id_instancia_venda': str(lote['id']),
+        'quantidade_venda': '1',
+        'destino_venda': 'Cliente Benchmark',
+    })
+
+
+CENARIOS: Dict[str, Callable[..., Any]] = {
+    'login': _cenario_login,
+    'armazem': _cenario_armazem,
+    'area_detalhes': _cenario_area,
+    'relatorios': _cenario_relatorios,
+    'api_estoque_geral': _cenario_estoque_geral,
+    'venda': _cenario_venda,
+}
+
+
+def executar_cenarios(database_path: str, repeticoes: int = 50, aquecimento: int = 5,
+                      cenarios: Optional[Sequence[str]] = None, semente: int = 42) -> Dict[str, Any]:
+    """Executa os cenários contra o app Flask (test client) usando o banco informado.
+
+    Returns:
+        Dict[str, Any]: Por cenário, número de requisições, tempos em milissegundos
+        (media, p50, p95, p99, maximo), consultas SQL por requisição e contagem
+        de códigos de status HTTP.
+
+    Raises:
+        ValueError: Para nomes de cenário desconhecidos.
+    """
+    nomes = list(cenarios or CENARIOS)
+    desconhecidos = [nome for nome in nomes if nome not in CENARIOS]
+    if desconhecidos:
+        raise ValueError(f"Cenário(s) desconhecido(s): {', '.join(desconhecidos)}")
+
+    database_path_original = models.DATABASE_PATH
+    # Importar o app aplica as migrações e os dados iniciais ao banco de
+    # models.DATABASE_PATH: o caminho é trocado antes, para que o benchmark
+    # nunca altere outro banco (ex.: data/laticinios.db).
+    models.DATABASE_PATH = database_path
+    conexao.fechar_pool()
+    try:
+        from app import app
+    except BaseException:
+        models.DATABASE_PATH = database_path_original
+        raise
+
+    testing_original = app.config['TESTING']
+    app.config['TESTING'] = True  # Mantém o agendador desligado durante as medições
+    rng = random.Random(semente)
+    resultado: Dict[str, Any] = {}
+    try:
+        lotes = _lotes_disponiveis()
+        cliente = app.test_client()
+        username, senha = USUARIOS_BENCHMARK[0][:2]
+        with cliente.session_transaction() as sess:
+            sess['username'] = username
+            sess['password'] = senha
+
+        with instrumentacao.coletar_processo() as coletor:
+            for nome in nomes:
+                resultado[nome] = _medir_cenario(CENARIOS[nome], cliente, rng, lotes, repeticoes,
+                                                 aquecimento, coletor)
+    finally:
+        conexao.fechar_pool()
+        models.DATABASE_PATH = database_path_original
+        app.config['TESTING'] = testing_original
+    return resultado
+
+
+def _medir_cenario(cenario: Callable[..., Any], cliente, rng: random.Random, lotes: List[sqlite3.Row],
+                   repeticoes: int, aquecimento: int,
+                   coletor: instrumentacao.ColetorConsultas) -> Dict[str, Any]:
+    for _ in range(aquecimento):
+        cenario(cliente, rng, lotes)
+    tempos: List[float] = []
+    consultas: List[int] = []
+    status: Dict[str, int] = {}
+    for _ in range(repeticoes):
+        consultas_antes = coletor.total
+        inicio = time.perf_counter()
+        resposta = cenario(cliente, rng, lotes)
+        resposta.get_data()  # Consome respostas em streaming dentro da medição
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(coletor.total - consultas_antes)
+        status[str(resposta.status_code)] = status.get(str(resposta.status_code), 0) + 1
+    ordenados = sorted(tempos)
+    medidas = {f'p{p}_ms': round(percentil(ordenados, p), 3) for p in PERCENTIS}
+    return {
+        'requisicoes': repeticoes,
+        'media_ms': round(sum(tempos) / len(tempos), 3) if tempos else 0.0,
+        **medidas,
+        'maximo_ms': round(ordenados[-1], 3) if ordenados else 0.0,
+        'consultas_por_requisicao': round(sum(consultas) / len(consultas), 2) if consultas else 0.0,
+        'status': status,
+    }
+
+
+def comparar_resultados(base: Dict[str, Any], atual: Dict[str, Any], tolerancia: float = 0.25,
+                        metrica: str = 'p95_ms') -> List[str]:
+    """Compara dois resultados de executar_cenarios e lista as regressões.
+
+    Um cenário regride quando 'metrica' ou as consultas por requisição passam
+    do valor de base multiplicado por (1 + tolerancia).
+    """
+    regressoes = []
+    for nome, medidas in atual.items():
+        referencia = base.get(nome)
+        if not referencia:
+            continue
+        for chave in (metrica, 'consultas_por_requisicao'):
+            if medidas[chave] > referencia[chave] * (1 + tolerancia):
+                regressoes.append(f"{nome}: {chave} {referencia[chave]} -> {medidas[chave]}")
+    return regressoes
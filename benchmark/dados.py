@@ -0,0 +1,108 @@
+# laticinios_armazem/benchmark/dados.py
+
+import os
+import random
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+import conexao
+import models
+
+# Volume padrão dos dados sintéticos (ver gerar_dados).
+PARAMETROS_PADRAO: Dict[str, Any] = {
+    'areas': 20,
+    'produtos': 200,
+    'lotes_por_area': 500,
+    'anos_vendas': 2.0,
+    'vendas_por_dia': 50,
+    'semente': 42,
+}
+
+# Usuários criados no banco de benchmark: (username, senha, funcao, nome).
+USUARIOS_BENCHMARK = (
+    ('bench.gerente', 'bench123', 'gerente', 'Gerente do Benchmark'),
+    ('bench.operador', 'bench123', 'operador', 'Operador do Benchmark'),
+)
+
+TIPOS_ARMAZENAMENTO = ('refrigerado', 'congelado', 'seco')
+FAMILIAS_PRODUTOS = ('Queijo', 'Iogurte', 'Leite', 'Manteiga', 'Requeijão', 'Creme de Leite', 'Doce de Leite')
+NUMERO_DESTINOS = 30
+
+
+def gerar_dados(database_path: str, areas: int = PARAMETROS_PADRAO['areas'],
+                produtos: int = PARAMETROS_PADRAO['produtos'],
+                lotes_por_area: int = PARAMETROS_PADRAO['lotes_por_area'],
+                anos_vendas: float = PARAMETROS_PADRAO['anos_vendas'],
+                vendas_por_dia: int = PARAMETROS_PADRAO['vendas_por_dia'],
+                semente: int = PARAMETROS_PADRAO['semente'],
+                data_referencia: Optional[date] = None) -> Dict[str, int]:
+    """Cria um banco novo com um armazém sintético.
+
+    Para os mesmos parâmetros, semente e data de referência o conteúdo gerado
+    é sempre o mesmo. As validades dos lotes vão de 10 dias vencidos a um ano
+    à frente da data de referência, e as vendas cobrem os 'anos_vendas' anos
+    anteriores a ela.
+
+    Raises:
+        FileExistsError: Se já existir um arquivo em 'database_path'.
+
+    Returns:
+        Dict[str, int]: Quantidade de linhas geradas em cada tabela.
+    """
+    if os.path.exists(database_path):
+        raise FileExistsError(f"O banco de benchmark já existe: {database_path}")
+    rng = random.Random(semente)
+    hoje = data_referencia or date.today()
+
+    database_path_original = models.DATABASE_PATH
+    models.DATABASE_PATH = database_path
+    try:
+        models.init_db()
+        conn = models.get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.executemany('INSERT INTO usuarios (username, senha, funcao, nome) VALUES (?, ?, ?, ?)',
+                               USUARIOS_BENCHMARK)
+
+            catalogo = [(f'PROD{i:05d}', f'{FAMILIAS_PRODUTOS[i % len(FAMILIAS_PRODUTOS)]} {i:05d}')
+                        for i in range(produtos)]
+            cursor.executemany('INSERT INTO produtos_catalogo (id_produto, nome) VALUES (?, ?)', catalogo)
+
+            lista_areas = [(f'AREA{i:03d}', f'Área {i:03d}', TIPOS_ARMAZENAMENTO[i % len(TIPOS_ARMAZENAMENTO)])
+                           for i in range(areas)]
+            cursor.executemany('INSERT INTO areas_armazem (id_area, nome, tipo_armazenamento) VALUES (?, ?, ?)',
+                               lista_areas)
+
+            lotes = []
+            for id_area, _, _ in lista_areas:
+                for i in range(lotes_por_area):
+                    id_produto, nome = rng.choice(catalogo)
+                    validade = hoje + timedelta(days=rng.randint(-10, 365))
+                    lotes.append((id_area, id_produto, nome, rng.randint(1, 500),
+                                  validade.isoformat(), f'{id_area}-L{i:05d}'))
+            cursor.executemany(
+                'INSERT INTO produtos_areas (id_area, id_catalogo_produto, nome, quantidade, data_validade, lote) '
+                'VALUES (?, ?, ?, ?, ?, ?)', lotes)
+
+            destinos = [f'Cliente {i:03d}' for i in range(NUMERO_DESTINOS)]
+            usuarios = [u[0] for u in USUARIOS_BENCHMARK]
+            inicio = datetime.combine(hoje, datetime.min.time()) - timedelta(days=int(anos_vendas * 365))
+            vendas = []
+            for dia in range(int(anos_vendas * 365)):
+                base = inicio + timedelta(days=dia)
+                for _ in range(vendas_por_dia):
+                    id_area, id_produto, nome, _, validade, lote = rng.choice(lotes)
+                    data_hora = base + timedelta(seconds=rng.randint(0, 86399))
+                    vendas.append((id_produto, nome, lote, validade, rng.randint(1, 20), rng.choice(destinos),
+                                   id_area, rng.choice(usuarios), data_hora.strftime('%Y-%m-%d %H:%M:%S')))
+            cursor.executemany(models.Venda._SQL_INSERIR, vendas)
+            conn.commit()
+        finally:
+            conn.close()
+    finally:
+        conexao.fechar_pool()
+        models.DATABASE_PATH = database_path_original
+
+    return {'usuarios': len(USUARIOS_BENCHMARK), 'produtos_catalogo': len(catalogo),
+            'areas_armazem': len(lista_areas), 'produtos_areas': len(lotes), 'vendas': len(vendas)}
@@ -0,0 +1,154 @@
+# laticinios_armazem/cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class CacheTTL:
+    """Cache em memória, seguro para threads, com expiração por tempo (TTL).
+
+    Com ttl <= 0 o cache fica desativado: toda consulta chama a função de
+    carga. Quando o número de entradas passa de 'tamanho_maximo', as menos
+    usadas recentemente são descartadas.
+    """
+
+    def __init__(self, ttl: float = 0, tamanho_maximo: int = 1024):
+        self.ttl = ttl
+        self.tamanho_maximo = tamanho_maximo
+        self._entradas: 'OrderedDict[Hashable, tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave: Hashable, carregar: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Retorna o valor em cache para a chave ou o carrega com 'carregar()'.
+
+        'ttl', se informado, substitui self.ttl nesta consulta (ex.: lido da
+        configuração do app a cada request). Resultados None não são armazenados.
+        """
+        if ttl is None:
+            ttl = self.ttl
+        if ttl <= 0:
+            with self._lock:
+                self.falhas += 1
+            return carregar()
+
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[0] > agora:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return entrada[1]
+            self.falhas += 1
+
+        valor = carregar()
+        if valor is not None:
+            with self._lock:
+                self._entradas[chave] = (agora + ttl, valor)
+                self._entradas.move_to_end(chave)
+                while len(self._entradas) > self.tamanho_maximo:
+                    self._entradas.popitem(last=False)
+        return valor
+
+    def invalidar(self, predicado: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Remove as entradas cuja chave satisfaz o predicado (ou todas, se omitido).
+
+        Returns:
+            int: Número de entradas removidas.
+        """
+        with self._lock:
+            if predicado is None:
+                removidas = len(self._entradas)
+                self._entradas.clear()
+                return removidas
+            chaves = [chave for chave in self._entradas if predicado(chave)]
+            for chave in chaves:
+                del self._entradas[chave]
+            return len(chaves)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Retorna acertos, falhas, taxa de acerto e número de entradas do cache."""
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': (self.acertos / total) if total else 0.0,
+                'entradas': len(self._entradas),
+            }
+
+
+class CacheReferencia:
+    """Cache de leitura (read-through) para uma tabela de referência pequena.
+
+    A validade do valor em cache é controlada por um contador de geração
+    gravado no banco (tabela geracoes_cache), incrementado por triggers a
+    cada escrita na tabela. Antes de responder, o cache compara a geração
+    guardada com a do banco, uma leitura por chave primária muito mais barata
+    que recarregar a tabela; assim todos os processos que compartilham o
+    banco enxergam a mesma invalidação. 'ler_geracao(nome)' pode retornar
+    qualquer valor comparável (ex.: o número da geração junto com o caminho
+    do banco). invalidar() descarta o valor local imediatamente (usado pelos
+    métodos de escrita do próprio processo).
+    """
+
+    def __init__(self, nome: str, ler_geracao: Callable[[str], Hashable]):
+        self.nome = nome
+        self._ler_geracao = ler_geracao
+        self._valor: Any = None
+        self._geracao: Optional[Hashable] = None
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, carregar: Callable[[], Any]) -> Any:
+        """Retorna o valor em cache, recarregando-o com 'carregar()' se a geração mudou."""
+        geracao = self._ler_geracao(self.nome)
+        with self._lock:
+            if self._valor is not None and self._geracao == geracao:
+                self.acertos += 1
+                return self._valor
+            self.falhas += 1
+        # A geração foi lida antes da carga: se houver uma escrita no meio,
+        # a próxima leitura verá uma geração nova e recarregará.
+        valor = carregar()
+        with self._lock:
+            self._valor = valor
+            self._geracao = geracao
+        return valor
+
+    def aquecer(self, carregar: Callable[[], Any]) -> bool:
+        """Recarrega o valor apenas se a geração mudou, sem contar acerto ou falha.
+
+        Usado por tarefas em segundo plano para que o próximo request já
+        encontre o valor pronto. Retorna True se o valor foi recarregado.
+        """
+        geracao = self._ler_geracao(self.nome)
+        with self._lock:
+            if self._valor is not None and self._geracao == geracao:
+                return False
+        valor = carregar()
+        with self._lock:
+            self._valor = valor
+            self._geracao = geracao
+        return True
+
+    def invalidar(self) -> None:
+        """Descarta o valor em cache deste processo."""
+        with self._lock:
+            self._valor = None
+            self._geracao = None
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Retorna acertos, falhas, taxa de acerto e a geração atualmente em cache."""
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': (self.acertos / total) if total else 0.0,
+                'geracao': self._geracao,
+            }
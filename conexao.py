@@ -0,0 +1,505 @@
+# laticinios_armazem/conexao.py
+
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import g, has_app_context, current_app
+
+import metricas
+
+# Chave usada em app.extensions para indicar que o pool foi registrado na aplicação.
+EXTENSAO_FLASK = 'laticinios_pool'
+
+# Perfis de armazenamento do SQLite, selecionados por app.config['DB_PERFIL_ARMAZENAMENTO'].
+#
+# Os dois perfis usam journal_mode=WAL: leitores não bloqueiam o escritor e o
+# escritor não bloqueia leitores, o que evita os erros "database is locked" quando
+# vários operadores registram vendas ao mesmo tempo. busy_timeout faz um escritor
+# aguardar o outro terminar em vez de falhar imediatamente.
+#
+#   'duravel':    synchronous=FULL. Cada commit é sincronizado no disco; nenhuma
+#                 venda confirmada é perdida, mesmo em queda de energia.
+#   'desempenho': synchronous=NORMAL, cache maior, mmap e tabelas temporárias em
+#                 memória. Commits bem mais rápidos; em queda de energia (não em
+#                 falha do processo) as últimas transações confirmadas podem ser
+#                 perdidas, mas o banco nunca fica corrompido.
+PERFIS_ARMAZENAMENTO: Dict[str, Dict[str, Any]] = {
+    'duravel': {
+        'auto_vacuum': 'INCREMENTAL',
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+        'cache_size': -8000,        # ~8 MB (valores negativos são em KiB)
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+    },
+    'desempenho': {
+        'auto_vacuum': 'INCREMENTAL',
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -32000,       # ~32 MB
+        'mmap_size': 268435456,     # 256 MB
+        'temp_store': 'MEMORY',
+    },
+}
+PERFIL_PADRAO = 'desempenho'
+
+# PRAGMAs gravados no próprio arquivo do banco: aplicados uma única vez, em init_db.
+# auto_vacuum só tem efeito em bancos novos (antes da primeira tabela) ou após um VACUUM.
+PRAGMAS_PERSISTENTES = ('auto_vacuum', 'journal_mode')
+
+# Um BEGIN IMMEDIATE mais lento que isto (em segundos) aguardou o bloqueio de outro
+# escritor: sem concorrência ele leva microssegundos, e o busy handler do SQLite
+# dorme pelo menos 1 ms a cada tentativa.
+ESPERA_BLOQUEIO_MINIMA = 0.001
+
+# Códigos primários SQLITE_BUSY e SQLITE_LOCKED.
+_CODIGOS_BLOQUEIO = (5, 6)
+
+# Configuração padrão do pool (pode ser sobrescrita via configurar() ou app.config).
+_config: Dict[str, Any] = {
+    'tamanho': 5,
+    'timeout': 30.0,
+    'perfil': PERFIL_PADRAO,
+    'pragmas': {},
+}
+
+_pool: Optional['PoolConexoes'] = None
+
+# Funções chamadas com cada nova conexão criada pelos pools (ex.: instrumentação).
+_ganchos_conexao: List[Callable[[sqlite3.Connection], None]] = []
+
+# Classe de cursor usada pelas conexões do pool; None usa CursorMonitorado (ver definir_fabrica_cursor).
+_fabrica_cursor: Optional[type] = None
+_pool_lock = threading.Lock()
+
+# Instruções mais lentas que _limite_consulta_lenta (em segundos) são passadas a
+# _ao_consulta_lenta(cursor, sql, parâmetros, duração); ver definir_monitor_consultas_lentas.
+_limite_consulta_lenta: Optional[float] = None
+_ao_consulta_lenta: Optional[Callable[[sqlite3.Cursor, str, Any, float], None]] = None
+
+
+def _registrar_erro_bloqueio(erro: sqlite3.OperationalError) -> None:
+    codigo = getattr(erro, 'sqlite_errorcode', None)
+    if codigo is not None and codigo & 0xFF in _CODIGOS_BLOQUEIO:
+        metricas.erros_bloqueio.inc()
+
+
+def _guardar_primeiro(conjuntos: Any, amostra: List[Any]):
+    """Repassa os conjuntos de parâmetros de executemany(), guardando o primeiro em 'amostra'."""
+    for conjunto in conjuntos:
+        if not amostra:
+            amostra.append(conjunto)
+        yield conjunto
+
+
+class CursorMonitorado(sqlite3.Cursor):
+    """Cursor padrão do pool: conta as esperas e os erros de bloqueio do SQLite.
+
+    O BEGIN IMMEDIATE é sempre cronometrado (é nele que um escritor aguarda o
+    outro). As demais instruções de execute() e executemany() só são
+    cronometradas com o monitor de consultas lentas ligado; sem ele, o custo é
+    apenas o do bloco try.
+
+    Em um SELECT, execute() mede apenas até a primeira linha: as seguintes são
+    produzidas pelo SQLite durante fetch*() ou a iteração do cursor, fora da
+    medida. Consultas cujo custo está em percorrer muitas linhas (listagens
+    completas, respostas em streaming) podem, por isso, não chegar ao log.
+    """
+
+    def execute(self, sql: str, parametros: Any = (), /) -> sqlite3.Cursor:
+        limite = _limite_consulta_lenta
+        transacao = sql == 'BEGIN IMMEDIATE'
+        inicio = time.perf_counter() if transacao or limite is not None else None
+        try:
+            return super().execute(sql, parametros)
+        except sqlite3.OperationalError as e:
+            _registrar_erro_bloqueio(e)
+            raise
+        finally:
+            if inicio is not None:
+                duracao = time.perf_counter() - inicio
+                if transacao:
+                    if duracao >= ESPERA_BLOQUEIO_MINIMA:
+                        metricas.esperas_bloqueio.inc()
+                        metricas.tempo_espera_bloqueio.inc(duracao)
+                elif limite is not None and duracao >= limite and _ao_consulta_lenta is not None:
+                    _ao_consulta_lenta(self, sql, parametros, duracao)
+
+    def executemany(self, sql: str, parametros: Any, /) -> sqlite3.Cursor:
+        # Mede o lote inteiro; o monitor recebe o primeiro conjunto de parâmetros
+        # (suficiente para o plano da consulta, igual para todos os conjuntos).
+        limite = _limite_consulta_lenta
+        amostra: List[Any] = []
+        inicio = None
+        if limite is not None:
+            parametros = _guardar_primeiro(parametros, amostra)
+            inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, parametros)
+        except sqlite3.OperationalError as e:
+            _registrar_erro_bloqueio(e)
+            raise
+        finally:
+            if inicio is not None:
+                duracao = time.perf_counter() - inicio
+                if duracao >= limite and _ao_consulta_lenta is not None:
+                    _ao_consulta_lenta(self, sql, amostra[0] if amostra else (), duracao)
+
+
+class ConexaoReutilizavel(sqlite3.Connection):
+    """Conexão SQLite que volta para o pool quando close() é chamado.
+
+    Os métodos dos modelos continuam chamando conn.close() normalmente; em vez
+    de encerrar a conexão, ela é devolvida ao pool (ou, se estiver vinculada ao
+    request atual do Flask, permanece aberta até o fim do request).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool: Optional['PoolConexoes'] = None
+        self._vinculada_ao_request = False
+        self._usos_no_request = 0
+
+    def close(self) -> None:
+        if self._pool is None:
+            super().close()
+            return
+        if self._vinculada_ao_request:
+            # Mantém a conexão para o restante do request. Assim como o close()
+            # original, descarta o que não foi confirmado quando o último
+            # usuário da conexão termina.
+            self._usos_no_request = max(self._usos_no_request - 1, 0)
+            if self._usos_no_request == 0 and self.in_transaction:
+                self.rollback()
+            return
+        self._pool.devolver(self)
+
+    def cursor(self, factory: Optional[type] = None) -> sqlite3.Cursor:
+        return super().cursor(factory or _fabrica_cursor or CursorMonitorado)
+
+    # Os atalhos de sqlite3.Connection não passam por cursor(); estes passam,
+    # para que a fábrica de cursores valha também para conn.execute().
+    def execute(self, sql: str, parametros: Any = (), /) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql: str, parametros: Any, /) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, parametros)
+
+    def encerrar(self) -> None:
+        """Fecha de fato a conexão com o banco de dados."""
+        self._pool = None
+        super().close()
+
+
+class PoolConexoes:
+    """Pool de conexões SQLite reutilizáveis e seguro para servidores com threads.
+
+    As conexões são criadas sob demanda até o limite 'tamanho'. Os PRAGMAs
+    configurados são aplicados uma única vez, quando a conexão é criada.
+    """
+
+    def __init__(self, database_path: str, tamanho: int = 5, timeout: float = 30.0,
+                 pragmas: Optional[Dict[str, Any]] = None):
+        if tamanho < 1:
+            raise ValueError("O tamanho do pool deve ser pelo menos 1.")
+        self.database_path = database_path
+        self.tamanho = tamanho
+        self.timeout = timeout
+        self.pragmas = dict(pragmas or {})
+        self._livres: queue.LifoQueue = queue.LifoQueue()
+        self._criadas = 0
+        self._lock = threading.Lock()
+        self._fechado = False
+        # Pedidos que encontraram o pool cheio, tempo total aguardando e os que desistiram (timeout).
+        self.esperas = 0
+        self.tempo_espera = 0.0
+        self.esgotamentos = 0
+
+    @property
+    def criadas(self) -> int:
+        """Número de conexões abertas pelo pool (livres ou em uso)."""
+        return self._criadas
+
+    @property
+    def livres(self) -> int:
+        """Número de conexões ociosas aguardando reutilização."""
+        return self._livres.qsize()
+
+    def _criar_conexao(self) -> ConexaoReutilizavel:
+        conn = sqlite3.connect(self.database_path, factory=ConexaoReutilizavel,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # Permite acessar colunas por nome
+        for nome, valor in self.pragmas.items():
+            conn.execute(f'PRAGMA {nome} = {valor}')
+        for gancho in _ganchos_conexao:
+            gancho(conn)
+        conn._pool = self
+        return conn
+
+    def obter(self) -> ConexaoReutilizavel:
+        """Retorna uma conexão livre, criando uma nova se o limite permitir.
+
+        Raises:
+            sqlite3.OperationalError: Se nenhuma conexão ficar livre dentro do timeout.
+        """
+        if self._fechado:
+            raise sqlite3.OperationalError("O pool de conexões foi fechado.")
+        try:
+            return self._livres.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            pode_criar = self._criadas < self.tamanho
+            if pode_criar:
+                self._criadas += 1
+        if pode_criar:
+            try:
+                return self._criar_conexao()
+            except Exception:
+                with self._lock:
+                    self._criadas -= 1
+                raise
+
+        inicio = time.perf_counter()
+        try:
+            conn = self._livres.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self.esperas += 1
+                self.tempo_espera += time.perf_counter() - inicio
+                self.esgotamentos += 1
+            raise sqlite3.OperationalError(
+                f"Nenhuma conexão livre no pool após {self.timeout} segundos (tamanho={self.tamanho})."
+            )
+        with self._lock:
+            self.esperas += 1
+            self.tempo_espera += time.perf_counter() - inicio
+        return conn
+
+    def devolver(self, conn: ConexaoReutilizavel) -> None:
+        """Devolve uma conexão ao pool, descartando transações não confirmadas."""
+        conn._vinculada_ao_request = False
+        conn._usos_no_request = 0
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Conexão em estado inválido: descarta em vez de reutilizar.
+            self._descartar(conn)
+            return
+        if self._fechado:
+            self._descartar(conn)
+            return
+        self._livres.put(conn)
+
+    def _descartar(self, conn: ConexaoReutilizavel) -> None:
+        with self._lock:
+            self._criadas -= 1
+        try:
+            conn.encerrar()
+        except sqlite3.Error:
+            pass
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Retorna o uso do pool: tamanho, conexões abertas, livres e em uso, e as esperas por conexão."""
+        with self._lock:
+            criadas = self._criadas
+            livres = self._livres.qsize()
+            return {
+                'tamanho': self.tamanho,
+                'criadas': criadas,
+                'livres': livres,
+                'em_uso': max(criadas - livres, 0),
+                'esperas': self.esperas,
+                'tempo_espera': self.tempo_espera,
+                'esgotamentos': self.esgotamentos,
+            }
+
+    def fechar(self) -> None:
+        """Fecha todas as conexões ociosas; as que estão em uso são fechadas ao serem devolvidas."""
+        self._fechado = True
+        while True:
+            try:
+                conn = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            self._descartar(conn)
+
+
+def pragmas_por_conexao(perfil: str, extras: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Retorna os PRAGMAs do perfil que precisam ser aplicados a cada nova conexão.
+
+    Args:
+        perfil: Nome do perfil em PERFIS_ARMAZENAMENTO.
+        extras: PRAGMAs adicionais que sobrescrevem os do perfil.
+
+    Raises:
+        ValueError: Se o perfil não existir.
+    """
+    if perfil not in PERFIS_ARMAZENAMENTO:
+        raise ValueError(f"Perfil de armazenamento desconhecido: '{perfil}'. "
+                         f"Use um de: {', '.join(PERFIS_ARMAZENAMENTO)}.")
+    pragmas = {nome: valor for nome, valor in PERFIS_ARMAZENAMENTO[perfil].items()
+               if nome not in PRAGMAS_PERSISTENTES}
+    pragmas.update(extras or {})
+    return pragmas
+
+
+def aplicar_perfil_persistente(conn: sqlite3.Connection, perfil: Optional[str] = None) -> None:
+    """Aplica os PRAGMAs persistentes do perfil (ex.: journal_mode=WAL) ao arquivo do banco."""
+    perfil = perfil or _config['perfil']
+    pragmas_por_conexao(perfil)  # valida o nome do perfil
+    for nome in PRAGMAS_PERSISTENTES:
+        valor = PERFIS_ARMAZENAMENTO[perfil].get(nome)
+        if valor is not None:
+            conn.execute(f'PRAGMA {nome} = {valor}')
+
+
+def registrar_gancho_conexao(gancho: Callable[[sqlite3.Connection], None]) -> None:
+    """Registra uma função aplicada a toda conexão que o pool criar a partir de agora.
+
+    Conexões já abertas não são afetadas; chame fechar_pool() para que o pool
+    recrie as conexões com o gancho.
+    """
+    if gancho not in _ganchos_conexao:
+        _ganchos_conexao.append(gancho)
+
+
+def remover_gancho_conexao(gancho: Callable[[sqlite3.Connection], None]) -> None:
+    """Remove um gancho registrado com registrar_gancho_conexao (novas conexões deixam de recebê-lo)."""
+    if gancho in _ganchos_conexao:
+        _ganchos_conexao.remove(gancho)
+
+
+def definir_fabrica_cursor(fabrica: Optional[type]) -> None:
+    """Define a subclasse de CursorMonitorado criada por todas as conexões do pool (None restaura a padrão).
+
+    Vale imediatamente, inclusive para conexões já abertas.
+    """
+    global _fabrica_cursor
+    _fabrica_cursor = fabrica
+
+
+def definir_monitor_consultas_lentas(limite: Optional[float],
+                                     funcao: Optional[Callable[[sqlite3.Cursor, str, Any, float], None]] = None) -> None:
+    """Chama funcao(cursor, sql, parâmetros, duração) para cada instrução que levar 'limite' segundos ou mais.
+
+    Em execute() a duração vai até a primeira linha do resultado (o que inclui
+    ordenações e agregações, mas não a leitura das demais linhas); em
+    executemany() cobre o lote inteiro e 'parâmetros' é o primeiro conjunto.
+    Com limite None o monitor é desligado. A função roda na thread da consulta
+    e não deve lançar exceções.
+    """
+    global _limite_consulta_lenta, _ao_consulta_lenta
+    if limite is None:
+        _limite_consulta_lenta = None
+        _ao_consulta_lenta = None
+        return
+    _ao_consulta_lenta = funcao
+    _limite_consulta_lenta = limite
+
+
+def configurar(tamanho: Optional[int] = None, timeout: Optional[float] = None,
+               pragmas: Optional[Dict[str, Any]] = None, perfil: Optional[str] = None) -> None:
+    """Altera a configuração do pool. O pool atual é fechado e recriado no próximo uso."""
+    global _pool
+    if perfil is not None:
+        pragmas_por_conexao(perfil)  # valida antes de alterar a configuração
+    with _pool_lock:
+        if perfil is not None:
+            _config['perfil'] = perfil
+        if tamanho is not None:
+            _config['tamanho'] = tamanho
+        if timeout is not None:
+            _config['timeout'] = timeout
+        if pragmas is not None:
+            _config['pragmas'] = dict(pragmas)
+        if _pool is not None:
+            _pool.fechar()
+            _pool = None
+
+
+def obter_pool(database_path: str) -> PoolConexoes:
+    """Retorna o pool do banco de dados informado, criando-o se necessário."""
+    global _pool
+    pool = _pool
+    if pool is not None and pool.database_path == database_path:
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool.database_path != database_path:
+            if _pool is not None:
+                _pool.fechar()
+            _pool = PoolConexoes(database_path, _config['tamanho'], _config['timeout'],
+                                 pragmas_por_conexao(_config['perfil'], _config['pragmas']))
+        return _pool
+
+
+def estatisticas_pool() -> Optional[Dict[str, Any]]:
+    """Retorna PoolConexoes.estatisticas() do pool atual, ou None se nenhum pool foi criado."""
+    pool = _pool
+    return pool.estatisticas() if pool is not None else None
+
+
+def fechar_pool() -> None:
+    """Fecha o pool atual (útil em testes e no encerramento da aplicação)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.fechar()
+            _pool = None
+
+
+def obter_conexao(database_path: str) -> sqlite3.Connection:
+    """Obtém uma conexão do pool.
+
+    Dentro de um contexto de aplicação Flask registrado com init_app(), todas as
+    chamadas do mesmo request compartilham a mesma conexão, devolvida ao pool no
+    teardown. Fora dele (scripts, inicialização), cada chamada recebe uma
+    conexão exclusiva que volta ao pool em close().
+    """
+    pool = obter_pool(database_path)
+    if has_app_context() and EXTENSAO_FLASK in current_app.extensions:
+        conn = g.get('_conexao_db')
+        if conn is None or conn._pool is not pool:
+            if conn is not None:
+                liberar_conexao_do_request()
+            conn = pool.obter()
+            conn._vinculada_ao_request = True
+            g._conexao_db = conn
+        conn._usos_no_request += 1
+        return conn
+    return pool.obter()
+
+
+def liberar_conexao_do_request(exc: Optional[BaseException] = None) -> None:
+    """Devolve ao pool a conexão vinculada ao contexto atual (teardown do Flask)."""
+    conn = g.pop('_conexao_db', None)
+    if conn is not None and conn._pool is not None:
+        conn._pool.devolver(conn)
+
+
+def init_app(app) -> None:
+    """Registra o pool na aplicação Flask.
+
+    Configurações lidas de app.config:
+        DB_POOL_TAMANHO: número máximo de conexões abertas (padrão 5).
+        DB_POOL_TIMEOUT: segundos aguardando uma conexão livre (padrão 30).
+        DB_PERFIL_ARMAZENAMENTO: 'duravel' ou 'desempenho' (ver PERFIS_ARMAZENAMENTO).
+        DB_PRAGMAS: PRAGMAs extras aplicados a cada nova conexão, sobrescrevendo os do perfil.
+    """
+    app.config.setdefault('DB_POOL_TAMANHO', _config['tamanho'])
+    app.config.setdefault('DB_PERFIL_ARMAZENAMENTO', _config['perfil'])
+    app.config.setdefault('DB_POOL_TIMEOUT', _config['timeout'])
+    app.config.setdefault('DB_PRAGMAS', _config['pragmas'])
+    configurar(tamanho=app.config['DB_POOL_TAMANHO'],
+               timeout=app.config['DB_POOL_TIMEOUT'],
+               pragmas=app.config['DB_PRAGMAS'],
+               perfil=app.config['DB_PERFIL_ARMAZENAMENTO'])
+    app.extensions[EXTENSAO_FLASK] = True
+    app.teardown_appcontext(liberar_conexao_do_request)
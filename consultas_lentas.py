@@ -0,0 +1,208 @@
+# laticinios_armazem/consultas_lentas.py
+
+import functools
+import logging
+import logging.handlers
+import os
+import queue
+import sqlite3
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import conexao
+import metricas
+
+logger = logging.getLogger(__name__)
+
+# Limite padrão (em milissegundos) a partir do qual uma instrução é registrada.
+LIMITE_PADRAO_MS = 200.0
+
+# Registros aguardando escrita; com a fila cheia os novos são descartados (e contados),
+# nunca bloqueando o request.
+TAMANHO_FILA_LOG = 10000
+
+# A origem de uma consulta no log é o primeiro trecho de código do projeto na pilha,
+# fora dos módulos que apenas repassam a consulta ao SQLite. A comparação é pelo
+# arquivo, e não pelo nome do módulo, que é '__main__' quando o app roda com 'python app.py'.
+DIRETORIO_PROJETO = os.path.dirname(os.path.abspath(__file__))
+ARQUIVOS_IGNORADOS_ORIGEM = ('conexao.py', 'consultas_lentas.py', 'instrumentacao.py')
+
+# Instruções que aceitam EXPLAIN QUERY PLAN.
+_COMANDOS_COM_PLANO = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+# Rotação do arquivo de log (CONSULTA_LENTA_ARQUIVO).
+TAMANHO_MAXIMO_ARQUIVO = 5 * 1024 * 1024
+ARQUIVOS_ROTACAO = 3
+
+_fila: Optional[queue.Queue] = None
+_ouvinte: Optional[logging.handlers.QueueListener] = None
+_handler_fila: Optional['QueueHandlerDescartavel'] = None
+# Nível e propagação do logger antes de ativar(), restaurados por desativar().
+_estado_logger: Optional[Tuple[int, bool]] = None
+
+
+class QueueHandlerDescartavel(logging.handlers.QueueHandler):
+    """QueueHandler que descarta o registro quando a fila está cheia, em vez de bloquear ou falhar."""
+
+    def __init__(self, fila: queue.Queue):
+        super().__init__(fila)
+        self.descartados = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+def redigir_parametros(parametros: Any) -> Any:
+    """Substitui textos e binários por marcadores com o tamanho (ex.: '<texto:5>').
+
+    Números e None são mantidos, pois ajudam a entender o plano sem expor
+    nomes de clientes, usuários ou hashes de senha.
+    """
+    def redigir(valor: Any) -> Any:
+        if valor is None or isinstance(valor, (int, float)):
+            return valor
+        if isinstance(valor, str):
+            return f'<texto:{len(valor)}>'
+        if isinstance(valor, (bytes, bytearray, memoryview)):
+            return f'<binario:{len(valor)}>'
+        return f'<{type(valor).__name__}>'
+
+    if isinstance(parametros, dict):
+        return {nome: redigir(valor) for nome, valor in parametros.items()}
+    return [redigir(valor) for valor in parametros]
+
+
+@functools.lru_cache(maxsize=256)
+def _arquivo_de_origem(arquivo: str) -> bool:
+    if arquivo.startswith('<'):
+        return False  # Código sem arquivo: '<frozen runpy>', '<string>'...
+    caminho = os.path.abspath(arquivo)
+    return (os.path.dirname(caminho) == DIRETORIO_PROJETO
+            and os.path.basename(caminho) not in ARQUIVOS_IGNORADOS_ORIGEM)
+
+
+def metodo_chamador() -> str:
+    """Retorna 'Classe.metodo (arquivo:linha)' do trecho do app que executou a consulta."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        codigo = frame.f_code
+        if _arquivo_de_origem(codigo.co_filename):
+            return f'{codigo.co_qualname} ({os.path.basename(codigo.co_filename)}:{frame.f_lineno})'
+        frame = frame.f_back
+    return 'desconhecido'
+
+
+def plano_consulta(conn: sqlite3.Connection, sql: str, parametros: Any = ()) -> List[str]:
+    """Retorna as linhas do EXPLAIN QUERY PLAN da instrução, indentadas conforme a árvore do plano.
+
+    Instruções que não aceitam o EXPLAIN (PRAGMA, COMMIT...) retornam lista vazia.
+    """
+    if sql.lstrip().split(None, 1)[0].upper() not in _COMANDOS_COM_PLANO:
+        return []
+    # Cursor simples: a consulta do plano não passa pelo monitor (nem pela instrumentação).
+    linhas = conn.cursor(sqlite3.Cursor).execute('EXPLAIN QUERY PLAN ' + sql, parametros).fetchall()
+    profundidade: Dict[int, int] = {0: -1}
+    plano = []
+    for id_no, pai, _, detalhe in linhas:
+        profundidade[id_no] = profundidade.get(pai, -1) + 1
+        plano.append('  ' * profundidade[id_no] + detalhe)
+    return plano
+
+
+def _registrar_consulta_lenta(cursor: sqlite3.Cursor, sql: str, parametros: Any, duracao: float) -> None:
+    # Chamado pelo cursor do pool dentro de um bloco finally: nunca deixa escapar exceções.
+    try:
+        metricas.consultas_lentas.inc()
+        origem = metodo_chamador()
+        try:
+            plano = plano_consulta(cursor.connection, sql, parametros)
+        except sqlite3.Error as e:
+            plano = [f'(plano indisponível: {e})']
+        sql_compacto = ' '.join(sql.split())
+        parametros_redigidos = redigir_parametros(parametros)
+        logger.warning(
+            'Consulta lenta: %.1f ms em %s\n  SQL: %s\n  Parâmetros: %s\n  Plano:\n    %s',
+            duracao * 1000, origem, sql_compacto, parametros_redigidos,
+            '\n    '.join(plano) or '(sem plano)',
+            extra={'duracao_ms': duracao * 1000, 'origem': origem, 'sql': sql_compacto,
+                   'parametros': parametros_redigidos, 'plano': plano},
+        )
+    except Exception:
+        pass
+
+
+def descartados() -> int:
+    """Número de registros descartados por fila cheia desde a ativação."""
+    return _handler_fila.descartados if _handler_fila is not None else 0
+
+
+def ativar(limite_ms: float = LIMITE_PADRAO_MS, handlers: Optional[Sequence[logging.Handler]] = None,
+           tamanho_fila: int = TAMANHO_FILA_LOG) -> None:
+    """Liga o log de consultas lentas para todas as conexões do pool.
+
+    Os registros vão para uma fila (QueueHandler) e são escritos por uma
+    thread própria (QueueListener) nos 'handlers' informados (padrão: stderr).
+    """
+    global _fila, _ouvinte, _handler_fila, _estado_logger
+    desativar()
+    if not handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        handlers = [handler]
+    _fila = queue.Queue(maxsize=tamanho_fila)
+    _handler_fila = QueueHandlerDescartavel(_fila)
+    _ouvinte = logging.handlers.QueueListener(_fila, *handlers, respect_handler_level=True)
+    _ouvinte.start()
+    logger.addHandler(_handler_fila)
+    _estado_logger = (logger.level, logger.propagate)
+    logger.setLevel(logging.WARNING)
+    logger.propagate = False  # Os handlers da raiz escreveriam na thread do request
+    conexao.definir_monitor_consultas_lentas(limite_ms / 1000, _registrar_consulta_lenta)
+
+
+def desativar() -> None:
+    """Desliga o monitor e aguarda a escrita dos registros que ainda estão na fila."""
+    global _fila, _ouvinte, _handler_fila, _estado_logger
+    conexao.definir_monitor_consultas_lentas(None)
+    if _handler_fila is not None:
+        logger.removeHandler(_handler_fila)
+    if _estado_logger is not None:
+        nivel, propagar = _estado_logger
+        logger.setLevel(nivel)
+        logger.propagate = propagar
+        _estado_logger = None
+    if _ouvinte is not None:
+        _ouvinte.stop()
+        for handler in _ouvinte.handlers:
+            handler.close()
+    _fila = _ouvinte = _handler_fila = None
+
+
+def esta_ativo() -> bool:
+    return _ouvinte is not None
+
+
+def init_app(app) -> None:
+    """Liga o log de consultas lentas conforme a configuração.
+
+    Configurações lidas de app.config:
+        CONSULTA_LENTA_LIMITE_MS: limite em milissegundos; None desliga o log (padrão).
+        CONSULTA_LENTA_ARQUIVO: arquivo de log (com rotação); se omitido, escreve em stderr.
+    """
+    app.config.setdefault('CONSULTA_LENTA_LIMITE_MS', None)
+    app.config.setdefault('CONSULTA_LENTA_ARQUIVO', None)
+    limite_ms = app.config['CONSULTA_LENTA_LIMITE_MS']
+    if limite_ms is None:
+        return
+    handlers = None
+    arquivo = app.config['CONSULTA_LENTA_ARQUIVO']
+    if arquivo:
+        os.makedirs(os.path.dirname(os.path.abspath(arquivo)), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(arquivo, maxBytes=TAMANHO_MAXIMO_ARQUIVO,
+                                                       backupCount=ARQUIVOS_ROTACAO, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        handlers = [handler]
+    ativar(limite_ms, handlers)
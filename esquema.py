@@ -0,0 +1,96 @@
+# laticinios_armazem/esquema.py
+
+import os
+import re
+import sqlite3
+from typing import List, Tuple
+
+# Diretório com os arquivos de migração, nomeados como NNNN_descricao.sql.
+# Cada arquivo é aplicado uma única vez, em ordem, e a versão do banco é
+# registrada em PRAGMA user_version.
+DIRETORIO_MIGRACOES = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'migracoes')
+
+_PADRAO_ARQUIVO = re.compile(r'^(\d+)_[\w-]+\.sql$')
+
+_cache_migracoes = {}
+
+
+def listar_migracoes(diretorio: str = DIRETORIO_MIGRACOES) -> List[Tuple[int, str]]:
+    """Lista as migrações disponíveis como pares (versão, caminho), em ordem crescente.
+
+    Raises:
+        ValueError: Se duas migrações tiverem o mesmo número de versão.
+    """
+    if diretorio in _cache_migracoes:
+        return _cache_migracoes[diretorio]
+    migracoes = []
+    for nome_arquivo in os.listdir(diretorio):
+        correspondencia = _PADRAO_ARQUIVO.match(nome_arquivo)
+        if correspondencia:
+            migracoes.append((int(correspondencia.group(1)), os.path.join(diretorio, nome_arquivo)))
+    migracoes.sort()
+    versoes = [versao for versao, _ in migracoes]
+    if len(versoes) != len(set(versoes)):
+        raise ValueError(f"Há migrações com números de versão repetidos em {diretorio}.")
+    _cache_migracoes[diretorio] = migracoes
+    return migracoes
+
+
+def versao_atual(conn: sqlite3.Connection) -> int:
+    """Retorna a versão do esquema gravada no banco (PRAGMA user_version)."""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def _separar_comandos(script: str) -> List[str]:
+    """Divide um script SQL em comandos completos (respeitando blocos de TRIGGER)."""
+    comandos = []
+    atual = ''
+    for linha in script.splitlines(keepends=True):
+        atual += linha
+        if sqlite3.complete_statement(atual):
+            if atual.strip():
+                comandos.append(atual.strip())
+            atual = ''
+    restante = '\n'.join(l for l in atual.splitlines() if not l.strip().startswith('--')).strip()
+    if restante:
+        raise ValueError(f"Comando SQL incompleto no final do script: {restante[:80]}")
+    return comandos
+
+
+def aplicar_migracoes(conn: sqlite3.Connection, diretorio: str = DIRETORIO_MIGRACOES) -> List[int]:
+    """Aplica, em ordem, as migrações com versão maior que a do banco.
+
+    Se o banco já estiver na última versão, o custo é uma única leitura de
+    PRAGMA user_version. Cada migração roda em sua própria transação
+    (BEGIN IMMEDIATE), junto com a atualização de user_version; se falhar,
+    a transação é desfeita e o banco permanece na versão anterior.
+
+    Returns:
+        List[int]: Versões aplicadas nesta chamada.
+    """
+    migracoes = listar_migracoes(diretorio)
+    if not migracoes or versao_atual(conn) >= migracoes[-1][0]:
+        return []
+
+    if conn.in_transaction:
+        conn.commit()
+    aplicadas = []
+    for versao, caminho in migracoes:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            comandos = _separar_comandos(f.read())
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Verifica de novo dentro da transação: outro processo pode ter
+            # aplicado esta migração enquanto aguardávamos o lock de escrita.
+            if versao_atual(conn) >= versao:
+                conn.rollback()
+                continue
+            for comando in comandos:
+                conn.execute(comando)
+            conn.execute(f'PRAGMA user_version = {versao}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        aplicadas.append(versao)
+    return aplicadas
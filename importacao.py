@@ -0,0 +1,137 @@
+# laticinios_armazem/importacao.py
+
+import csv
+from typing import Any, Dict, IO, List, Optional, Tuple
+
+import metricas
+from models import AreaArmazem, ProdutoCatalogo, converter_data_iso, get_db_connection
+
+# Colunas obrigatórias do CSV de recebimento de estoque (a ordem não importa).
+COLUNAS_IMPORTACAO_ESTOQUE = ('id_area', 'id_catalogo_produto', 'quantidade', 'data_validade', 'lote')
+
+# Linhas enviadas ao SQLite por chamada de executemany.
+TAMANHO_LOTE_IMPORTACAO = 500
+
+# Número máximo de linhas de dados por arquivo; acima disso a importação é recusada.
+LINHAS_IMPORTACAO_MAX = 100_000
+
+# Número máximo de erros detalhados no relatório; os demais são apenas contados.
+ERROS_IMPORTACAO_MAX = 100
+
+# Mesmo upsert de AreaArmazem.adicionar_produto (soma a quantidade de lotes já existentes).
+_SQL_UPSERT_ESTOQUE = AreaArmazem._SQL_ADICIONAR_PRODUTO
+
+
+def _validar_linha(linha: Dict[str, Optional[str]], areas: set,
+                   catalogo: Dict[str, str]) -> Tuple[Optional[tuple], Optional[str]]:
+    """Valida uma linha do CSV e monta os parâmetros de _SQL_UPSERT_ESTOQUE.
+
+    Returns:
+        Tuple[Optional[tuple], Optional[str]]: (parâmetros, None) ou (None, motivo do erro).
+    """
+    valores = {coluna: (linha.get(coluna) or '').strip() for coluna in COLUNAS_IMPORTACAO_ESTOQUE}
+    vazias = [coluna for coluna, valor in valores.items() if not valor]
+    if vazias:
+        return None, f"Campo(s) vazio(s): {', '.join(vazias)}."
+    if valores['id_area'] not in areas:
+        return None, f"Área '{valores['id_area']}' não encontrada."
+    nome = catalogo.get(valores['id_catalogo_produto'])
+    if nome is None:
+        return None, f"Produto '{valores['id_catalogo_produto']}' não existe no catálogo."
+    try:
+        quantidade = int(valores['quantidade'])
+    except ValueError:
+        return None, f"Quantidade inválida: '{valores['quantidade']}'."
+    if quantidade <= 0:
+        return None, "A quantidade deve ser um número positivo."
+    try:
+        data_validade = converter_data_iso(valores['data_validade']).isoformat()
+    except ValueError:
+        return None, f"Data de validade inválida: '{valores['data_validade']}'. Use AAAA-MM-DD."
+    # Mesma normalização dos formulários: 'lote2025a' soma no lote 'LOTE2025A'.
+    return (valores['id_area'], valores['id_catalogo_produto'], nome, quantidade,
+            data_validade, valores['lote'].upper()), None
+
+
+def importar_estoque_csv(arquivo: IO[str]) -> Tuple[bool, Dict[str, Any]]:
+    """Importa um recebimento de estoque a partir de um CSV, em uma única transação.
+
+    O arquivo é lido linha a linha e cada linha é validada contra as áreas e
+    o catálogo, carregados uma única vez. Só depois de validar o arquivo
+    inteiro (guardando apenas os parâmetros das linhas válidas) a transação
+    de escrita é aberta, e as linhas são gravadas em blocos com executemany,
+    usando o mesmo upsert de AreaArmazem.adicionar_produto. Assim o bloqueio
+    de escrita não fica retido enquanto o upload é lido. Se alguma linha for
+    inválida, nada é gravado.
+
+    Args:
+        arquivo: Arquivo texto (UTF-8) com cabeçalho contendo COLUNAS_IMPORTACAO_ESTOQUE,
+            aberto com newline='' (como pede o módulo csv) e com no máximo
+            LINHAS_IMPORTACAO_MAX linhas de dados.
+
+    Returns:
+        Tuple[bool, Dict[str, Any]]: (sucesso, relatório) com 'linhas' (linhas de
+        dados lidas), 'aplicadas', 'erros' (lista de {'linha', 'mensagem'}, com a
+        numeração do arquivo, cabeçalho = 1) e 'total_erros'.
+    """
+    relatorio: Dict[str, Any] = {'linhas': 0, 'aplicadas': 0, 'erros': [], 'total_erros': 0}
+
+    def registrar_erro(linha: Optional[int], mensagem: str) -> None:
+        relatorio['total_erros'] += 1
+        if len(relatorio['erros']) < ERROS_IMPORTACAO_MAX:
+            relatorio['erros'].append({'linha': linha, 'mensagem': mensagem})
+
+    leitor = csv.DictReader(arquivo)
+    try:
+        colunas = leitor.fieldnames or []
+    except UnicodeDecodeError:
+        registrar_erro(1, "O arquivo não está em UTF-8. Salve o CSV com a codificação UTF-8.")
+        return False, relatorio
+    faltando = [c for c in COLUNAS_IMPORTACAO_ESTOQUE if c not in colunas]
+    if faltando:
+        registrar_erro(1, f"Coluna(s) ausente(s) no cabeçalho: {', '.join(faltando)}.")
+        return False, relatorio
+
+    areas = {area.id_area for area in AreaArmazem.listar_todas()}
+    catalogo = {produto.id_produto: produto.nome for produto in ProdutoCatalogo.listar_todos()}
+
+    validas: List[tuple] = []
+    unidades = 0
+    try:
+        for linha in leitor:
+            relatorio['linhas'] += 1
+            if relatorio['linhas'] > LINHAS_IMPORTACAO_MAX:
+                registrar_erro(leitor.line_num, f"O arquivo excede o limite de {LINHAS_IMPORTACAO_MAX} linhas "
+                                                "de dados. Divida o recebimento em arquivos menores.")
+                break
+            parametros, erro = _validar_linha(linha, areas, catalogo)
+            if erro:
+                registrar_erro(leitor.line_num, erro)
+            elif not relatorio['total_erros']:  # Depois do primeiro erro, só continua validando.
+                validas.append(parametros)
+                unidades += parametros[3]
+    except UnicodeDecodeError:
+        registrar_erro(leitor.line_num + 1, "O arquivo não está em UTF-8. Salve o CSV com a codificação UTF-8.")
+    if relatorio['total_erros']:
+        return False, relatorio
+    if relatorio['linhas'] == 0:
+        registrar_erro(1, 'O arquivo não contém linhas de dados.')
+        return False, relatorio
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        for inicio in range(0, len(validas), TAMANHO_LOTE_IMPORTACAO):
+            cursor.executemany(_SQL_UPSERT_ESTOQUE, validas[inicio:inicio + TAMANHO_LOTE_IMPORTACAO])
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        registrar_erro(None, f"Erro ao gravar a importação: {e}")
+        return False, relatorio
+    finally:
+        conn.close()
+    relatorio['aplicadas'] = len(validas)
+    metricas.recebimentos.inc(relatorio['aplicadas'], origem='importacao_csv')
+    metricas.unidades_recebidas.inc(unidades, origem='importacao_csv')
+    return True, relatorio
@@ -0,0 +1,168 @@
+# laticinios_armazem/instrumentacao.py
+
+import heapq
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Tuple
+
+from flask import g, has_request_context, request
+
+import conexao
+
+logger = logging.getLogger(__name__)
+
+# Quantas das consultas mais lentas de cada request são guardadas e registradas no log.
+CONSULTAS_LENTAS_POR_REQUEST = 3
+# Tamanho máximo do texto SQL exibido no log.
+TAMANHO_MAXIMO_SQL_LOG = 120
+
+_ativa = False
+# Coletor que recebe as consultas de todo o processo, dentro ou fora de requests (ver coletar_processo).
+_coletor_processo: Optional['ColetorConsultas'] = None
+
+
+class ColetorConsultas:
+    """Acumula o número de consultas, o tempo total no banco e as mais lentas de um request."""
+
+    def __init__(self):
+        self.total = 0
+        self.tempo_total = 0.0
+        self._lentas: List[Tuple[float, int, str]] = []
+
+    def registrar(self, sql: str, duracao: float) -> None:
+        self.total += 1
+        self.tempo_total += duracao
+        item = (duracao, self.total, sql)
+        if len(self._lentas) < CONSULTAS_LENTAS_POR_REQUEST:
+            heapq.heappush(self._lentas, item)
+        elif duracao > self._lentas[0][0]:
+            heapq.heapreplace(self._lentas, item)
+
+    def mais_lentas(self) -> List[Tuple[float, str]]:
+        """Retorna (duração em segundos, SQL) das consultas mais lentas, da mais lenta para a mais rápida."""
+        return [(duracao, sql) for duracao, _, sql in sorted(self._lentas, reverse=True)]
+
+
+def _registrar(sql: str, duracao: float) -> None:
+    if _coletor_processo is not None:
+        _coletor_processo.registrar(sql, duracao)
+    if has_request_context():
+        coletor = g.get('_coletor_consultas')
+        if coletor is not None:
+            coletor.registrar(sql, duracao)
+
+
+class CursorInstrumentado(conexao.CursorMonitorado):
+    """Cursor que mede o tempo de cada execute() e o registra no coletor do request atual.
+
+    O tempo medido é o da execução da instrução (até a primeira linha); linhas
+    lidas depois com fetchmany/fetchall não entram na medição.
+    """
+
+    def execute(self, sql: str, parametros: Any = (), /) -> sqlite3.Cursor:
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            _registrar(sql, time.perf_counter() - inicio)
+
+    def executemany(self, sql: str, parametros: Any, /) -> sqlite3.Cursor:
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, parametros)
+        finally:
+            _registrar(sql, time.perf_counter() - inicio)
+
+    def executescript(self, script: str, /) -> sqlite3.Cursor:
+        inicio = time.perf_counter()
+        try:
+            return super().executescript(script)
+        finally:
+            _registrar(script, time.perf_counter() - inicio)
+
+
+def ativar() -> None:
+    """Passa a medir as consultas de todos os requests (vale para conexões já abertas)."""
+    global _ativa
+    conexao.definir_fabrica_cursor(CursorInstrumentado)
+    _ativa = True
+
+
+def desativar() -> None:
+    """Deixa de medir as consultas; as conexões voltam a usar o cursor padrão."""
+    global _ativa
+    _ativa = False
+    conexao.definir_fabrica_cursor(None)
+
+
+def esta_ativa() -> bool:
+    return _ativa
+
+
+@contextmanager
+def coletar_processo() -> Iterator[ColetorConsultas]:
+    """Registra em um único coletor todas as consultas do processo enquanto o bloco durar.
+
+    Ao contrário da coleta por request, inclui as consultas feitas fora de um
+    request e as de respostas em streaming. Usado pelo benchmark, que roda
+    as requisições uma de cada vez (o coletor não é protegido para threads).
+    """
+    global _coletor_processo
+    coletor = ColetorConsultas()
+    _coletor_processo = coletor
+    if not _ativa:
+        conexao.definir_fabrica_cursor(CursorInstrumentado)
+    try:
+        yield coletor
+    finally:
+        _coletor_processo = None
+        if not _ativa:
+            conexao.definir_fabrica_cursor(None)
+
+
+def coletor_atual() -> Optional[ColetorConsultas]:
+    """Retorna o coletor do request atual, ou None se a instrumentação estiver desligada."""
+    return g.get('_coletor_consultas') if has_request_context() else None
+
+
+def _resumir_sql(sql: str) -> str:
+    sql = ' '.join(sql.split())
+    return sql if len(sql) <= TAMANHO_MAXIMO_SQL_LOG else sql[:TAMANHO_MAXIMO_SQL_LOG - 3] + '...'
+
+
+def init_app(app) -> None:
+    """Registra a coleta por request: cabeçalho Server-Timing e uma linha de log em nível DEBUG.
+
+    Configurações lidas de app.config:
+        INSTRUMENTACAO_SQL: liga a instrumentação na inicialização (padrão False).
+        Pode ser ligada e desligada depois com ativar()/desativar().
+    """
+    app.config.setdefault('INSTRUMENTACAO_SQL', False)
+    if app.config['INSTRUMENTACAO_SQL']:
+        ativar()
+
+    @app.before_request
+    def iniciar_coleta_consultas():
+        if _ativa:
+            g._coletor_consultas = ColetorConsultas()
+            g._inicio_request = time.perf_counter()
+
+    @app.after_request
+    def registrar_coleta_consultas(response):
+        coletor = g.pop('_coletor_consultas', None)
+        if coletor is None:
+            return response
+        tempo_request = time.perf_counter() - g.pop('_inicio_request')
+        # Respostas em streaming consultam o banco depois deste ponto e não entram na contagem.
+        response.headers.add('Server-Timing',
+                             f'db;dur={coletor.tempo_total * 1000:.2f};desc="{coletor.total} consultas"')
+        response.headers.add('Server-Timing', f'app;dur={tempo_request * 1000:.2f}')
+        if logger.isEnabledFor(logging.DEBUG):
+            lentas = '; '.join(f'{duracao * 1000:.2f} ms {_resumir_sql(sql)}'
+                               for duracao, sql in coletor.mais_lentas())
+            logger.debug('%s %s -> %s: %d consulta(s), %.2f ms no banco de %.2f ms. Mais lentas: %s',
+                         request.method, request.path, response.status_code, coletor.total,
+                         coletor.tempo_total * 1000, tempo_request * 1000, lentas or '-')
+        return response
@@ -0,0 +1,307 @@
+# laticinios_armazem/metricas.py
+
+import bisect
+import hmac
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import Response, abort, g, request
+
+# Limites (em segundos) dos buckets do histograma de duração dos requests.
+BUCKETS_DURACAO_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Content-Type do formato texto de exposição do Prometheus.
+CONTENT_TYPE_METRICAS = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Origens aceitas em /metrics quando não há METRICAS_TOKEN nem METRICAS_PUBLICO.
+ENDERECOS_LOCAIS = ('127.0.0.1', '::1')
+
+Amostra = Tuple[Dict[str, str], float]
+
+
+def _escapar(valor: Any) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_rotulos(nomes: Sequence[str], valores: Sequence[Any]) -> str:
+    if not nomes:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)) + '}'
+
+
+def _formatar_valor(valor: float) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor))
+
+
+class Contador:
+    """Contador monotônico com rótulos, seguro para threads.
+
+    Cada combinação de valores dos rótulos é uma série separada; inc() custa
+    uma aquisição de lock e uma soma em dicionário.
+    """
+
+    tipo = 'counter'
+
+    def __init__(self, nome: str, descricao: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _chave(self, rotulos: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(rotulos) != set(self.rotulos):
+            raise ValueError(f"A métrica '{self.nome}' exige os rótulos: {', '.join(self.rotulos) or 'nenhum'}.")
+        return tuple(str(rotulos[nome]) for nome in self.rotulos)
+
+    def inc(self, valor: float = 1.0, **rotulos: Any) -> None:
+        """Soma 'valor' (não negativo) à série dos rótulos informados."""
+        if valor < 0:
+            raise ValueError("Contadores só podem ser incrementados.")
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def valor(self, **rotulos: Any) -> float:
+        """Valor atual da série dos rótulos informados (0 se ainda não existir)."""
+        chave = self._chave(rotulos)
+        with self._lock:
+            return self._valores.get(chave, 0.0)
+
+    def linhas(self) -> List[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return [f'{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_valor(valor)}'
+                for chave, valor in valores]
+
+
+class Histograma:
+    """Histograma com buckets fixos e rótulos, seguro para threads."""
+
+    tipo = 'histogram'
+
+    def __init__(self, nome: str, descricao: str, rotulos: Sequence[str] = (),
+                 buckets: Sequence[float] = BUCKETS_DURACAO_PADRAO):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self.buckets = tuple(sorted(buckets))
+        # Por série: [contagem de cada bucket (não acumulada) + 1 para +Inf, soma, total].
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    _chave = Contador._chave
+
+    def observar(self, valor: float, **rotulos: Any) -> None:
+        """Registra uma observação (ex.: a duração de um request em segundos)."""
+        chave = self._chave(rotulos)
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def total(self, **rotulos: Any) -> int:
+        """Número de observações da série dos rótulos informados."""
+        chave = self._chave(rotulos)
+        with self._lock:
+            serie = self._series.get(chave)
+            return serie[2] if serie else 0
+
+    def linhas(self) -> List[str]:
+        with self._lock:
+            series = sorted((chave, (list(serie[0]), serie[1], serie[2])) for chave, serie in self._series.items())
+        linhas = []
+        nomes_bucket = self.rotulos + ('le',)
+        for chave, (contagens, soma, total) in series:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float('inf'),), contagens):
+                acumulado += contagem
+                rotulos = _formatar_rotulos(nomes_bucket, chave + (_formatar_valor(limite),))
+                linhas.append(f'{self.nome}_bucket{rotulos} {acumulado}')
+            rotulos = _formatar_rotulos(self.rotulos, chave)
+            linhas.append(f'{self.nome}_sum{rotulos} {_formatar_valor(soma)}')
+            linhas.append(f'{self.nome}_count{rotulos} {total}')
+        return linhas
+
+
+class MetricaCalculada:
+    """Métrica lida no momento da coleta (ex.: uso do pool), a partir de uma função.
+
+    'funcao' retorna uma lista de (rótulos, valor).
+    """
+
+    def __init__(self, nome: str, tipo: str, descricao: str, funcao: Callable[[], Iterable[Amostra]]):
+        self.nome = nome
+        self.tipo = tipo
+        self.descricao = descricao
+        self.funcao = funcao
+
+    def linhas(self) -> List[str]:
+        linhas = []
+        for rotulos, valor in self.funcao():
+            linhas.append(f'{self.nome}{_formatar_rotulos(tuple(rotulos), tuple(rotulos.values()))} '
+                          f'{_formatar_valor(valor)}')
+        return linhas
+
+
+class RegistroMetricas:
+    """Conjunto de métricas do processo, exportado no formato texto do Prometheus."""
+
+    def __init__(self):
+        self._metricas: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, metrica: Any) -> Any:
+        """Registra a métrica (substituindo outra de mesmo nome) e a retorna."""
+        with self._lock:
+            self._metricas[metrica.nome] = metrica
+        return metrica
+
+    def contador(self, nome: str, descricao: str, rotulos: Sequence[str] = ()) -> Contador:
+        return self.registrar(Contador(nome, descricao, rotulos))
+
+    def histograma(self, nome: str, descricao: str, rotulos: Sequence[str] = (),
+                   buckets: Sequence[float] = BUCKETS_DURACAO_PADRAO) -> Histograma:
+        return self.registrar(Histograma(nome, descricao, rotulos, buckets))
+
+    def calculada(self, nome: str, tipo: str, descricao: str,
+                  funcao: Callable[[], Iterable[Amostra]]) -> MetricaCalculada:
+        return self.registrar(MetricaCalculada(nome, tipo, descricao, funcao))
+
+    def exportar(self) -> str:
+        """Retorna todas as métricas no formato texto de exposição do Prometheus."""
+        with self._lock:
+            metricas = list(self._metricas.values())
+        linhas = []
+        for metrica in metricas:
+            linhas.append(f'# HELP {metrica.nome} {metrica.descricao}')
+            linhas.append(f'# TYPE {metrica.nome} {metrica.tipo}')
+            linhas.extend(metrica.linhas())
+        return '\n'.join(linhas) + '\n'
+
+
+# Registro do processo, exportado em /metrics.
+registro = RegistroMetricas()
+
+requisicoes = registro.contador(
+    'laticinios_http_requisicoes_total', 'Requests HTTP atendidos, por rota, método e status.',
+    ('rota', 'metodo', 'status'))
+duracao_requisicoes = registro.histograma(
+    'laticinios_http_duracao_segundos', 'Duração dos requests HTTP até o envio dos cabeçalhos, por rota e método.',
+    ('rota', 'metodo'))
+
+vendas = registro.contador(
+    'laticinios_vendas_total', 'Linhas de venda registradas, por operação.', ('operacao',))
+unidades_vendidas = registro.contador(
+    'laticinios_vendas_unidades_total', 'Unidades vendidas, por operação.', ('operacao',))
+recebimentos = registro.contador(
+    'laticinios_recebimentos_total', 'Lotes recebidos no estoque (inclusões e somas em lotes existentes), por origem.',
+    ('origem',))
+unidades_recebidas = registro.contador(
+    'laticinios_recebimentos_unidades_total', 'Unidades recebidas no estoque, por origem.', ('origem',))
+
+esperas_bloqueio = registro.contador(
+    'laticinios_sqlite_esperas_bloqueio_total',
+    'Transações de escrita abertas com BEGIN IMMEDIATE que aguardaram o bloqueio de outro escritor. '
+    'Esperas em escritas fora de BEGIN IMMEDIATE (transações implícitas) não são contadas.')
+tempo_espera_bloqueio = registro.contador(
+    'laticinios_sqlite_espera_bloqueio_segundos_total',
+    'Tempo total aguardando o bloqueio de escrita do SQLite em BEGIN IMMEDIATE '
+    '(esperas em transações implícitas não são contadas).')
+consultas_lentas = registro.contador(
+    'laticinios_sqlite_consultas_lentas_total', 'Instruções acima do limite do log de consultas lentas.')
+erros_bloqueio = registro.contador(
+    'laticinios_sqlite_erros_bloqueio_total',
+    'Instruções que falharam com "database is locked" ou "busy" após o busy_timeout.')
+
+
+def monitorar_pool(estatisticas_pool: Callable[[], Optional[Dict[str, Any]]]) -> None:
+    """Exporta o uso do pool de conexões (ver conexao.estatisticas_pool), lido a cada coleta."""
+    def campo(nome: str) -> Callable[[], List[Amostra]]:
+        def amostras() -> List[Amostra]:
+            estatisticas = estatisticas_pool()
+            return [({}, estatisticas[nome])] if estatisticas else []
+        return amostras
+
+    def conexoes() -> List[Amostra]:
+        estatisticas = estatisticas_pool()
+        if not estatisticas:
+            return []
+        return [({'estado': 'em_uso'}, estatisticas['em_uso']), ({'estado': 'livre'}, estatisticas['livres'])]
+
+    registro.calculada('laticinios_pool_tamanho', 'gauge', 'Número máximo de conexões do pool.', campo('tamanho'))
+    registro.calculada('laticinios_pool_conexoes', 'gauge', 'Conexões abertas pelo pool, por estado.', conexoes)
+    registro.calculada('laticinios_pool_esperas_total', 'counter',
+                       'Pedidos de conexão que encontraram o pool cheio.', campo('esperas'))
+    registro.calculada('laticinios_pool_espera_segundos_total', 'counter',
+                       'Tempo total aguardando uma conexão livre.', campo('tempo_espera'))
+    registro.calculada('laticinios_pool_esgotamentos_total', 'counter',
+                       'Pedidos de conexão que desistiram após o DB_POOL_TIMEOUT.', campo('esgotamentos'))
+
+
+def monitorar_caches(estatisticas_caches: Callable[[], Dict[str, Dict[str, Any]]]) -> None:
+    """Exporta acertos, falhas e taxa de acerto dos caches (ver models.estatisticas_caches)."""
+    def campo(nome: str) -> Callable[[], List[Amostra]]:
+        def amostras() -> List[Amostra]:
+            return [({'cache': cache}, valores[nome]) for cache, valores in sorted(estatisticas_caches().items())]
+        return amostras
+
+    registro.calculada('laticinios_cache_acertos_total', 'counter', 'Leituras atendidas pelo cache.',
+                       campo('acertos'))
+    registro.calculada('laticinios_cache_falhas_total', 'counter', 'Leituras que precisaram carregar o valor.',
+                       campo('falhas'))
+    registro.calculada('laticinios_cache_taxa_acerto', 'gauge', 'Fração das leituras atendidas pelo cache.',
+                       campo('taxa_acerto'))
+
+
+def init_app(app) -> None:
+    """Mede os requests por rota e registra o endpoint /metrics.
+
+    Configurações lidas de app.config:
+        METRICAS_ATIVAS: registra a medição e o endpoint (padrão True).
+        METRICAS_TOKEN: se definido, /metrics exige o cabeçalho 'Authorization: Bearer <token>'.
+        METRICAS_PUBLICO: sem token, libera /metrics para qualquer origem (padrão False).
+
+    Sem METRICAS_TOKEN e sem METRICAS_PUBLICO, /metrics só responde a conexões
+    locais (127.0.0.1 ou ::1). Atrás de um proxy reverso na mesma máquina todas
+    as conexões parecem locais; nesse caso, defina o token.
+    """
+    app.config.setdefault('METRICAS_ATIVAS', True)
+    app.config.setdefault('METRICAS_TOKEN', None)
+    app.config.setdefault('METRICAS_PUBLICO', False)
+    if not app.config['METRICAS_ATIVAS']:
+        return
+
+    @app.before_request
+    def iniciar_medicao_request():
+        g._inicio_metricas = time.perf_counter()
+
+    @app.after_request
+    def registrar_medicao_request(response):
+        inicio = g.pop('_inicio_metricas', None)
+        if inicio is not None:
+            # Usa o padrão da rota (ex.: /armazem/<id_area>) para não criar uma série por URL.
+            rota = request.url_rule.rule if request.url_rule is not None else 'desconhecida'
+            duracao_requisicoes.observar(time.perf_counter() - inicio, rota=rota, metodo=request.method)
+            requisicoes.inc(rota=rota, metodo=request.method, status=response.status_code)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def exportar_metricas():
+        """Endpoint de coleta do Prometheus."""
+        token: Optional[str] = app.config['METRICAS_TOKEN']
+        if token:
+            # Comparação em tempo constante, para não revelar o token pelo tempo de resposta.
+            fornecido = request.headers.get('Authorization', '')
+            if not hmac.compare_digest(fornecido.encode(), f'Bearer {token}'.encode()):
+                abort(401)
+        elif not app.config['METRICAS_PUBLICO'] and request.remote_addr not in ENDERECOS_LOCAIS:
+            abort(403)
+        return Response(registro.exportar(), content_type=CONTENT_TYPE_METRICAS)
@@ -1,4 +1,4 @@
--- laticinios_armazem/schema.sql
+-- laticinios_armazem/migracoes/0001_esquema_inicial.sql
 
 -- Tabela para usuários
 CREATE TABLE IF NOT EXISTS usuarios (
@@ -50,4 +50,4 @@ CREATE TABLE IF NOT EXISTS vendas (
     FOREIGN KEY (id_catalogo_produto) REFERENCES produtos_catalogo(id_produto),
     FOREIGN KEY (area_origem_id) REFERENCES areas_armazem(id_area),
     FOREIGN KEY (usuario_responsavel) REFERENCES usuarios(username)
-);
\ No newline at end of file
+);
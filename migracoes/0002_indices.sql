@@ -0,0 +1,14 @@
+-- laticinios_armazem/migracoes/0002_indices.sql
+
+-- Índices secundários para os caminhos de acesso mais frequentes
+-- Produtos de uma área ordenados por validade (AreaArmazem.listar_produtos)
+CREATE INDEX IF NOT EXISTS idx_produtos_areas_area_validade ON produtos_areas (id_area, data_validade);
+-- Alertas de validade (data_validade <= ?)
+CREATE INDEX IF NOT EXISTS idx_produtos_areas_validade ON produtos_areas (data_validade);
+-- Verificação de uso do produto antes de excluí-lo do catálogo
+CREATE INDEX IF NOT EXISTS idx_produtos_areas_catalogo ON produtos_areas (id_catalogo_produto);
+-- Histórico de vendas ordenado por data (Venda.listar_todas)
+CREATE INDEX IF NOT EXISTS idx_vendas_data_hora ON vendas (data_hora);
+-- Vendas por produto do catálogo e por lote
+CREATE INDEX IF NOT EXISTS idx_vendas_catalogo ON vendas (id_catalogo_produto);
+CREATE INDEX IF NOT EXISTS idx_vendas_lote ON vendas (lote);
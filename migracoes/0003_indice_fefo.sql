@@ -0,0 +1,8 @@
+-- laticinios_armazem/migracoes/0003_indice_fefo.sql
+
+-- Alocação FEFO (primeiro a vencer, primeiro a sair): lotes de um produto em
+-- ordem de validade viram uma única leitura ordenada de faixa no índice.
+-- O índice composto também atende à contagem por id_catalogo_produto feita
+-- antes de excluir um produto do catálogo, substituindo o índice simples.
+CREATE INDEX IF NOT EXISTS idx_produtos_areas_catalogo_validade ON produtos_areas (id_catalogo_produto, data_validade);
+DROP INDEX IF EXISTS idx_produtos_areas_catalogo;
@@ -0,0 +1,31 @@
+-- laticinios_armazem/migracoes/0004_geracoes_cache.sql
+
+-- Contador de geração das tabelas de referência mantidas em cache (ver
+-- CacheReferencia em cache.py). Toda escrita incrementa a geração na mesma
+-- transação, de modo que qualquer processo percebe que seu cache ficou velho.
+CREATE TABLE IF NOT EXISTS geracoes_cache (
+    nome TEXT PRIMARY KEY,
+    geracao INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO geracoes_cache (nome, geracao) VALUES ('areas_armazem', 0), ('produtos_catalogo', 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_areas_armazem_geracao_insert AFTER INSERT ON areas_armazem BEGIN
+    UPDATE geracoes_cache SET geracao = geracao + 1 WHERE nome = 'areas_armazem';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_areas_armazem_geracao_update AFTER UPDATE ON areas_armazem BEGIN
+    UPDATE geracoes_cache SET geracao = geracao + 1 WHERE nome = 'areas_armazem';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_areas_armazem_geracao_delete AFTER DELETE ON areas_armazem BEGIN
+    UPDATE geracoes_cache SET geracao = geracao + 1 WHERE nome = 'areas_armazem';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_produtos_catalogo_geracao_insert AFTER INSERT ON produtos_catalogo BEGIN
+    UPDATE geracoes_cache SET geracao = geracao + 1 WHERE nome = 'produtos_catalogo';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_produtos_catalogo_geracao_update AFTER UPDATE ON produtos_catalogo BEGIN
+    UPDATE geracoes_cache SET geracao = geracao + 1 WHERE nome = 'produtos_catalogo';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_produtos_catalogo_geracao_delete AFTER DELETE ON produtos_catalogo BEGIN
+    UPDATE geracoes_cache SET geracao = geracao + 1 WHERE nome = 'produtos_catalogo';
+END;
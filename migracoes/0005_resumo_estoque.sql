@@ -0,0 +1,86 @@
+-- laticinios_armazem/migracoes/0005_resumo_estoque.sql
+
+-- Resumo materializado do estoque, mantido por triggers em produtos_areas.
+-- Toda escrita no estoque (recebimento, edição, venda, exclusão) atualiza os
+-- totais na mesma transação, então os painéis leem uma linha por produto em
+-- vez de somar todos os lotes. Ver relatorios.verificar_resumo_estoque.
+
+-- Totais por área e produto.
+CREATE TABLE IF NOT EXISTS resumo_estoque_area (
+    id_area TEXT NOT NULL,
+    id_catalogo_produto TEXT NOT NULL,
+    quantidade_total INTEGER NOT NULL,
+    lotes INTEGER NOT NULL,
+    PRIMARY KEY (id_area, id_catalogo_produto)
+) WITHOUT ROWID;
+
+-- Totais por produto, somando todas as áreas.
+CREATE TABLE IF NOT EXISTS resumo_estoque_produto (
+    id_catalogo_produto TEXT PRIMARY KEY,
+    quantidade_total INTEGER NOT NULL,
+    lotes INTEGER NOT NULL
+) WITHOUT ROWID;
+
+INSERT INTO resumo_estoque_area (id_area, id_catalogo_produto, quantidade_total, lotes)
+SELECT id_area, id_catalogo_produto, SUM(quantidade), COUNT(*)
+FROM produtos_areas
+GROUP BY id_area, id_catalogo_produto;
+
+INSERT INTO resumo_estoque_produto (id_catalogo_produto, quantidade_total, lotes)
+SELECT id_catalogo_produto, SUM(quantidade), COUNT(*)
+FROM produtos_areas
+GROUP BY id_catalogo_produto;
+
+CREATE TRIGGER IF NOT EXISTS trg_produtos_areas_resumo_insert AFTER INSERT ON produtos_areas BEGIN
+    INSERT INTO resumo_estoque_area (id_area, id_catalogo_produto, quantidade_total, lotes)
+    VALUES (new.id_area, new.id_catalogo_produto, new.quantidade, 1)
+    ON CONFLICT (id_area, id_catalogo_produto) DO UPDATE
+        SET quantidade_total = quantidade_total + excluded.quantidade_total, lotes = lotes + 1;
+    INSERT INTO resumo_estoque_produto (id_catalogo_produto, quantidade_total, lotes)
+    VALUES (new.id_catalogo_produto, new.quantidade, 1)
+    ON CONFLICT (id_catalogo_produto) DO UPDATE
+        SET quantidade_total = quantidade_total + excluded.quantidade_total, lotes = lotes + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_produtos_areas_resumo_delete AFTER DELETE ON produtos_areas BEGIN
+    UPDATE resumo_estoque_area SET quantidade_total = quantidade_total - old.quantidade, lotes = lotes - 1
+    WHERE id_area = old.id_area AND id_catalogo_produto = old.id_catalogo_produto;
+    DELETE FROM resumo_estoque_area
+    WHERE id_area = old.id_area AND id_catalogo_produto = old.id_catalogo_produto AND lotes <= 0;
+    UPDATE resumo_estoque_produto SET quantidade_total = quantidade_total - old.quantidade, lotes = lotes - 1
+    WHERE id_catalogo_produto = old.id_catalogo_produto;
+    DELETE FROM resumo_estoque_produto
+    WHERE id_catalogo_produto = old.id_catalogo_produto AND lotes <= 0;
+END;
+
+-- Caso comum (venda, ajuste de quantidade): a linha continua na mesma área e produto.
+CREATE TRIGGER IF NOT EXISTS trg_produtos_areas_resumo_update_quantidade
+AFTER UPDATE OF quantidade ON produtos_areas
+WHEN new.id_area = old.id_area AND new.id_catalogo_produto = old.id_catalogo_produto BEGIN
+    UPDATE resumo_estoque_area SET quantidade_total = quantidade_total + (new.quantidade - old.quantidade)
+    WHERE id_area = new.id_area AND id_catalogo_produto = new.id_catalogo_produto;
+    UPDATE resumo_estoque_produto SET quantidade_total = quantidade_total + (new.quantidade - old.quantidade)
+    WHERE id_catalogo_produto = new.id_catalogo_produto;
+END;
+
+-- Mudança de área ou de produto: move a linha inteira entre os grupos.
+CREATE TRIGGER IF NOT EXISTS trg_produtos_areas_resumo_update_grupo
+AFTER UPDATE OF id_area, id_catalogo_produto ON produtos_areas
+WHEN new.id_area <> old.id_area OR new.id_catalogo_produto <> old.id_catalogo_produto BEGIN
+    UPDATE resumo_estoque_area SET quantidade_total = quantidade_total - old.quantidade, lotes = lotes - 1
+    WHERE id_area = old.id_area AND id_catalogo_produto = old.id_catalogo_produto;
+    DELETE FROM resumo_estoque_area
+    WHERE id_area = old.id_area AND id_catalogo_produto = old.id_catalogo_produto AND lotes <= 0;
+    UPDATE resumo_estoque_produto SET quantidade_total = quantidade_total - old.quantidade, lotes = lotes - 1
+    WHERE id_catalogo_produto = old.id_catalogo_produto;
+    DELETE FROM resumo_estoque_produto
+    WHERE id_catalogo_produto = old.id_catalogo_produto AND lotes <= 0;
+    INSERT INTO resumo_estoque_area (id_area, id_catalogo_produto, quantidade_total, lotes)
+    VALUES (new.id_area, new.id_catalogo_produto, new.quantidade, 1)
+    ON CONFLICT (id_area, id_catalogo_produto) DO UPDATE
+        SET quantidade_total = quantidade_total + excluded.quantidade_total, lotes = lotes + 1;
+    INSERT INTO resumo_estoque_produto (id_catalogo_produto, quantidade_total, lotes)
+    VALUES (new.id_catalogo_produto, new.quantidade, 1)
+    ON CONFLICT (id_catalogo_produto) DO UPDATE
+        SET quantidade_total = quantidade_total + excluded.quantidade_total, lotes = lotes + 1;
+END;
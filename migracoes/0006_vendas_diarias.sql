@@ -0,0 +1,38 @@
+-- laticinios_armazem/migracoes/0006_vendas_diarias.sql
+
+-- Consolidação diária das vendas, mantida por triggers em vendas. Consultas
+-- de período (unidades por produto, dia, área ou destino) leem uma linha por
+-- combinação em vez de varrer o histórico. Ver relatorios.vendas_por_periodo.
+CREATE TABLE IF NOT EXISTS vendas_diarias (
+    data DATE NOT NULL,
+    id_catalogo_produto TEXT NOT NULL,
+    area_origem_id TEXT NOT NULL,
+    destino TEXT NOT NULL,
+    unidades INTEGER NOT NULL,
+    vendas INTEGER NOT NULL,
+    PRIMARY KEY (data, id_catalogo_produto, area_origem_id, destino)
+) WITHOUT ROWID;
+
+-- Séries de um produto ao longo do tempo.
+CREATE INDEX IF NOT EXISTS idx_vendas_diarias_produto_data ON vendas_diarias(id_catalogo_produto, data);
+
+INSERT INTO vendas_diarias (data, id_catalogo_produto, area_origem_id, destino, unidades, vendas)
+SELECT date(data_hora), id_catalogo_produto, area_origem_id, destino, SUM(quantidade_vendida), COUNT(*)
+FROM vendas
+GROUP BY date(data_hora), id_catalogo_produto, area_origem_id, destino;
+
+CREATE TRIGGER IF NOT EXISTS trg_vendas_diarias_insert AFTER INSERT ON vendas BEGIN
+    INSERT INTO vendas_diarias (data, id_catalogo_produto, area_origem_id, destino, unidades, vendas)
+    VALUES (date(new.data_hora), new.id_catalogo_produto, new.area_origem_id, new.destino, new.quantidade_vendida, 1)
+    ON CONFLICT (data, id_catalogo_produto, area_origem_id, destino) DO UPDATE
+        SET unidades = unidades + excluded.unidades, vendas = vendas + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_vendas_diarias_delete AFTER DELETE ON vendas BEGIN
+    UPDATE vendas_diarias SET unidades = unidades - old.quantidade_vendida, vendas = vendas - 1
+    WHERE data = date(old.data_hora) AND id_catalogo_produto = old.id_catalogo_produto
+      AND area_origem_id = old.area_origem_id AND destino = old.destino;
+    DELETE FROM vendas_diarias
+    WHERE data = date(old.data_hora) AND id_catalogo_produto = old.id_catalogo_produto
+      AND area_origem_id = old.area_origem_id AND destino = old.destino AND vendas <= 0;
+END;
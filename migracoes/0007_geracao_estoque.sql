@@ -0,0 +1,15 @@
+-- laticinios_armazem/migracoes/0007_geracao_estoque.sql
+
+-- Contador de geração do estoque (produtos_areas), usado para invalidar os
+-- alertas de validade em cache a cada recebimento, venda, edição ou exclusão.
+INSERT OR IGNORE INTO geracoes_cache (nome, geracao) VALUES ('produtos_areas', 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_produtos_areas_geracao_insert AFTER INSERT ON produtos_areas BEGIN
+    UPDATE geracoes_cache SET geracao = geracao + 1 WHERE nome = 'produtos_areas';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_produtos_areas_geracao_update AFTER UPDATE ON produtos_areas BEGIN
+    UPDATE geracoes_cache SET geracao = geracao + 1 WHERE nome = 'produtos_areas';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_produtos_areas_geracao_delete AFTER DELETE ON produtos_areas BEGIN
+    UPDATE geracoes_cache SET geracao = geracao + 1 WHERE nome = 'produtos_areas';
+END;
@@ -0,0 +1,13 @@
+-- laticinios_armazem/migracoes/0008_geracao_usuarios.sql
+
+-- Contador de geração dos usuários, usado para invalidar o cache de autenticação
+-- (ver Usuario.autenticar) em todos os processos quando uma senha ou função muda
+-- ou um usuário é removido.
+INSERT OR IGNORE INTO geracoes_cache (nome, geracao) VALUES ('usuarios', 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_usuarios_geracao_update AFTER UPDATE ON usuarios BEGIN
+    UPDATE geracoes_cache SET geracao = geracao + 1 WHERE nome = 'usuarios';
+END;
+CREATE TRIGGER IF NOT EXISTS trg_usuarios_geracao_delete AFTER DELETE ON usuarios BEGIN
+    UPDATE geracoes_cache SET geracao = geracao + 1 WHERE nome = 'usuarios';
+END;
@@ -0,0 +1,18 @@
+-- laticinios_armazem/migracoes/0009_vendas_diarias_update.sql
+
+-- Mantém vendas_diarias correta quando uma venda é corrigida: retira a linha
+-- antiga (como trg_vendas_diarias_delete) e soma a nova (como
+-- trg_vendas_diarias_insert). Só dispara se mudar uma coluna consolidada.
+CREATE TRIGGER IF NOT EXISTS trg_vendas_diarias_update
+AFTER UPDATE OF data_hora, id_catalogo_produto, area_origem_id, destino, quantidade_vendida ON vendas BEGIN
+    UPDATE vendas_diarias SET unidades = unidades - old.quantidade_vendida, vendas = vendas - 1
+    WHERE data = date(old.data_hora) AND id_catalogo_produto = old.id_catalogo_produto
+      AND area_origem_id = old.area_origem_id AND destino = old.destino;
+    DELETE FROM vendas_diarias
+    WHERE data = date(old.data_hora) AND id_catalogo_produto = old.id_catalogo_produto
+      AND area_origem_id = old.area_origem_id AND destino = old.destino AND vendas <= 0;
+    INSERT INTO vendas_diarias (data, id_catalogo_produto, area_origem_id, destino, unidades, vendas)
+    VALUES (date(new.data_hora), new.id_catalogo_produto, new.area_origem_id, new.destino, new.quantidade_vendida, 1)
+    ON CONFLICT (data, id_catalogo_produto, area_origem_id, destino) DO UPDATE
+        SET unidades = unidades + excluded.unidades, vendas = vendas + 1;
+END;
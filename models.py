@@ -1,44 +1,166 @@
 # laticinios_armazem/models.py
 
+import base64
+import logging
+import os
 import sqlite3
-from datetime import datetime, date
-from typing import Optional, List, Dict, Any
+from datetime import datetime, date, timedelta
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Sequence
+
+import conexao
+import esquema
+import metricas
+from cache import CacheReferencia, CacheTTL
+
+logger = logging.getLogger(__name__)
 
 # Define o caminho para o arquivo do banco de dados SQLite.
-DATABASE_PATH = 'data/laticinios.db'
+# Pode ser sobrescrito pela variável de ambiente LATICINIOS_DATABASE_PATH. Importar o app
+# aplica as migrações a este banco: testes e benchmarks definem a variável (ou DATABASE_PATH)
+# antes, para nunca alterar o data/laticinios.db versionado.
+DATABASE_PATH = os.environ.get('LATICINIOS_DATABASE_PATH', 'data/laticinios.db')
+
+# Paginação do histórico de vendas.
+VENDAS_POR_PAGINA = 50
+VENDAS_POR_PAGINA_MAX = 500
+# Número máximo de linhas aceitas em uma venda em lote (Venda.vender_lote).
+ITENS_VENDA_LOTE_MAX = 500
+# Colunas de vendas que podem ser usadas como filtro de igualdade em Venda.listar_pagina.
+FILTROS_VENDAS = ('id_catalogo_produto', 'area_origem_id', 'destino', 'lote', 'usuario_responsavel')
+
+# Cache de autenticação em nível de processo (ver Usuario.autenticar), validado pela
+# geração da tabela usuarios. Desativado por padrão (ttl=0); o app informa o TTL de app.config.
+cache_usuarios = CacheTTL(ttl=0)
+
+# Quantidade de datas distintas mantidas pelo conversor memoizado (ver converter_data_iso).
+DATAS_EM_CACHE = 4096
+
+@lru_cache(maxsize=DATAS_EM_CACHE)
+def converter_data_iso(texto: str) -> date:
+    """Converte uma data no formato AAAA-MM-DD em date, memoizando o resultado.
+
+    Um estoque tem muito menos datas de validade distintas que lotes, então a
+    conversão de cada data acontece uma única vez. Aceita apenas o formato
+    AAAA-MM-DD (date.fromisoformat sozinho aceitaria também AAAAMMDD, por exemplo).
+
+    Raises:
+        ValueError: Se o texto não estiver no formato AAAA-MM-DD.
+    """
+    if len(texto) != 10 or texto[4] != '-' or texto[7] != '-':
+        raise ValueError(f"Data fora do formato AAAA-MM-DD: '{texto}'")
+    return date.fromisoformat(texto)
+
+@lru_cache(maxsize=DATAS_EM_CACHE)
+def converter_data_hora_iso(texto: str) -> datetime:
+    """Converte uma data e hora gravada (AAAA-MM-DD HH:MM:SS) em datetime, memoizando o resultado.
+
+    Raises:
+        ValueError: Se o texto não for uma data e hora ISO válida.
+    """
+    return datetime.fromisoformat(texto)
+
+def _data_gravada(texto: str) -> date:
+    """Converte a data de uma linha já gravada no banco.
+
+    Usa converter_data_iso e, para linhas antigas fora do formato AAAA-MM-DD
+    (ex.: '2025-1-5', aceito pelo strptime de versões anteriores), volta ao
+    conversor antigo e registra um aviso, em vez de falhar a listagem inteira.
+    """
+    try:
+        return converter_data_iso(texto)
+    except ValueError:
+        logger.warning("Data gravada fora do formato AAAA-MM-DD: '%s'", texto)
+        return datetime.strptime(texto, '%Y-%m-%d').date()
+
+def _data_hora_gravada(texto: str) -> datetime:
+    """Converte a data e hora de uma linha já gravada, com a mesma tolerância de _data_gravada."""
+    try:
+        return converter_data_hora_iso(texto)
+    except ValueError:
+        logger.warning("Data e hora gravada fora do formato AAAA-MM-DD HH:MM:SS: '%s'", texto)
+        return datetime.strptime(texto, '%Y-%m-%d %H:%M:%S')
+
+def geracao_cache(nome: str) -> int:
+    """Retorna o contador de geração de uma tabela de referência (tabela geracoes_cache).
+
+    O contador é incrementado por triggers a cada escrita na tabela, inclusive
+    por outros processos, e é usado para validar os caches de referência.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT geracao FROM geracoes_cache WHERE nome = ?', (nome,))
+    row = cursor.fetchone()
+    conn.close()
+    return row['geracao'] if row else 0
+
+def geracoes_cache(nomes: Sequence[str]) -> Dict[str, int]:
+    """Como geracao_cache(), mas lê os contadores de várias tabelas em uma única consulta."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            f'SELECT nome, geracao FROM geracoes_cache WHERE nome IN ({", ".join("?" * len(nomes))})', tuple(nomes))
+        geracoes = {row['nome']: row['geracao'] for row in cursor}
+    finally:
+        conn.close()
+    return {nome: geracoes.get(nome, 0) for nome in nomes}
+
+# Caches de leitura do catálogo e das áreas (ver ProdutoCatalogo.listar_todos e
+# AreaArmazem.listar_todas), validados pelo contador de geração do banco.
+# A marca inclui o caminho do banco para que trocar de banco (ex.: em testes)
+# nunca reaproveite a lista de outro arquivo com a mesma geração.
+def _marca_cache(nome: str) -> tuple:
+    return (DATABASE_PATH, geracao_cache(nome))
+
+cache_catalogo = CacheReferencia('produtos_catalogo', _marca_cache)
+cache_areas = CacheReferencia('areas_armazem', _marca_cache)
+
+# Caches incluídos em estatisticas_caches(); outros módulos podem registrar os seus.
+caches_monitorados: Dict[str, Any] = {
+    'usuarios': cache_usuarios,
+    'catalogo': cache_catalogo,
+    'areas': cache_areas,
+}
+
+def estatisticas_caches() -> Dict[str, Dict[str, Any]]:
+    """Retorna as estatísticas de acertos e falhas de todos os caches monitorados do processo."""
+    return {nome: cache.estatisticas() for nome, cache in caches_monitorados.items()}
 
 def get_db_connection() -> sqlite3.Connection:
-    """Estabelece e retorna uma conexão com o banco de dados SQLite.
+    """Retorna uma conexão com o banco de dados SQLite obtida do pool.
 
     A conexão é configurada para retornar linhas como objetos sqlite3.Row,
-    o que permite o acesso às colunas por nome.
+    o que permite o acesso às colunas por nome. Chamar close() devolve a
+    conexão ao pool; durante um request do Flask, a mesma conexão é
+    reutilizada por todos os métodos dos modelos (ver conexao.py).
 
     Returns:
         sqlite3.Connection: Objeto de conexão com o banco de dados.
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row  # Permite acessar colunas por nome
-    return conn
+    return conexao.obter_conexao(DATABASE_PATH)
 
 def init_db() -> None:
-    """Inicializa o banco de dados criando as tabelas a partir do schema.sql.
+    """Inicializa o banco de dados aplicando as migrações pendentes.
 
-    Lê o arquivo schema.sql e executa os comandos SQL para criar a estrutura
-    do banco de dados, caso ela ainda não exista.
+    As migrações ficam no diretório migracoes/ (ver esquema.py) e a versão do
+    banco é controlada por PRAGMA user_version, de modo que um banco já
+    atualizado custa apenas uma verificação de versão na inicialização.
+    Também aplica o perfil de armazenamento configurado (journal_mode).
     """
-    # Garante que o schema.sql seja lido do diretório correto onde o models.py está
-    import os
-    dir_path = os.path.dirname(os.path.realpath(__file__))
-    schema_file_path = os.path.join(dir_path, 'schema.sql')
     try:
-        with open(schema_file_path, 'r') as f:
-            schema = f.read()
         conn = get_db_connection()
-        conn.executescript(schema)
-        conn.commit()
-        conn.close()
+        try:
+            # Ativa o journal WAL (e demais PRAGMAs persistentes) do perfil configurado.
+            conexao.aplicar_perfil_persistente(conn)
+            aplicadas = esquema.aplicar_migracoes(conn)
+            if aplicadas:
+                print(f"Migrações aplicadas ao banco de dados: {', '.join(map(str, aplicadas))}.")
+        finally:
+            conn.close()
+            cache_catalogo.invalidar()
+            cache_areas.invalidar()
     except FileNotFoundError:
-        print(f"Erro: O arquivo schema.sql não foi encontrado em {schema_file_path}. O banco de dados pode não ser inicializado corretamente.")
+        print(f"Erro: O diretório de migrações não foi encontrado em {esquema.DIRETORIO_MIGRACOES}. O banco de dados pode não ser inicializado corretamente.")
     except Exception as e:
         print(f"Erro ao inicializar o banco de dados: {e}")
 
@@ -61,6 +183,23 @@ class Usuario:
             return Usuario(user_data['username'], user_data['funcao'], user_data['nome'])
         return None
 
+    @staticmethod
+    def autenticar(username: str, senha: str, ttl: Optional[float] = None,
+                   id_sessao: Optional[str] = None) -> Optional['Usuario']:
+        """Como verificar_senha, mas usando o cache de autenticação do processo.
+
+        Credenciais válidas ficam em cache_usuarios por 'ttl' segundos (padrão:
+        cache_usuarios.ttl; 0 desativa o cache), indexadas pela sessão
+        ('id_sessao'); sem sessão, ou com credenciais inválidas, o banco é sempre
+        consultado. A chave inclui a geração da tabela usuarios, incrementada
+        por triggers a cada alteração ou exclusão de usuário: uma senha ou
+        função alterada, por qualquer processo, invalida as entradas na hora.
+        """
+        if id_sessao is None:
+            return Usuario.verificar_senha(username, senha)
+        chave = (_marca_cache('usuarios'), id_sessao, username)
+        return cache_usuarios.obter(chave, lambda: Usuario.verificar_senha(username, senha), ttl)
+
     def tem_permissao(self, permissao: str) -> bool:
         """Verifica se o usuário tem uma determinada permissão com base em sua função."""
         permissoes_por_funcao = {
@@ -76,6 +215,8 @@ class Usuario:
 
 class ProdutoCatalogo:
     """Representa um item no catálogo de produtos."""
+    __slots__ = ('id_produto', 'nome')
+
     def __init__(self, id_produto: str, nome: str):
         self.id_produto = id_produto
         self.nome = nome
@@ -96,6 +237,7 @@ class ProdutoCatalogo:
             return None
         finally:
             conn.close()
+            cache_catalogo.invalidar()
 
     def atualizar(self, novo_nome: str) -> bool:
         """Atualiza o nome deste produto no catálogo e em todas as instâncias em produtos_areas."""
@@ -120,6 +262,7 @@ class ProdutoCatalogo:
             return False
         finally:
             conn.close()
+            cache_catalogo.invalidar()
 
     def deletar(self) -> tuple[bool, str]:
         """Deleta este produto do catálogo.
@@ -145,6 +288,7 @@ class ProdutoCatalogo:
             return False, f"Erro ao excluir produto do catálogo: {e}"
         finally:
             conn.close()
+            cache_catalogo.invalidar()
 
     @staticmethod
     def buscar_por_id(id_produto: str) -> Optional['ProdutoCatalogo']:
@@ -160,7 +304,15 @@ class ProdutoCatalogo:
 
     @staticmethod
     def listar_todos() -> List['ProdutoCatalogo']:
-        """Lista todos os produtos cadastrados no catálogo."""
+        """Lista todos os produtos cadastrados no catálogo.
+
+        A lista vem de cache_catalogo e só é relida do banco quando o catálogo
+        muda; cada chamada recebe uma cópia da lista.
+        """
+        return list(cache_catalogo.obter(ProdutoCatalogo._carregar_todos))
+
+    @staticmethod
+    def _carregar_todos() -> List['ProdutoCatalogo']:
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute('SELECT * FROM produtos_catalogo ORDER BY nome')
@@ -177,18 +329,36 @@ class ProdutoCatalogo:
 
 class ProdutoLacteo:
     """Representa um produto lácteo específico em estoque (uma instância em produtos_areas)."""
+    __slots__ = ('id', 'id_catalogo_produto', 'nome', 'quantidade', 'data_validade', 'lote')
+
+    # Colunas lidas de produtos_areas, na ordem esperada por _de_linha.
+    _COLUNAS = 'id, id_catalogo_produto, nome, quantidade, data_validade, lote'
+
     def __init__(self, id_catalogo_produto: str, nome: str, quantidade: int, data_validade_str: str, lote: str, id_instancia: Optional[int] = None):
-        # 'id_instancia' é a chave primária da tabela produtos_areas, que no schema.sql é 'id'
+        # 'id_instancia' é a chave primária da tabela produtos_areas, que no esquema (migracoes/0001_esquema_inicial.sql) é 'id'
         self.id = id_instancia 
         self.id_catalogo_produto = id_catalogo_produto
         self.nome = nome
         self.quantidade = quantidade
         try:
-            self.data_validade = datetime.strptime(data_validade_str, '%Y-%m-%d').date()
+            self.data_validade = converter_data_iso(data_validade_str)
         except ValueError:
             raise ValueError(f"Formato de data inválido para '{data_validade_str}'. Use AAAA-MM-DD.")
         self.lote = lote
 
+    @staticmethod
+    def _de_linha(row: sqlite3.Row) -> 'ProdutoLacteo':
+        """Cria um ProdutoLacteo a partir de uma linha com as colunas de _COLUNAS.
+
+        Caminho rápido para leituras em massa: desempacota a linha por posição
+        e usa o conversor de datas memoizado, sem revalidar dados já gravados.
+        """
+        produto = ProdutoLacteo.__new__(ProdutoLacteo)
+        (produto.id, produto.id_catalogo_produto, produto.nome, produto.quantidade,
+         data_validade, produto.lote) = row
+        produto.data_validade = _data_gravada(data_validade)
+        return produto
+
     @staticmethod
     def buscar_instancia_por_id(id_instancia: int) -> Optional['ProdutoLacteo']:
         """Busca uma instância específica de produto em uma área pelo seu ID (chave primária de produtos_areas)."""
@@ -196,21 +366,29 @@ class ProdutoLacteo:
         cursor = conn.cursor()
         # A coluna primária em produtos_areas é 'id'
         cursor.execute(
-            'SELECT id, id_catalogo_produto, nome, quantidade, data_validade, lote FROM produtos_areas WHERE id = ?',
+            f'SELECT {ProdutoLacteo._COLUNAS} FROM produtos_areas WHERE id = ?',
             (id_instancia,)
         )
         data = cursor.fetchone()
         conn.close()
-        if data:
-            return ProdutoLacteo(
-                id_catalogo_produto=data['id_catalogo_produto'],
-                nome=data['nome'],
-                quantidade=data['quantidade'],
-                data_validade_str=data['data_validade'],
-                lote=data['lote'],
-                id_instancia=data['id'] # Passa o 'id' como id_instancia
-            )
-        return None
+        return ProdutoLacteo._de_linha(data) if data else None
+
+    @staticmethod
+    def buscar_instancia_na_area(id_area: str, id_instancia: int) -> Optional['ProdutoLacteo']:
+        """Busca uma instância de produto pelo seu ID, apenas se ela pertencer à área informada.
+
+        Responde com uma única consulta pela chave primária, sem listar os
+        demais produtos da área.
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            f'SELECT {ProdutoLacteo._COLUNAS} FROM produtos_areas WHERE id = ? AND id_area = ?',
+            (id_instancia, id_area)
+        )
+        data = cursor.fetchone()
+        conn.close()
+        return ProdutoLacteo._de_linha(data) if data else None
 
     def atualizar_instancia(self, nova_quantidade: int, nova_data_validade_str: str, novo_lote: str) -> bool:
         """Atualiza os detalhes desta instância de produto na tabela produtos_areas."""
@@ -220,7 +398,7 @@ class ProdutoLacteo:
         conn = get_db_connection()
         cursor = conn.cursor()
         try:
-            nova_data_validade = datetime.strptime(nova_data_validade_str, '%Y-%m-%d').date()
+            nova_data_validade = converter_data_iso(nova_data_validade_str)
             # A coluna primária em produtos_areas é 'id'
             cursor.execute(
                 'UPDATE produtos_areas SET quantidade = ?, data_validade = ?, lote = ? WHERE id = ?',
@@ -268,6 +446,8 @@ class ProdutoLacteo:
 
 class AreaArmazem:
     """Representa uma área de armazenamento no sistema."""
+    __slots__ = ('id_area', 'nome', 'tipo_armazenamento')
+
     def __init__(self, id_area: str, nome: str, tipo_armazenamento: str):
         self.id_area = id_area
         self.nome = nome
@@ -289,6 +469,7 @@ class AreaArmazem:
             return None
         finally:
             conn.close()
+            cache_areas.invalidar()
 
     def atualizar(self, novo_nome: str, novo_tipo_armazenamento: str) -> bool:
         """Atualiza o nome e o tipo de armazenamento desta área no banco de dados."""
@@ -307,6 +488,7 @@ class AreaArmazem:
             return False
         finally:
             conn.close()
+            cache_areas.invalidar()
 
     def deletar(self) -> tuple[bool, str]:
         """Deleta esta área de armazenamento do banco de dados.
@@ -327,6 +509,7 @@ class AreaArmazem:
             return False, f"Erro ao excluir área: {e}"
         finally:
             conn.close()
+            cache_areas.invalidar()
 
     @staticmethod
     def buscar_por_id(id_area: str) -> Optional['AreaArmazem']:
@@ -342,7 +525,15 @@ class AreaArmazem:
 
     @staticmethod
     def listar_todas() -> List['AreaArmazem']:
-        """Lista todas as áreas de armazenamento cadastradas no banco de dados."""
+        """Lista todas as áreas de armazenamento cadastradas no banco de dados.
+
+        A lista vem de cache_areas e só é relida do banco quando alguma área
+        muda; cada chamada recebe uma cópia da lista.
+        """
+        return list(cache_areas.obter(AreaArmazem._carregar_todas))
+
+    @staticmethod
+    def _carregar_todas() -> List['AreaArmazem']:
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute('SELECT * FROM areas_armazem ORDER BY nome')
@@ -350,33 +541,38 @@ class AreaArmazem:
         conn.close()
         return [AreaArmazem(row['id_area'], row['nome'], row['tipo_armazenamento']) for row in areas_data]
 
-    def adicionar_produto(self, produto: ProdutoLacteo) -> None:
-        """Adiciona um produto (ou atualiza sua quantidade) a esta área de armazenamento."""
+    # Recebimento de um lote: insere ou, se o lote já existir na área (restrição
+    # UNIQUE(id_area, id_catalogo_produto, lote)), soma a quantidade. A validade
+    # registrada no primeiro recebimento é mantida.
+    _SQL_ADICIONAR_PRODUTO = '''INSERT INTO produtos_areas (id_area, id_catalogo_produto, nome, quantidade, data_validade, lote)
+                                VALUES (?, ?, ?, ?, ?, ?)
+                                ON CONFLICT (id_area, id_catalogo_produto, lote)
+                                DO UPDATE SET quantidade = quantidade + excluded.quantidade'''
+
+    def adicionar_produto(self, produto: ProdutoLacteo) -> int:
+        """Adiciona um produto (ou atualiza sua quantidade) a esta área de armazenamento.
+
+        Usa uma única instrução (upsert), de modo que recebimentos simultâneos do
+        mesmo lote nunca perdem quantidade.
+
+        Returns:
+            int: ID (em produtos_areas) da instância inserida ou atualizada.
+        """
         conn = get_db_connection()
         cursor = conn.cursor()
-        # Verifica se já existe um produto com o mesmo id_catalogo_produto e lote na área
-        cursor.execute(
-            'SELECT id, quantidade FROM produtos_areas WHERE id_area = ? AND id_catalogo_produto = ? AND lote = ?',
-            (self.id_area, produto.id_catalogo_produto, produto.lote)
-        )
-        existing_product = cursor.fetchone()
-
-        if existing_product:
-            # Se existe, atualiza a quantidade
-            new_quantidade = existing_product['quantidade'] + produto.quantidade
-            cursor.execute(
-                'UPDATE produtos_areas SET quantidade = ? WHERE id = ?',
-                (new_quantidade, existing_product['id'])
-            )
-        else:
-            # Se não existe, insere um novo registro
+        try:
             cursor.execute(
-                'INSERT INTO produtos_areas (id_area, id_catalogo_produto, nome, quantidade, data_validade, lote) VALUES (?, ?, ?, ?, ?, ?)',
+                AreaArmazem._SQL_ADICIONAR_PRODUTO + ' RETURNING id',
                 (self.id_area, produto.id_catalogo_produto, produto.nome, produto.quantidade,
                  produto.data_validade.strftime('%Y-%m-%d'), produto.lote)
             )
-        conn.commit()
-        conn.close()
+            id_instancia = cursor.fetchone()['id']
+            conn.commit()
+            metricas.recebimentos.inc(origem='cadastro')
+            metricas.unidades_recebidas.inc(produto.quantidade, origem='cadastro')
+            return id_instancia
+        finally:
+            conn.close()
 
     def listar_produtos(self) -> List[ProdutoLacteo]:
         """Lista todos os produtos contidos nesta área de armazenamento."""
@@ -384,13 +580,12 @@ class AreaArmazem:
         cursor = conn.cursor()
         # A coluna primária em produtos_areas é 'id'
         cursor.execute(
-            'SELECT id, id_catalogo_produto, nome, quantidade, data_validade, lote FROM produtos_areas WHERE id_area = ? ORDER BY data_validade ASC',
+            f'SELECT {ProdutoLacteo._COLUNAS} FROM produtos_areas WHERE id_area = ? ORDER BY data_validade ASC',
             (self.id_area,)
         )
         produtos_data = cursor.fetchall()
         conn.close()
-        return [ProdutoLacteo(row['id_catalogo_produto'], row['nome'], row['quantidade'],
-                                  row['data_validade'], row['lote'], row['id']) for row in produtos_data]
+        return list(map(ProdutoLacteo._de_linha, produtos_data))
 
     def remover_produto(self, id_instancia_produto: int, quantidade_a_remover: int) -> bool:
         """Remove uma certa quantidade de um produto específico desta área.
@@ -431,6 +626,9 @@ class AreaArmazem:
 
 class Venda:
     """Representa uma venda registrada no sistema."""
+    __slots__ = ('id_venda', 'id_catalogo_produto', 'nome', 'lote', 'data_validade_produto',
+                 'quantidade_vendida', 'destino', 'area_origem_id', 'usuario_responsavel', 'data_hora')
+
     def __init__(self, id_catalogo_produto: str, nome: str, lote: str, data_validade_produto: str, 
                  quantidade_vendida: int, destino: str, area_origem_id: str, usuario_responsavel: str, 
                  data_hora: Optional[datetime] = None, id_venda: Optional[int] = None):
@@ -445,44 +643,428 @@ class Venda:
         self.usuario_responsavel = usuario_responsavel
         self.data_hora = data_hora if data_hora else datetime.now()
 
+    _SQL_INSERIR = '''INSERT INTO vendas (id_catalogo_produto, nome, lote, data_validade_produto, 
+                                quantidade_vendida, destino, area_origem_id, usuario_responsavel, data_hora) 
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+
+    def _parametros_insercao(self) -> tuple:
+        """Valores da venda na ordem das colunas de _SQL_INSERIR."""
+        return (self.id_catalogo_produto, self.nome, self.lote, self.data_validade_produto,
+                self.quantidade_vendida, self.destino, self.area_origem_id, self.usuario_responsavel, 
+                self.data_hora.strftime('%Y-%m-%d %H:%M:%S'))
+
     @staticmethod
     def registrar(venda: 'Venda') -> None:
         """Registra uma nova venda no banco de dados."""
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute(
-            '''INSERT INTO vendas (id_catalogo_produto, nome, lote, data_validade_produto, 
-                                quantidade_vendida, destino, area_origem_id, usuario_responsavel, data_hora) 
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-            (venda.id_catalogo_produto, venda.nome, venda.lote, venda.data_validade_produto,
-             venda.quantidade_vendida, venda.destino, venda.area_origem_id, venda.usuario_responsavel, 
-             venda.data_hora.strftime('%Y-%m-%d %H:%M:%S'))
-        )
+        cursor.execute(Venda._SQL_INSERIR, venda._parametros_insercao())
         conn.commit()
         conn.close()
+        metricas.vendas.inc(operacao='registrar')
+        metricas.unidades_vendidas.inc(venda.quantidade_vendida, operacao='registrar')
+
+    @staticmethod
+    def _baixar_estoque(cursor: sqlite3.Cursor, id_area: str, id_instancia: int, quantidade: int,
+                        destino: str, usuario: str) -> tuple[Optional['Venda'], str]:
+        """Baixa o estoque de uma instância e monta a venda correspondente.
+
+        Deve ser chamado dentro de uma transação já aberta. A instância só é
+        decrementada se pertencer à área e tiver quantidade suficiente; quando
+        chega a zero, é removida de produtos_areas.
+
+        Returns:
+            tuple[Optional[Venda], str]: A venda (ainda não inserida) e uma mensagem,
+            ou (None, motivo da falha).
+        """
+        cursor.execute(
+            'SELECT id, id_area, id_catalogo_produto, nome, quantidade, data_validade, lote FROM produtos_areas WHERE id = ?',
+            (id_instancia,)
+        )
+        instancia = cursor.fetchone()
+        if not instancia:
+            return None, f"Produto com ID de instância '{id_instancia}' não encontrado."
+        if instancia['id_area'] != id_area:
+            return None, f"Produto com ID de instância '{id_instancia}' não pertence à área '{id_area}'."
+
+        # Decremento condicional: nunca deixa o estoque negativo, mesmo sob concorrência.
+        cursor.execute(
+            'UPDATE produtos_areas SET quantidade = quantidade - ? WHERE id = ? AND id_area = ? AND quantidade >= ?',
+            (quantidade, id_instancia, id_area, quantidade)
+        )
+        if cursor.rowcount == 0:
+            return None, (f"Quantidade insuficiente em estoque para '{instancia['nome']}' (Lote: {instancia['lote']}). "
+                          f"Disponível: {instancia['quantidade']}")
+        cursor.execute('DELETE FROM produtos_areas WHERE id = ? AND quantidade = 0', (id_instancia,))
+
+        venda = Venda(
+            id_catalogo_produto=instancia['id_catalogo_produto'],
+            nome=instancia['nome'],
+            lote=instancia['lote'],
+            data_validade_produto=instancia['data_validade'],
+            quantidade_vendida=quantidade,
+            destino=destino,
+            area_origem_id=id_area,
+            usuario_responsavel=usuario
+        )
+        return venda, (f"Venda de {quantidade} unidade(s) de '{venda.nome}' (Lote: {venda.lote}) "
+                       f"registrada com sucesso!")
+
+    @staticmethod
+    def vender(id_area: str, id_instancia: int, quantidade: int, destino: str, usuario: str) -> tuple[bool, str]:
+        """Vende uma quantidade de uma instância de produto de uma área, de forma atômica.
+
+        A verificação de pertencimento à área, o decremento condicional do
+        estoque, a remoção da instância zerada e o registro da venda acontecem
+        em uma única transação BEGIN IMMEDIATE, evitando vendas acima do estoque
+        quando dois operadores vendem o mesmo lote ao mesmo tempo.
+
+        Returns:
+            tuple[bool, str]: (sucesso, mensagem).
+        """
+        if quantidade <= 0:
+            return False, "A quantidade para venda deve ser positiva."
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            venda, mensagem = Venda._baixar_estoque(cursor, id_area, id_instancia, quantidade, destino, usuario)
+            if venda is None:
+                conn.rollback()
+                return False, mensagem
+            cursor.execute(Venda._SQL_INSERIR, venda._parametros_insercao())
+            venda.id_venda = cursor.lastrowid
+            conn.commit()
+            metricas.vendas.inc(operacao='vender')
+            metricas.unidades_vendidas.inc(quantidade, operacao='vender')
+            return True, mensagem
+        except Exception as e:
+            conn.rollback()
+            return False, f"Erro ao registrar a venda: {e}"
+        finally:
+            conn.close()
+
+    @staticmethod
+    def vender_lote(itens: List[Dict[str, Any]], destino: str, usuario: str) -> tuple[bool, List[Dict[str, Any]]]:
+        """Vende várias instâncias de produto (de uma ou mais áreas) em uma única transação.
+
+        Todas as linhas são validadas antes de qualquer alteração (existência da
+        instância, área informada e estoque suficiente, somando linhas repetidas
+        da mesma instância). Se alguma linha falhar, nada é gravado. Caso
+        contrário, as baixas de estoque e os registros de venda são aplicados
+        com executemany dentro de um único BEGIN IMMEDIATE.
+
+        Args:
+            itens: Linhas no formato {'id_instancia': int, 'quantidade': int, 'id_area': str (opcional)}.
+            destino: Destino comum a todas as linhas (ex.: cliente ou rota do caminhão).
+            usuario: Username do responsável pela venda.
+
+        Returns:
+            tuple[bool, List[Dict]]: (sucesso, resultado por linha com 'linha',
+            'id_instancia', 'sucesso' e 'mensagem').
+        """
+        if not itens:
+            return False, []
+        if len(itens) > ITENS_VENDA_LOTE_MAX:
+            return False, [{'linha': 0, 'id_instancia': None, 'sucesso': False,
+                            'mensagem': f"O lote de venda aceita no máximo {ITENS_VENDA_LOTE_MAX} linhas."}]
+
+        resultados: List[Dict[str, Any]] = []
+        linhas_validas = []
+        for numero, item in enumerate(itens, start=1):
+            resultado = {'linha': numero, 'id_instancia': item.get('id_instancia'), 'sucesso': False, 'mensagem': ''}
+            resultados.append(resultado)
+            try:
+                id_instancia = int(item.get('id_instancia'))
+                quantidade = int(item.get('quantidade'))
+            except (TypeError, ValueError):
+                resultado['mensagem'] = "ID da instância e quantidade devem ser números."
+                continue
+            if quantidade <= 0:
+                resultado['mensagem'] = "A quantidade para venda deve ser positiva."
+                continue
+            resultado['id_instancia'] = id_instancia
+            linhas_validas.append((resultado, id_instancia, quantidade, item.get('id_area')))
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            ids = sorted({id_instancia for _, id_instancia, _, _ in linhas_validas})
+            instancias = {}
+            for inicio in range(0, len(ids), 500):  # Respeita o limite de parâmetros do SQLite
+                bloco = ids[inicio:inicio + 500]
+                cursor.execute(
+                    'SELECT id, id_area, id_catalogo_produto, nome, quantidade, data_validade, lote '
+                    f'FROM produtos_areas WHERE id IN ({",".join("?" * len(bloco))})',
+                    bloco
+                )
+                instancias.update((row['id'], row) for row in cursor.fetchall())
+
+            demanda: Dict[int, int] = {}
+            vendas = []
+            for resultado, id_instancia, quantidade, id_area in linhas_validas:
+                instancia = instancias.get(id_instancia)
+                if not instancia:
+                    resultado['mensagem'] = f"Produto com ID de instância '{id_instancia}' não encontrado."
+                    continue
+                if id_area and instancia['id_area'] != id_area:
+                    resultado['mensagem'] = f"Produto com ID de instância '{id_instancia}' não pertence à área '{id_area}'."
+                    continue
+                demanda[id_instancia] = demanda.get(id_instancia, 0) + quantidade
+                if demanda[id_instancia] > instancia['quantidade']:
+                    resultado['mensagem'] = (f"Quantidade insuficiente em estoque para '{instancia['nome']}' "
+                                             f"(Lote: {instancia['lote']}). Disponível: {instancia['quantidade']}")
+                    continue
+                resultado['sucesso'] = True
+                resultado['mensagem'] = (f"Venda de {quantidade} unidade(s) de '{instancia['nome']}' "
+                                         f"(Lote: {instancia['lote']}) registrada com sucesso!")
+                vendas.append(Venda(
+                    id_catalogo_produto=instancia['id_catalogo_produto'],
+                    nome=instancia['nome'],
+                    lote=instancia['lote'],
+                    data_validade_produto=instancia['data_validade'],
+                    quantidade_vendida=quantidade,
+                    destino=destino,
+                    area_origem_id=instancia['id_area'],
+                    usuario_responsavel=usuario
+                ))
+
+            if not all(resultado['sucesso'] for resultado in resultados):
+                conn.rollback()
+                for resultado in resultados:
+                    if resultado['sucesso']:
+                        resultado['sucesso'] = False
+                        resultado['mensagem'] = "Não registrada: outras linhas do lote possuem erros."
+                return False, resultados
+
+            baixas = [(quantidade, id_instancia, quantidade) for id_instancia, quantidade in demanda.items()]
+            cursor.executemany(
+                'UPDATE produtos_areas SET quantidade = quantidade - ? WHERE id = ? AND quantidade >= ?', baixas
+            )
+            if cursor.rowcount != len(baixas):
+                # Não deve ocorrer sob BEGIN IMMEDIATE, mas nunca vende acima do estoque.
+                conn.rollback()
+                for resultado in resultados:
+                    resultado['sucesso'] = False
+                    resultado['mensagem'] = "O estoque foi alterado durante a venda. Tente novamente."
+                return False, resultados
+            cursor.executemany('DELETE FROM produtos_areas WHERE id = ? AND quantidade = 0',
+                               [(id_instancia,) for id_instancia in demanda])
+            cursor.executemany(Venda._SQL_INSERIR, [venda._parametros_insercao() for venda in vendas])
+            conn.commit()
+            metricas.vendas.inc(len(vendas), operacao='lote')
+            metricas.unidades_vendidas.inc(sum(venda.quantidade_vendida for venda in vendas), operacao='lote')
+            return True, resultados
+        except Exception as e:
+            conn.rollback()
+            for resultado in resultados:
+                resultado['sucesso'] = False
+                resultado['mensagem'] = f"Erro ao registrar a venda: {e}"
+            return False, resultados
+        finally:
+            conn.close()
+
+    @staticmethod
+    def vender_fefo(id_catalogo_produto: str, quantidade: int, destino: str, usuario: str,
+                    id_area: Optional[str] = None, tipo_armazenamento: Optional[str] = None,
+                    incluir_vencidos: bool = False) -> tuple[bool, str, List['Venda']]:
+        """Vende um produto do catálogo alocando os lotes pela regra FEFO.
+
+        Os lotes são consumidos do que vence primeiro para o que vence por
+        último, em uma ou em todas as áreas (opcionalmente só as de um tipo de
+        armazenamento). A quantidade é dividida entre quantos lotes forem
+        necessários e cada lote consumido gera uma linha em vendas. A leitura
+        usa o índice (id_catalogo_produto, data_validade) e para assim que a
+        quantidade é atendida. Tudo ocorre em uma única transação.
+
+        Args:
+            id_catalogo_produto: Produto do catálogo a ser vendido.
+            quantidade: Quantidade total a vender.
+            destino: Destino da venda.
+            usuario: Username do responsável.
+            id_area: Restringe a alocação a uma área.
+            tipo_armazenamento: Restringe a alocação a áreas deste tipo.
+            incluir_vencidos: Se False (padrão), lotes vencidos não são alocados.
+
+        Returns:
+            tuple[bool, str, List[Venda]]: (sucesso, mensagem, vendas registradas por lote).
+        """
+        if quantidade <= 0:
+            return False, "A quantidade para venda deve ser positiva.", []
+
+        sql = ('SELECT pa.id, pa.id_area, pa.id_catalogo_produto, pa.nome, pa.quantidade, pa.data_validade, pa.lote '
+               'FROM produtos_areas pa')
+        parametros: List[Any] = []
+        if tipo_armazenamento:
+            sql += ' JOIN areas_armazem a ON a.id_area = pa.id_area AND a.tipo_armazenamento = ?'
+            parametros.append(tipo_armazenamento)
+        sql += ' WHERE pa.id_catalogo_produto = ? AND pa.quantidade > 0'
+        parametros.append(id_catalogo_produto)
+        if not incluir_vencidos:
+            sql += ' AND pa.data_validade >= ?'
+            parametros.append(date.today().strftime('%Y-%m-%d'))
+        if id_area:
+            sql += ' AND pa.id_area = ?'
+            parametros.append(id_area)
+        sql += ' ORDER BY pa.data_validade ASC, pa.id ASC'
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute(sql, parametros)
+            restante = quantidade
+            alocacoes = []
+            for lote in cursor:  # Lê só os lotes necessários, na ordem do índice
+                retirada = min(restante, lote['quantidade'])
+                alocacoes.append((lote, retirada))
+                restante -= retirada
+                if restante == 0:
+                    break
+            if restante > 0:
+                conn.rollback()
+                disponivel = quantidade - restante
+                return False, (f"Quantidade insuficiente em estoque para o produto '{id_catalogo_produto}'. "
+                               f"Disponível: {disponivel}"), []
+
+            baixas = [(retirada, lote['id'], retirada) for lote, retirada in alocacoes]
+            cursor.executemany(
+                'UPDATE produtos_areas SET quantidade = quantidade - ? WHERE id = ? AND quantidade >= ?', baixas
+            )
+            if cursor.rowcount != len(baixas):
+                conn.rollback()
+                return False, "O estoque foi alterado durante a venda. Tente novamente.", []
+            cursor.executemany('DELETE FROM produtos_areas WHERE id = ? AND quantidade = 0',
+                               [(lote['id'],) for lote, _ in alocacoes])
+            vendas = [
+                Venda(
+                    id_catalogo_produto=lote['id_catalogo_produto'],
+                    nome=lote['nome'],
+                    lote=lote['lote'],
+                    data_validade_produto=lote['data_validade'],
+                    quantidade_vendida=retirada,
+                    destino=destino,
+                    area_origem_id=lote['id_area'],
+                    usuario_responsavel=usuario
+                ) for lote, retirada in alocacoes
+            ]
+            cursor.executemany(Venda._SQL_INSERIR, [venda._parametros_insercao() for venda in vendas])
+            conn.commit()
+            metricas.vendas.inc(len(vendas), operacao='fefo')
+            metricas.unidades_vendidas.inc(quantidade, operacao='fefo')
+            lotes = ', '.join(f"{venda.lote} ({venda.quantidade_vendida})" for venda in vendas)
+            return True, (f"Venda de {quantidade} unidade(s) de '{vendas[0].nome}' registrada com sucesso! "
+                          f"Lotes: {lotes}"), vendas
+        except Exception as e:
+            conn.rollback()
+            return False, f"Erro ao registrar a venda: {e}", []
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _de_linha(row: sqlite3.Row) -> 'Venda':
+        """Cria um objeto Venda a partir de uma linha da tabela vendas."""
+        return Venda(
+            id_catalogo_produto=row['id_catalogo_produto'],
+            nome=row['nome'],
+            lote=row['lote'],
+            data_validade_produto=row['data_validade_produto'],
+            quantidade_vendida=row['quantidade_vendida'],
+            destino=row['destino'],
+            area_origem_id=row['area_origem_id'],
+            usuario_responsavel=row['usuario_responsavel'],
+            data_hora=_data_hora_gravada(row['data_hora']),
+            id_venda=row['id']
+        )
 
     @staticmethod
     def listar_todas() -> List['Venda']:
         """Lista todas as vendas registradas no banco de dados."""
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM vendas ORDER BY data_hora DESC')
+        cursor.execute('SELECT * FROM vendas ORDER BY data_hora DESC, id DESC')
         vendas_data = cursor.fetchall()
         conn.close()
-        return [
-            Venda(
-                id_catalogo_produto=row['id_catalogo_produto'],
-                nome=row['nome'],
-                lote=row['lote'],
-                data_validade_produto=row['data_validade_produto'],
-                quantidade_vendida=row['quantidade_vendida'],
-                destino=row['destino'],
-                area_origem_id=row['area_origem_id'],
-                usuario_responsavel=row['usuario_responsavel'],
-                data_hora=datetime.strptime(row['data_hora'], '%Y-%m-%d %H:%M:%S'),
-                id_venda=row['id']
-            ) for row in vendas_data
-        ]
+        return list(map(Venda._de_linha, vendas_data))
+
+    @staticmethod
+    def _codificar_cursor(data_hora: str, id_venda: int) -> str:
+        return base64.urlsafe_b64encode(f'{data_hora}|{id_venda}'.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decodificar_cursor(cursor_pagina: str) -> tuple[str, int]:
+        try:
+            data_hora, id_venda = base64.urlsafe_b64decode(cursor_pagina.encode('ascii')).decode('utf-8').split('|')
+            datetime.strptime(data_hora, '%Y-%m-%d %H:%M:%S')
+            return data_hora, int(id_venda)
+        except (ValueError, UnicodeError):
+            raise ValueError(f"Cursor de paginação inválido: '{cursor_pagina}'.")
+
+    @staticmethod
+    def listar_pagina(cursor_pagina: Optional[str] = None, limite: int = VENDAS_POR_PAGINA,
+                      filtros: Optional[Dict[str, Any]] = None) -> tuple[List['Venda'], Optional[str]]:
+        """Lista uma página de vendas, das mais recentes para as mais antigas.
+
+        Usa paginação por chave (keyset) sobre (data_hora, id): cada página é
+        uma leitura de faixa no índice de data_hora, com custo independente do
+        tamanho do histórico.
+
+        Args:
+            cursor_pagina: Cursor retornado pela página anterior (None para a primeira página).
+            limite: Número máximo de vendas na página (entre 1 e VENDAS_POR_PAGINA_MAX).
+            filtros: Filtros opcionais com chaves em FILTROS_VENDAS (igualdade) e
+                'data_inicio' / 'data_fim' (AAAA-MM-DD, inclusivos).
+
+        Returns:
+            tuple[List[Venda], Optional[str]]: As vendas da página e o cursor da
+            próxima página (None se esta for a última).
+
+        Raises:
+            ValueError: Se o cursor, o limite ou algum filtro for inválido.
+        """
+        if not 1 <= limite <= VENDAS_POR_PAGINA_MAX:
+            raise ValueError(f"O limite deve estar entre 1 e {VENDAS_POR_PAGINA_MAX}.")
+        condicoes = []
+        parametros: List[Any] = []
+        for chave, valor in (filtros or {}).items():
+            if valor in (None, ''):
+                continue
+            if chave in FILTROS_VENDAS:
+                condicoes.append(f'{chave} = ?')
+                parametros.append(valor)
+            elif chave == 'data_inicio':
+                condicoes.append('data_hora >= ?')
+                parametros.append(datetime.strptime(valor, '%Y-%m-%d').strftime('%Y-%m-%d 00:00:00'))
+            elif chave == 'data_fim':
+                condicoes.append('data_hora <= ?')
+                parametros.append(datetime.strptime(valor, '%Y-%m-%d').strftime('%Y-%m-%d 23:59:59'))
+            else:
+                raise ValueError(f"Filtro de vendas desconhecido: '{chave}'.")
+        if cursor_pagina:
+            data_hora, id_venda = Venda._decodificar_cursor(cursor_pagina)
+            # A primeira condição delimita a faixa no índice; a segunda desempata pelo id.
+            condicoes.append('data_hora <= ? AND (data_hora < ? OR id < ?)')
+            parametros.extend([data_hora, data_hora, id_venda])
+
+        sql = 'SELECT * FROM vendas'
+        if condicoes:
+            sql += ' WHERE ' + ' AND '.join(condicoes)
+        sql += ' ORDER BY data_hora DESC, id DESC LIMIT ?'
+        parametros.append(limite + 1)  # Uma linha extra indica se há próxima página
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(sql, parametros)
+        vendas_data = cursor.fetchall()
+        conn.close()
+
+        proximo_cursor = None
+        if len(vendas_data) > limite:
+            vendas_data = vendas_data[:limite]
+            ultima = vendas_data[-1]
+            proximo_cursor = Venda._codificar_cursor(ultima['data_hora'], ultima['id'])
+        return [Venda._de_linha(row) for row in vendas_data], proximo_cursor
 
     def to_dict(self) -> Dict[str, Any]:
         """Converte o objeto Venda para um dicionário."""
@@ -563,7 +1145,6 @@ def popular_dados_iniciais() -> None:
 if __name__ == '__main__':
     print("Inicializando e populando o banco de dados...")
     # Garante que o diretório data exista
-    import os
     if not os.path.exists(DATABASE_PATH.split('/')[0]):
         os.makedirs(DATABASE_PATH.split('/')[0])
     init_db()
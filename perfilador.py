@@ -0,0 +1,238 @@
+# laticinios_armazem/perfilador.py
+
+import cProfile
+import itertools
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_cookie
+from werkzeug.routing import RequestRedirect
+
+logger = logging.getLogger(__name__)
+
+# Cabeçalho que pede o perfil de um request específico (aceito apenas de gerentes).
+CABECALHO_PERFILAR = 'X-Perfilar'
+_CHAVE_ENVIRON_CABECALHO = 'HTTP_' + CABECALHO_PERFILAR.upper().replace('-', '_')
+
+# Extensão dos arquivos gerados (formato de cProfile/pstats, legível com 'python -m pstats').
+EXTENSAO_PERFIL = '.pstats'
+
+# Diretório usado para requests que não correspondem a nenhuma rota.
+ROTA_DESCONHECIDA = '_desconhecida'
+
+# Critérios de ordenação aceitos por funcoes_mais_lentas.
+ORDENACOES = {'tottime': 'tempo_proprio', 'cumulative': 'tempo_total', 'calls': 'chamadas'}
+
+
+class _RespostaPerfilada:
+    """Envolve a resposta WSGI para incluir no perfil a geração do corpo (streaming) e o close()."""
+
+    def __init__(self, resposta: Iterable[bytes], perfil: cProfile.Profile, ao_fechar: Callable[[], None]):
+        self._resposta = resposta
+        self._perfil = perfil
+        self._ao_fechar = ao_fechar
+
+    def __iter__(self):
+        iterador = iter(self._resposta)
+        while True:
+            # Liga o perfil só enquanto o app gera cada parte, não enquanto o servidor a envia.
+            self._perfil.enable()
+            try:
+                parte = next(iterador)
+            except StopIteration:
+                return
+            finally:
+                self._perfil.disable()
+            yield parte
+
+    def close(self) -> None:
+        try:
+            fechar = getattr(self._resposta, 'close', None)
+            if fechar is not None:
+                self._perfil.enable()
+                try:
+                    fechar()  # Inclui o teardown do Flask
+                finally:
+                    self._perfil.disable()
+        finally:
+            self._ao_fechar()
+
+
+class MiddlewarePerfilador:
+    """Middleware WSGI que grava o perfil (cProfile) de uma amostra dos requests.
+
+    Um request é perfilado quando PERFILADOR_ATIVO está ligado e ele cai na
+    fração PERFILADOR_AMOSTRAGEM, ou quando traz o cabeçalho X-Perfilar e
+    'autorizar(environ)' confirma que vem de um gerente. Sem o cookie de
+    sessão do app, autorizar() nem é chamado: tráfego anônimo com o
+    cabeçalho não custa uma consulta ao banco. Apenas um request é
+    perfilado por vez; os demais seguem sem perfil. Cada perfil é gravado em
+    PERFILADOR_DIRETORIO/<endpoint>/, mantendo os PERFILADOR_ARQUIVOS_POR_ROTA
+    mais recentes.
+    """
+
+    def __init__(self, app, wsgi_app: Callable, autorizar: Callable[[Dict[str, Any]], bool]):
+        self.app = app
+        self.wsgi_app = wsgi_app
+        self.autorizar = autorizar
+        self._lock = threading.Lock()
+        # Distingue perfis gravados no mesmo segundo com a mesma duração arredondada.
+        self._sequencia = itertools.count(1)
+        self.perfis_gravados = 0
+
+    def _deve_perfilar(self, environ: Dict[str, Any]) -> bool:
+        config = self.app.config
+        if config['PERFILADOR_ATIVO'] and random.random() < config['PERFILADOR_AMOSTRAGEM']:
+            return True
+        if environ.get(_CHAVE_ENVIRON_CABECALHO):
+            if config['SESSION_COOKIE_NAME'] not in parse_cookie(environ.get('HTTP_COOKIE', '')):
+                return False
+            try:
+                return self.autorizar(environ)
+            except Exception:
+                logger.exception("Falha ao verificar a permissão do cabeçalho %s.", CABECALHO_PERFILAR)
+        return False
+
+    def _endpoint(self, environ: Dict[str, Any]) -> str:
+        try:
+            endpoint, _ = self.app.url_map.bind_to_environ(environ).match()
+            return endpoint
+        except (HTTPException, RequestRedirect):
+            return ROTA_DESCONHECIDA
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable) -> Iterable[bytes]:
+        if not self._deve_perfilar(environ) or not self._lock.acquire(blocking=False):
+            return self.wsgi_app(environ, start_response)
+
+        endpoint = self._endpoint(environ)
+        perfil = cProfile.Profile()
+        inicio = time.perf_counter()
+
+        def finalizar() -> None:
+            try:
+                self._gravar(perfil, endpoint, time.perf_counter() - inicio)
+            finally:
+                self._lock.release()
+
+        perfil.enable()
+        try:
+            resposta = self.wsgi_app(environ, start_response)
+        except BaseException:
+            perfil.disable()
+            self._lock.release()
+            raise
+        perfil.disable()
+        return _RespostaPerfilada(resposta, perfil, finalizar)
+
+    def _gravar(self, perfil: cProfile.Profile, endpoint: str, duracao: float) -> None:
+        try:
+            diretorio = os.path.join(self.app.config['PERFILADOR_DIRETORIO'], _nome_seguro(endpoint))
+            os.makedirs(diretorio, exist_ok=True)
+            nome = (f"{time.strftime('%Y%m%d-%H%M%S')}-{next(self._sequencia):06d}-"
+                    f"{os.getpid()}-{int(duracao * 1000):06d}ms")
+            caminho = os.path.join(diretorio, nome + EXTENSAO_PERFIL)
+            perfil.dump_stats(caminho + '.tmp')
+            os.replace(caminho + '.tmp', caminho)  # O relatório nunca lê um arquivo pela metade
+            self.perfis_gravados += 1
+            _rotacionar(diretorio, self.app.config['PERFILADOR_ARQUIVOS_POR_ROTA'])
+        except OSError:
+            logger.exception("Não foi possível gravar o perfil do endpoint '%s'.", endpoint)
+
+
+def _nome_seguro(endpoint: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', endpoint)
+
+
+def _arquivos_perfil(diretorio: str) -> List[str]:
+    """Arquivos de perfil do diretório, do mais antigo para o mais recente."""
+    arquivos = [os.path.join(diretorio, nome) for nome in os.listdir(diretorio) if nome.endswith(EXTENSAO_PERFIL)]
+    return sorted(arquivos, key=lambda caminho: (os.path.getmtime(caminho), caminho))
+
+
+def _rotacionar(diretorio: str, manter: int) -> None:
+    arquivos = _arquivos_perfil(diretorio)
+    for caminho in arquivos[:max(len(arquivos) - manter, 0)]:
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass  # Removido por outro processo
+
+
+def funcoes_mais_lentas(diretorio: str, limite: int = 15, ordenar_por: str = 'tottime') -> Dict[str, Dict[str, Any]]:
+    """Agrega os perfis gravados de cada endpoint e lista as funções mais custosas.
+
+    Args:
+        diretorio: Diretório raiz dos perfis (PERFILADOR_DIRETORIO).
+        limite: Número de funções por endpoint.
+        ordenar_por: 'tottime' (tempo na própria função), 'cumulative' ou 'calls'.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Por endpoint, 'perfis' (requests perfilados) e
+        'funcoes' (lista com 'funcao', 'chamadas', 'tempo_proprio', 'tempo_total'
+        e 'tempo_proprio_por_request', tempos em segundos).
+
+    Raises:
+        ValueError: Para critérios de ordenação desconhecidos.
+    """
+    if ordenar_por not in ORDENACOES:
+        raise ValueError(f"Ordenação inválida: '{ordenar_por}'. Use uma de: {', '.join(ORDENACOES)}.")
+    chave = ORDENACOES[ordenar_por]
+    resultado: Dict[str, Dict[str, Any]] = {}
+    if not os.path.isdir(diretorio):
+        return resultado
+    for endpoint in sorted(os.listdir(diretorio)):
+        subdiretorio = os.path.join(diretorio, endpoint)
+        if not os.path.isdir(subdiretorio):
+            continue
+        estatisticas: Optional[pstats.Stats] = None
+        perfis = 0
+        for caminho in _arquivos_perfil(subdiretorio):
+            try:
+                if estatisticas is None:
+                    estatisticas = pstats.Stats(caminho)
+                else:
+                    estatisticas.add(caminho)
+                perfis += 1
+            except (OSError, EOFError, ValueError, TypeError):
+                continue  # Arquivo removido pela rotação ou corrompido
+        if estatisticas is None:
+            continue
+        funcoes = [
+            {
+                'funcao': f'{nome} ({os.path.basename(arquivo)}:{linha})' if linha else nome,
+                'chamadas': chamadas,
+                'tempo_proprio': tempo_proprio,
+                'tempo_total': tempo_total,
+                'tempo_proprio_por_request': tempo_proprio / perfis,
+            }
+            for (arquivo, linha, nome), (_, chamadas, tempo_proprio, tempo_total, _)
+            in estatisticas.stats.items()
+        ]
+        funcoes.sort(key=lambda funcao: funcao[chave], reverse=True)
+        resultado[endpoint] = {'perfis': perfis, 'funcoes': funcoes[:limite]}
+    return resultado
+
+
+def init_app(app, autorizar: Callable[[Dict[str, Any]], bool]) -> MiddlewarePerfilador:
+    """Instala o middleware em app.wsgi_app.
+
+    Configurações lidas de app.config (a cada request, podendo mudar em execução):
+        PERFILADOR_ATIVO: perfila uma amostra de todos os requests (padrão False).
+        PERFILADOR_AMOSTRAGEM: fração dos requests perfilados quando ativo (padrão 0.01).
+        PERFILADOR_DIRETORIO: diretório raiz dos perfis (padrão data/perfis).
+        PERFILADOR_ARQUIVOS_POR_ROTA: perfis mantidos por endpoint (padrão 20).
+    """
+    app.config.setdefault('PERFILADOR_ATIVO', False)
+    app.config.setdefault('PERFILADOR_AMOSTRAGEM', 0.01)
+    app.config.setdefault('PERFILADOR_DIRETORIO', os.path.join('data', 'perfis'))
+    app.config.setdefault('PERFILADOR_ARQUIVOS_POR_ROTA', 20)
+    middleware = MiddlewarePerfilador(app, app.wsgi_app, autorizar)
+    app.wsgi_app = middleware
+    return middleware
@@ -0,0 +1,450 @@
+# laticinios_armazem/relatorios.py
+
+import json
+import logging
+import sqlite3
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from flask import current_app, has_app_context
+
+from cache import CacheReferencia
+import models
+from models import converter_data_iso, get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Linhas lidas do SQLite por vez e tamanho aproximado (em caracteres) de cada
+# parte enviada ao cliente na exportação do estoque geral.
+TAMANHO_BLOCO_LINHAS = 500
+TAMANHO_PARTE_JSON = 64 * 1024
+
+# Dimensões da consolidação diária de vendas (tabela vendas_diarias) aceitas
+# para agrupamento, com a expressão SQL de cada uma, e colunas aceitas como filtro.
+DIMENSOES_VENDAS_DIARIAS = {
+    'data': 'data',
+    'mes': 'substr(data, 1, 7)',
+    'id_catalogo_produto': 'id_catalogo_produto',
+    'area_origem_id': 'area_origem_id',
+    'destino': 'destino',
+}
+FILTROS_VENDAS_DIARIAS = ('id_catalogo_produto', 'area_origem_id', 'destino')
+
+# Quantidade de dias antes do vencimento em que um lote entra no alerta de validade.
+DIAS_ALERTA_VALIDADE_PADRAO = 7
+TIPOS_ARMAZENAMENTO = ('refrigerado', 'congelado', 'seco')
+# Chaves de ALERTA_VALIDADE_DIAS_POR_TIPO fora de TIPOS_ARMAZENAMENTO já avisadas no log.
+_tipos_alerta_desconhecidos = set()
+
+
+def estoque_total_por_produto() -> List[sqlite3.Row]:
+    """Retorna o estoque agregado de cada produto do catálogo, somando todas as áreas.
+
+    Lê a tabela resumo_estoque_produto, mantida por triggers a cada escrita em
+    produtos_areas (migracoes/0005_resumo_estoque.sql): o custo é de uma linha
+    por produto, independentemente do número de áreas e lotes.
+
+    Returns:
+        List[sqlite3.Row]: Linhas com id_catalogo_produto, nome, quantidade_total
+        e lotes, ordenadas pelo nome do produto.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        '''SELECT r.id_catalogo_produto, c.nome, r.quantidade_total, r.lotes
+           FROM resumo_estoque_produto r
+           JOIN produtos_catalogo c ON c.id_produto = r.id_catalogo_produto
+           ORDER BY c.nome'''
+    )
+    linhas = cursor.fetchall()
+    conn.close()
+    return linhas
+
+
+def estoque_total_por_area(id_area: Optional[str] = None) -> List[sqlite3.Row]:
+    """Retorna o estoque agregado por área e produto, a partir de resumo_estoque_area.
+
+    Args:
+        id_area: Se informado, restringe o resultado a uma área.
+
+    Returns:
+        List[sqlite3.Row]: Linhas com id_area, id_catalogo_produto, quantidade_total
+        e lotes, ordenadas por área e produto.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    if id_area is None:
+        cursor.execute('''SELECT id_area, id_catalogo_produto, quantidade_total, lotes
+                          FROM resumo_estoque_area ORDER BY id_area, id_catalogo_produto''')
+    else:
+        cursor.execute('''SELECT id_area, id_catalogo_produto, quantidade_total, lotes
+                          FROM resumo_estoque_area WHERE id_area = ? ORDER BY id_catalogo_produto''',
+                       (id_area,))
+    linhas = cursor.fetchall()
+    conn.close()
+    return linhas
+
+
+# Agregações de referência usadas para verificar e reconstruir o resumo do estoque.
+_SQL_RESUMO_AREA = '''SELECT id_area, id_catalogo_produto, SUM(quantidade) AS quantidade_total, COUNT(*) AS lotes
+                        FROM produtos_areas GROUP BY id_area, id_catalogo_produto'''
+_SQL_RESUMO_PRODUTO = '''SELECT id_catalogo_produto, SUM(quantidade) AS quantidade_total, COUNT(*) AS lotes
+                           FROM produtos_areas GROUP BY id_catalogo_produto'''
+
+
+def verificar_resumo_estoque() -> List[Dict[str, Any]]:
+    """Compara as tabelas de resumo com uma agregação completa de produtos_areas.
+
+    Returns:
+        List[Dict[str, Any]]: Uma entrada por divergência, com 'tabela', 'chave',
+        'esperado' e 'atual' ((quantidade_total, lotes) ou None). Lista vazia
+        quando o resumo está correto.
+    """
+    comparacoes = (
+        ('resumo_estoque_area', _SQL_RESUMO_AREA,
+         'SELECT id_area, id_catalogo_produto, quantidade_total, lotes FROM resumo_estoque_area', 2),
+        ('resumo_estoque_produto', _SQL_RESUMO_PRODUTO,
+         'SELECT id_catalogo_produto, quantidade_total, lotes FROM resumo_estoque_produto', 1),
+    )
+    divergencias: List[Dict[str, Any]] = []
+    conn = get_db_connection()
+    try:
+        for tabela, sql_esperado, sql_atual, tamanho_chave in comparacoes:
+            esperado = {tuple(r[:tamanho_chave]): tuple(r[tamanho_chave:]) for r in conn.execute(sql_esperado)}
+            atual = {tuple(r[:tamanho_chave]): tuple(r[tamanho_chave:]) for r in conn.execute(sql_atual)}
+            for chave in sorted(esperado.keys() | atual.keys()):
+                if esperado.get(chave) != atual.get(chave):
+                    divergencias.append({'tabela': tabela, 'chave': chave,
+                                         'esperado': esperado.get(chave), 'atual': atual.get(chave)})
+    finally:
+        conn.close()
+    return divergencias
+
+
+def reconstruir_resumo_estoque() -> None:
+    """Recalcula as tabelas de resumo do estoque a partir de produtos_areas, em uma transação."""
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('DELETE FROM resumo_estoque_area')
+        conn.execute('INSERT INTO resumo_estoque_area (id_area, id_catalogo_produto, quantidade_total, lotes) '
+                     + _SQL_RESUMO_AREA)
+        conn.execute('DELETE FROM resumo_estoque_produto')
+        conn.execute('INSERT INTO resumo_estoque_produto (id_catalogo_produto, quantidade_total, lotes) '
+                     + _SQL_RESUMO_PRODUTO)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _dias_alerta_por_tipo() -> Dict[str, int]:
+    # Lido de app.config a cada cálculo, para que mudanças em execução valham logo;
+    # fora de um app Flask todos os tipos usam DIAS_ALERTA_VALIDADE_PADRAO.
+    if has_app_context():
+        return current_app.config.get('ALERTA_VALIDADE_DIAS_POR_TIPO') or {}
+    return {}
+
+
+def janelas_alerta_validade() -> Dict[str, int]:
+    """Retorna a janela de alerta de validade (em dias) de cada tipo de armazenamento.
+
+    As janelas vêm de app.config['ALERTA_VALIDADE_DIAS_POR_TIPO'] (ex.:
+    {'congelado': 30}); tipos ausentes usam DIAS_ALERTA_VALIDADE_PADRAO.
+    Chaves que não são tipos de armazenamento (ex.: um erro de digitação)
+    são ignoradas, com um aviso no log na primeira vez.
+    """
+    dias_por_tipo = _dias_alerta_por_tipo()
+    for tipo in dias_por_tipo.keys() - set(TIPOS_ARMAZENAMENTO) - _tipos_alerta_desconhecidos:
+        _tipos_alerta_desconhecidos.add(tipo)
+        logger.warning("ALERTA_VALIDADE_DIAS_POR_TIPO: tipo de armazenamento desconhecido '%s' ignorado; "
+                       "tipos válidos: %s", tipo, ', '.join(TIPOS_ARMAZENAMENTO))
+    return {tipo: dias_por_tipo.get(tipo, DIAS_ALERTA_VALIDADE_PADRAO) for tipo in TIPOS_ARMAZENAMENTO}
+
+
+def alertas_validade(dias_antecedencia: Optional[int] = None,
+                     data_referencia: Optional[date] = None) -> List[sqlite3.Row]:
+    """Retorna os lotes vencidos ou que vencem dentro da janela de alerta.
+
+    Com 'dias_antecedencia' a mesma janela vale para todas as áreas; sem ele,
+    cada área usa a janela do seu tipo de armazenamento (janelas_alerta_validade).
+    O índice em produtos_areas(data_validade) limita a leitura aos lotes que
+    vencem até a maior das janelas, já unidos à área de armazenamento.
+
+    Returns:
+        List[sqlite3.Row]: Linhas com id, id_area, nome_area, id_catalogo_produto,
+        nome, quantidade, data_validade, lote, dias_para_vencer e status_validade
+        ('VENCIDO' ou 'PROXIMO_VENCIMENTO'), das mais antigas para as mais novas.
+    """
+    hoje = data_referencia or date.today()
+    if dias_antecedencia is not None:
+        janelas = {tipo: dias_antecedencia for tipo in TIPOS_ARMAZENAMENTO}
+    else:
+        janelas = janelas_alerta_validade()
+    parametros: Dict[str, Any] = {
+        'hoje': hoje.strftime('%Y-%m-%d'),
+        'limite': (hoje + timedelta(days=max(janelas.values()))).strftime('%Y-%m-%d'),
+    }
+    casos = []
+    for i, (tipo, dias) in enumerate(janelas.items()):
+        parametros[f'tipo{i}'] = tipo
+        parametros[f'limite{i}'] = (hoje + timedelta(days=dias)).strftime('%Y-%m-%d')
+        casos.append(f'WHEN :tipo{i} THEN :limite{i}')
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        f'''SELECT pa.id, pa.id_area, a.nome AS nome_area, pa.id_catalogo_produto, pa.nome,
+                  pa.quantidade, pa.data_validade, pa.lote,
+                  CAST(julianday(pa.data_validade) - julianday(:hoje) AS INTEGER) AS dias_para_vencer,
+                  CASE WHEN pa.data_validade < :hoje THEN 'VENCIDO' ELSE 'PROXIMO_VENCIMENTO' END AS status_validade
+           FROM produtos_areas pa
+           JOIN areas_armazem a ON a.id_area = pa.id_area
+           WHERE pa.data_validade <= :limite
+             AND pa.data_validade <= CASE a.tipo_armazenamento {' '.join(casos)} ELSE :limite END
+           ORDER BY pa.data_validade ASC, pa.id ASC''',
+        parametros
+    )
+    linhas = cursor.fetchall()
+    conn.close()
+    return linhas
+
+
+def _marca_alertas_validade(nome: str) -> tuple:
+    # Os alertas mudam com o estoque, com as áreas (tipo de armazenamento), com a
+    # configuração das janelas e com a virada do dia.
+    geracoes = models.geracoes_cache((nome, 'areas_armazem'))
+    return (models.DATABASE_PATH, geracoes[nome], geracoes['areas_armazem'],
+            date.today(), tuple(sorted(janelas_alerta_validade().items())))
+
+# Alertas de validade com as janelas configuradas, recalculados uma vez por dia
+# ou quando o estoque muda (ver migracoes/0007_geracao_estoque.sql). A tarefa
+# 'alertas_validade' do agendador recalcula em segundo plano quando a marca muda.
+cache_alertas_validade = CacheReferencia('produtos_areas', _marca_alertas_validade)
+models.caches_monitorados['alertas_validade'] = cache_alertas_validade
+
+
+def alertas_validade_atuais() -> List[sqlite3.Row]:
+    """Como alertas_validade() com as janelas configuradas, mas servido do cache."""
+    return list(cache_alertas_validade.obter(alertas_validade))
+
+
+def aquecer_alertas_validade() -> bool:
+    """Recalcula os alertas em cache se a marca mudou (novo dia, estoque ou janelas).
+
+    Retorna True se os alertas foram recalculados.
+    """
+    return cache_alertas_validade.aquecer(alertas_validade)
+
+
+def vendas_por_periodo(data_inicio: Optional[str] = None, data_fim: Optional[str] = None,
+                       agrupar_por: Sequence[str] = ('data', 'id_catalogo_produto'),
+                       filtros: Optional[Dict[str, str]] = None) -> List[sqlite3.Row]:
+    """Soma as vendas de um período a partir da consolidação diária (vendas_diarias).
+
+    Args:
+        data_inicio: Primeiro dia do período (AAAA-MM-DD), inclusive.
+        data_fim: Último dia do período (AAAA-MM-DD), inclusive.
+        agrupar_por: Dimensões de DIMENSOES_VENDAS_DIARIAS; vazio retorna só o total.
+        filtros: Igualdade sobre as colunas de FILTROS_VENDAS_DIARIAS.
+
+    Returns:
+        List[sqlite3.Row]: Uma linha por grupo, com as dimensões pedidas,
+        'unidades' e 'vendas', ordenadas pelas dimensões.
+
+    Raises:
+        ValueError: Para datas, dimensões ou filtros inválidos.
+    """
+    invalidas = [d for d in agrupar_por if d not in DIMENSOES_VENDAS_DIARIAS]
+    if invalidas:
+        raise ValueError(f"Agrupamento não suportado: {', '.join(invalidas)}")
+    filtros = filtros or {}
+    invalidos = [f for f in filtros if f not in FILTROS_VENDAS_DIARIAS]
+    if invalidos:
+        raise ValueError(f"Filtro não suportado: {', '.join(invalidos)}")
+
+    condicoes: List[str] = []
+    parametros: List[Any] = []
+    if data_inicio:
+        condicoes.append('data >= ?')
+        parametros.append(converter_data_iso(data_inicio).isoformat())
+    if data_fim:
+        condicoes.append('data <= ?')
+        parametros.append(converter_data_iso(data_fim).isoformat())
+    for coluna, valor in filtros.items():
+        condicoes.append(f'{coluna} = ?')
+        parametros.append(valor)
+
+    colunas = [f'{DIMENSOES_VENDAS_DIARIAS[d]} AS {d}' for d in agrupar_por]
+    sql = f"SELECT {', '.join(colunas + ['SUM(unidades) AS unidades', 'SUM(vendas) AS vendas'])} FROM vendas_diarias"
+    if condicoes:
+        sql += ' WHERE ' + ' AND '.join(condicoes)
+    if agrupar_por:
+        sql += f" GROUP BY {', '.join(agrupar_por)} ORDER BY {', '.join(agrupar_por)}"
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(sql, parametros)
+    linhas = cursor.fetchall()
+    conn.close()
+    if not agrupar_por and linhas and linhas[0]['vendas'] is None:
+        return []  # Nenhuma venda no período
+    return linhas
+
+
+def _periodo_vendas_diarias(data_inicio: Optional[str],
+                            data_fim: Optional[str]) -> Tuple[str, List[str], str, List[str]]:
+    """Monta os filtros do período para vendas_diarias (coluna data) e para vendas (coluna data_hora)."""
+    condicoes_consolidado: List[str] = []
+    parametros_consolidado: List[str] = []
+    condicoes_vendas: List[str] = []
+    parametros_vendas: List[str] = []
+    if data_inicio:
+        inicio = converter_data_iso(data_inicio).isoformat()
+        condicoes_consolidado.append('data >= ?')
+        parametros_consolidado.append(inicio)
+        condicoes_vendas.append('data_hora >= ?')
+        parametros_vendas.append(inicio)
+    if data_fim:
+        fim = converter_data_iso(data_fim).isoformat()
+        condicoes_consolidado.append('data <= ?')
+        parametros_consolidado.append(fim)
+        # data_hora é gravada como 'AAAA-MM-DD HH:MM:SS': o limite cobre o dia inteiro.
+        condicoes_vendas.append('data_hora <= ?')
+        parametros_vendas.append(fim + ' 23:59:59')
+    onde_consolidado = (' WHERE ' + ' AND '.join(condicoes_consolidado)) if condicoes_consolidado else ''
+    onde_vendas = (' WHERE ' + ' AND '.join(condicoes_vendas)) if condicoes_vendas else ''
+    return onde_consolidado, parametros_consolidado, onde_vendas, parametros_vendas
+
+
+# Agregação de vendas por dia, produto, área de origem e destino (o conteúdo esperado de vendas_diarias).
+_SQL_CONSOLIDAR_VENDAS = (
+    'SELECT date(data_hora), id_catalogo_produto, area_origem_id, destino, SUM(quantidade_vendida), COUNT(*) '
+    'FROM vendas{onde} GROUP BY date(data_hora), id_catalogo_produto, area_origem_id, destino')
+
+
+def verificar_vendas_diarias(data_inicio: Optional[str] = None,
+                             data_fim: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Compara vendas_diarias com uma agregação da tabela vendas no período (ou em tudo, se omitido).
+
+    Returns:
+        List[Dict[str, Any]]: Uma entrada por divergência, com 'chave' ((data,
+        id_catalogo_produto, area_origem_id, destino)), 'esperado' e 'atual'
+        ((unidades, vendas) ou None). Lista vazia quando a consolidação está correta.
+    """
+    onde_consolidado, parametros_consolidado, onde_vendas, parametros_vendas = \
+        _periodo_vendas_diarias(data_inicio, data_fim)
+    conn = get_db_connection()
+    try:
+        esperado = {tuple(r[:4]): tuple(r[4:]) for r in
+                    conn.execute(_SQL_CONSOLIDAR_VENDAS.format(onde=onde_vendas), parametros_vendas)}
+        atual = {tuple(r[:4]): tuple(r[4:]) for r in conn.execute(
+            'SELECT data, id_catalogo_produto, area_origem_id, destino, unidades, vendas FROM vendas_diarias'
+            + onde_consolidado, parametros_consolidado)}
+    finally:
+        conn.close()
+    return [{'chave': chave, 'esperado': esperado.get(chave), 'atual': atual.get(chave)}
+            for chave in sorted(esperado.keys() | atual.keys(), key=repr)
+            if esperado.get(chave) != atual.get(chave)]
+
+
+def reconstruir_vendas_diarias(data_inicio: Optional[str] = None, data_fim: Optional[str] = None) -> int:
+    """Recalcula a consolidação diária a partir da tabela vendas (backfill).
+
+    Apenas os dias do período informado (ou todos, se omitido) são apagados e
+    recalculados, em uma única transação.
+
+    Returns:
+        int: Número de linhas gravadas em vendas_diarias.
+    """
+    onde_consolidado, parametros_consolidado, onde_vendas, parametros_vendas = \
+        _periodo_vendas_diarias(data_inicio, data_fim)
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('DELETE FROM vendas_diarias' + onde_consolidado, parametros_consolidado)
+        cursor = conn.execute(
+            'INSERT INTO vendas_diarias (data, id_catalogo_produto, area_origem_id, destino, unidades, vendas) '
+            + _SQL_CONSOLIDAR_VENDAS.format(onde=onde_vendas),
+            parametros_vendas
+        )
+        gravadas = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return gravadas
+
+
+# Consulta de iterar_estoque_geral: uma única junção, na ordem de AreaArmazem.listar_todas().
+_SQL_ESTOQUE_GERAL = '''SELECT a.id_area, a.nome AS nome_area, a.tipo_armazenamento,
+                                pa.id, pa.id_catalogo_produto, pa.nome, pa.quantidade, pa.data_validade, pa.lote
+                         FROM areas_armazem a
+                         LEFT JOIN produtos_areas pa ON pa.id_area = a.id_area
+                         ORDER BY a.nome, a.id_area, pa.data_validade, pa.id'''
+
+
+def iterar_estoque_geral() -> Iterator[sqlite3.Row]:
+    """Percorre todas as áreas (por nome) com seus lotes (por validade e id).
+
+    Cada linha traz os dados da área (id_area, nome_area, tipo_armazenamento)
+    e de um lote; áreas vazias aparecem uma vez com as colunas do lote nulas.
+    As linhas são lidas em blocos de TAMANHO_BLOCO_LINHAS, sem montar a lista
+    completa em memória.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(_SQL_ESTOQUE_GERAL)
+        while True:
+            linhas = cursor.fetchmany(TAMANHO_BLOCO_LINHAS)
+            if not linhas:
+                break
+            yield from linhas
+    finally:
+        conn.close()
+
+
+def estoque_geral_json() -> Iterator[str]:
+    """Gera o estoque completo em JSON, em partes, agrupado por área.
+
+    O formato é o mesmo de [area.to_dict() for area in AreaArmazem.listar_todas()],
+    na mesma ordem (áreas por nome), mas produzido a partir de uma leitura
+    sequencial dos lotes e enviado aos poucos, de modo que o uso de memória
+    não cresce com o número de lotes.
+    """
+    buffer: List[str] = ['[']
+    tamanho = 1
+    area_atual = None
+    primeiro_produto = True
+    for linha in iterar_estoque_geral():
+        if linha['id_area'] != area_atual:
+            # Fecha a área anterior e abre a nova, deixando a lista de produtos aberta.
+            separador = ']},' if area_atual is not None else ''
+            cabecalho = json.dumps({'id_area': linha['id_area'], 'nome': linha['nome_area'],
+                                    'tipo_armazenamento': linha['tipo_armazenamento']}, ensure_ascii=False)
+            texto = separador + cabecalho[:-1] + ', "produtos": ['
+            area_atual = linha['id_area']
+            primeiro_produto = True
+            buffer.append(texto)
+            tamanho += len(texto)
+        if linha['id'] is not None:
+            produto = json.dumps({
+                'id': linha['id'],
+                'id_catalogo_produto': linha['id_catalogo_produto'],
+                'nome': linha['nome'],
+                'quantidade': linha['quantidade'],
+                'data_validade': linha['data_validade'],
+                'lote': linha['lote'],
+            }, ensure_ascii=False)
+            texto = produto if primeiro_produto else ',' + produto
+            primeiro_produto = False
+            buffer.append(texto)
+            tamanho += len(texto)
+        if tamanho >= TAMANHO_PARTE_JSON:
+            yield ''.join(buffer)
+            buffer, tamanho = [], 0
+    buffer.append(']}]' if area_atual is not None else ']')
+    yield ''.join(buffer)
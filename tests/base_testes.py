@@ -0,0 +1,51 @@
+# laticinios_armazem/tests/base_testes.py
+
+import unittest
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Evita que a importação do app inicialize o banco de dados real em data/.
+os.environ.setdefault('LATICINIOS_DATABASE_PATH', os.path.join(tempfile.gettempdir(), 'laticinios_testes.db'))
+
+import conexao
+import models
+
+class DiretorioTemporarioTestCase(unittest.TestCase):
+    """Cria self.tmpdir para cada teste e fecha o pool de conexões ao final."""
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        # Os cleanups rodam depois do tearDown das subclasses, em ordem inversa.
+        self.addCleanup(conexao.fechar_pool)
+
+class BancoTemporarioTestCase(DiretorioTemporarioTestCase):
+    """Aponta models.DATABASE_PATH para um banco novo, migrado e com os dados iniciais."""
+
+    popular_dados = True
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(setattr, models, 'DATABASE_PATH', models.DATABASE_PATH)
+        models.DATABASE_PATH = os.path.join(self.tmpdir.name, 'teste.db')
+        models.init_db()
+        if self.popular_dados:
+            models.popular_dados_iniciais()
+
+class AppTestCase(BancoTemporarioTestCase):
+    """Banco temporário e um cliente de testes do app logado como gerente."""
+
+    def setUp(self):
+        super().setUp()
+        from app import app
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self._logar('admin', 'admin123')
+
+    def _logar(self, username, senha):
+        with self.client.session_transaction() as sess:
+            sess['username'] = username
+            sess['password'] = senha
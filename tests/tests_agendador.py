@@ -0,0 +1,128 @@
+# laticinios_armazem/tests/tests_agendador.py
+
+import unittest
+import time
+from unittest import mock
+
+from base_testes import AppTestCase
+from app import app
+import agendador
+import models
+import relatorios
+from agendador import Agendador
+from models import AreaArmazem, Venda
+
+class AgendadorTests(unittest.TestCase):
+    def test_executa_apenas_tarefas_vencidas(self):
+        execucoes = []
+        ag = Agendador()
+        ag.adicionar('imediata', lambda: execucoes.append('imediata'), intervalo=60, atraso_inicial=0)
+        ag.adicionar('depois', lambda: execucoes.append('depois'), intervalo=60)
+        self.assertEqual(ag.executar_pendentes(), ['imediata'])
+        self.assertEqual(ag.executar_pendentes(), [])
+        # Executadas na ordem em que venceram.
+        self.assertEqual(ag.executar_pendentes(agora=time.monotonic() + 61), ['depois', 'imediata'])
+        self.assertEqual(execucoes, ['imediata', 'depois', 'imediata'])
+        self.assertEqual(ag.estatisticas()['tarefas']['imediata']['execucoes'], 2)
+
+    def test_falha_e_registrada_sem_interromper(self):
+        def falhar():
+            raise RuntimeError('disco cheio')
+        ag = Agendador()
+        ag.adicionar('falha', falhar, intervalo=60, atraso_inicial=0)
+        ag.adicionar('ok', lambda: None, intervalo=60, atraso_inicial=0)
+        with self.assertLogs('agendador', level='ERROR'):
+            self.assertEqual(ag.executar_pendentes(), ['falha', 'ok'])
+        tarefas = ag.estatisticas()['tarefas']
+        self.assertEqual(tarefas['falha']['falhas'], 1)
+        self.assertIn('disco cheio', tarefas['falha']['ultimo_erro'])
+        self.assertEqual(tarefas['ok']['falhas'], 0)
+        self.assertIsNotNone(tarefas['ok']['ultima_duracao'])
+
+    def test_thread_executa_e_para(self):
+        ag = Agendador()
+        ag.adicionar('tarefa', lambda: None, intervalo=0.01, atraso_inicial=0)
+        ag.iniciar()
+        try:
+            limite = time.monotonic() + 5
+            while ag.estatisticas()['tarefas']['tarefa']['execucoes'] < 3 and time.monotonic() < limite:
+                time.sleep(0.01)
+        finally:
+            ag.parar()
+        self.assertGreaterEqual(ag.estatisticas()['tarefas']['tarefa']['execucoes'], 3)
+        self.assertFalse(ag.em_execucao)
+
+class TarefasManutencaoTests(AppTestCase):
+    def _id_lote(self, lote):
+        return next(p.id for p in AreaArmazem.buscar_por_id('REF01').listar_produtos() if p.lote == lote)
+
+    def test_tarefas_padrao(self):
+        ag = agendador.agendador
+        self.assertFalse(ag.em_execucao)  # Nunca iniciado em modo de teste
+        for nome in ('resumos', 'alertas_validade', 'manutencao_banco'):
+            with self.subTest(tarefa=nome):
+                self.assertTrue(ag.executar_agora(nome))
+
+    def test_resumos_corrige_divergencia(self):
+        conn = models.get_db_connection()
+        conn.execute('DELETE FROM resumo_estoque_produto')
+        conn.commit()
+        conn.close()
+        with self.assertLogs('agendador', level='WARNING'):
+            agendador.atualizar_resumos()
+        self.assertEqual(relatorios.verificar_resumo_estoque(), [])
+
+    def test_resumos_so_grava_com_divergencia(self):
+        self.assertTrue(Venda.vender('REF01', self._id_lote('LOTE2025A'), 2, 'Cliente A', 'admin')[0])
+        with mock.patch.object(relatorios, 'reconstruir_vendas_diarias') as reconstruir:
+            agendador.atualizar_resumos()
+        reconstruir.assert_not_called()
+
+        conn = models.get_db_connection()
+        conn.execute('DELETE FROM vendas_diarias')
+        conn.commit()
+        conn.close()
+        with self.assertLogs('agendador', level='WARNING'):
+            agendador.atualizar_resumos()
+        self.assertEqual(relatorios.verificar_vendas_diarias(), [])
+
+    def test_alertas_recalculados_so_quando_a_marca_muda(self):
+        cache = relatorios.cache_alertas_validade
+        cache.invalidar()
+        with mock.patch.object(relatorios, 'alertas_validade', wraps=relatorios.alertas_validade) as calcular:
+            agendador.aquecer_alertas_validade(app)
+            agendador.aquecer_alertas_validade(app)
+            self.assertEqual(calcular.call_count, 1)
+            Venda.vender('REF01', self._id_lote('LOTE2025A'), 1, 'Cliente A', 'admin')
+            agendador.aquecer_alertas_validade(app)
+            self.assertEqual(calcular.call_count, 2)
+            # As janelas de app.config fazem parte da marca: a tarefa roda no contexto do app.
+            self.addCleanup(app.config.__setitem__, 'ALERTA_VALIDADE_DIAS_POR_TIPO',
+                            app.config['ALERTA_VALIDADE_DIAS_POR_TIPO'])
+            app.config['ALERTA_VALIDADE_DIAS_POR_TIPO'] = {'seco': 1}
+            agendador.aquecer_alertas_validade(app)
+            self.assertEqual(calcular.call_count, 3)
+        # O request seguinte é servido do cache, sem recalcular.
+        acertos = cache.acertos
+        with app.app_context():
+            relatorios.alertas_validade_atuais()
+        self.assertEqual(cache.acertos, acertos + 1)
+
+    def test_banco_novo_usa_vacuum_incremental(self):
+        conn = models.get_db_connection()
+        try:
+            self.assertEqual(conn.execute('PRAGMA auto_vacuum').fetchone()[0], 2)
+        finally:
+            conn.close()
+        agendador.manutencao_banco()
+
+    def test_api_estatisticas_agendador(self):
+        agendador.agendador.executar_agora('resumos')
+        response = self.client.get('/api/monitoramento/agendador')
+        self.assertEqual(response.status_code, 200)
+        tarefas = response.get_json()['tarefas']
+        self.assertGreaterEqual(tarefas['resumos']['execucoes'], 1)
+        self.assertEqual(set(tarefas), {'resumos', 'alertas_validade', 'manutencao_banco'})
+
+if __name__ == '__main__':
+    unittest.main()
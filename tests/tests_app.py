@@ -3,8 +3,12 @@
 import unittest
 import sys
 import os
+import tempfile
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+# Evita que a importação do app inicialize o banco de dados real em data/.
+os.environ.setdefault('LATICINIOS_DATABASE_PATH', os.path.join(tempfile.gettempdir(), 'laticinios_testes.db'))
+
 from app import app
 from models import db_areas_armazem, db_vendas_registradas, popular_dados_iniciais, AreaArmazem, ProdutoLacteo
 
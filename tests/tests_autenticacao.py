@@ -0,0 +1,76 @@
+# laticinios_armazem/tests/tests_autenticacao.py
+
+import unittest
+from unittest import mock
+
+from base_testes import AppTestCase
+from app import app
+import models
+from models import Usuario, cache_usuarios
+
+class CacheUsuarioTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ttl_original = app.config['CACHE_USUARIO_TTL']
+        cache_usuarios.invalidar()
+
+    def tearDown(self):
+        app.config['CACHE_USUARIO_TTL'] = self.ttl_original
+        cache_usuarios.invalidar()
+
+    def _contar_consultas(self, url):
+        with mock.patch.object(Usuario, 'verificar_senha', wraps=Usuario.verificar_senha) as verificar:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return verificar.call_count
+
+    def _login(self, username='admin', senha='admin123'):
+        self.client.get('/logout')
+        response = self.client.post('/login', data={'username': username, 'password': senha})
+        self.assertEqual(response.status_code, 302)
+
+    def _alterar_usuario(self, sql, parametros):
+        # Escrita direta no banco, como faria outro processo ou uma ferramenta externa.
+        conn = models.get_db_connection()
+        conn.execute(sql, parametros)
+        conn.commit()
+        conn.close()
+
+    def test_cache_desligado_por_padrao(self):
+        self.assertEqual(self.ttl_original, 0)
+        self._login()
+        self.assertEqual(self._contar_consultas('/armazem'), 1)
+        self.assertEqual(self._contar_consultas('/armazem'), 1)
+
+    def test_nenhuma_consulta_dentro_do_ttl(self):
+        app.config['CACHE_USUARIO_TTL'] = 60
+        self._login()
+        self.assertEqual(self._contar_consultas('/armazem'), 1)
+        self.assertEqual(self._contar_consultas('/armazem'), 0)
+
+    def test_sessao_sem_id_nao_usa_cache(self):
+        app.config['CACHE_USUARIO_TTL'] = 60
+        self.assertEqual(self._contar_consultas('/armazem'), 1)  # Sessão montada pelo AppTestCase
+        self.assertEqual(self._contar_consultas('/armazem'), 1)
+
+    def test_ttl_lido_a_cada_request(self):
+        app.config['CACHE_USUARIO_TTL'] = 60
+        self._login()
+        self.assertEqual(self._contar_consultas('/armazem'), 1)
+        app.config['CACHE_USUARIO_TTL'] = 0
+        self.assertEqual(self._contar_consultas('/armazem'), 1)
+
+    def test_alteracao_de_usuario_invalida_o_cache(self):
+        app.config['CACHE_USUARIO_TTL'] = 60
+        self._login('joao.silva', 'operador123')
+        self.assertEqual(self._contar_consultas('/armazem'), 1)
+        self.assertEqual(self._contar_consultas('/armazem'), 0)
+
+        self._alterar_usuario('UPDATE usuarios SET nome = ? WHERE username = ?', ('João S.', 'joao.silva'))
+        self.assertEqual(self._contar_consultas('/armazem'), 1)
+
+        self._alterar_usuario('UPDATE usuarios SET senha = ? WHERE username = ?', ('outra123', 'joao.silva'))
+        self.assertEqual(self.client.get('/armazem').status_code, 302)  # Sessão invalidada
+
+if __name__ == '__main__':
+    unittest.main()
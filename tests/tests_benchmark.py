@@ -0,0 +1,67 @@
+# laticinios_armazem/tests/tests_benchmark.py
+
+import unittest
+import os
+import sqlite3
+from datetime import date
+
+from base_testes import DiretorioTemporarioTestCase
+import models
+from benchmark import CENARIOS, comparar_resultados, executar_cenarios, gerar_dados
+
+PARAMETROS_PEQUENOS = {'areas': 3, 'produtos': 10, 'lotes_por_area': 20, 'anos_vendas': 0.1, 'vendas_por_dia': 5,
+                       'data_referencia': date(2025, 6, 1)}
+
+class BenchmarkTests(DiretorioTemporarioTestCase):
+    def _conteudo(self, caminho):
+        conn = sqlite3.connect(caminho)
+        try:
+            return (conn.execute('SELECT * FROM produtos_areas ORDER BY id').fetchall(),
+                    conn.execute('SELECT * FROM vendas ORDER BY id').fetchall())
+        finally:
+            conn.close()
+
+    def test_gerador_deterministico(self):
+        caminhos = [os.path.join(self.tmpdir.name, f'{nome}.db') for nome in ('a', 'b')]
+        contagens = [gerar_dados(caminho, **PARAMETROS_PEQUENOS) for caminho in caminhos]
+        self.assertEqual(contagens[0], contagens[1])
+        self.assertEqual(contagens[0]['produtos_areas'], 60)
+        self.assertEqual(contagens[0]['vendas'], 180)
+        self.assertEqual(self._conteudo(caminhos[0]), self._conteudo(caminhos[1]))
+        with self.assertRaises(FileExistsError):
+            gerar_dados(caminhos[0])
+
+    def test_cenarios(self):
+        caminho = os.path.join(self.tmpdir.name, 'bench.db')
+        gerar_dados(caminho, **PARAMETROS_PEQUENOS)
+        resultado = executar_cenarios(caminho, repeticoes=3, aquecimento=1)
+        self.assertEqual(set(resultado), set(CENARIOS))
+        for nome, medidas in resultado.items():
+            with self.subTest(cenario=nome):
+                self.assertEqual(medidas['requisicoes'], 3)
+                self.assertLessEqual(medidas['p50_ms'], medidas['p99_ms'])
+                self.assertGreaterEqual(medidas['consultas_por_requisicao'], 1)
+                self.assertTrue(set(medidas['status']) <= {'200', '302'}, medidas['status'])
+        with self.assertRaises(ValueError):
+            executar_cenarios(caminho, cenarios=['inexistente'])
+
+    def test_cenarios_usam_apenas_o_banco_informado(self):
+        caminho = os.path.join(self.tmpdir.name, 'bench.db')
+        gerar_dados(caminho, **PARAMETROS_PEQUENOS)
+        caminho_original = models.DATABASE_PATH
+        vendas_antes = self._conteudo(caminho)[1]
+        resultado = executar_cenarios(caminho, repeticoes=2, aquecimento=0, cenarios=['venda', 'armazem'])
+        self.assertEqual(models.DATABASE_PATH, caminho_original)
+        self.assertEqual(len(self._conteudo(caminho)[1]), len(vendas_antes) + 2)
+        self.assertEqual(resultado['venda']['status'], {'302': 2})
+        self.assertGreaterEqual(resultado['armazem']['consultas_por_requisicao'], 1)
+
+    def test_comparar_resultados(self):
+        base = {'armazem': {'p95_ms': 10.0, 'consultas_por_requisicao': 2}}
+        self.assertEqual(comparar_resultados(base, {'armazem': {'p95_ms': 12.0, 'consultas_por_requisicao': 2}}), [])
+        regressoes = comparar_resultados(base, {'armazem': {'p95_ms': 10.0, 'consultas_por_requisicao': 5}})
+        self.assertEqual(len(regressoes), 1)
+        self.assertIn('consultas_por_requisicao', regressoes[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+# laticinios_armazem/tests/tests_cache.py
+
+import unittest
+import sqlite3
+
+from base_testes import AppTestCase
+import models
+from models import AreaArmazem, ProdutoCatalogo, cache_areas, cache_catalogo
+
+class CacheReferenciaTests(AppTestCase):
+    def test_segunda_leitura_vem_do_cache(self):
+        falhas, acertos = cache_areas.falhas, cache_areas.acertos
+        primeira = AreaArmazem.listar_todas()
+        segunda = AreaArmazem.listar_todas()
+        self.assertEqual([a.id_area for a in primeira], [a.id_area for a in segunda])
+        self.assertEqual(cache_areas.falhas - falhas, 1)
+        self.assertEqual(cache_areas.acertos - acertos, 1)
+        # Cada chamada recebe sua própria lista.
+        segunda.clear()
+        self.assertEqual(len(AreaArmazem.listar_todas()), 3)
+
+    def test_escritas_invalidam_o_cache(self):
+        ProdutoCatalogo.listar_todos()
+        ProdutoCatalogo.criar('KEFIR001', 'Kefir 500g')
+        self.assertIn('KEFIR001', [p.id_produto for p in ProdutoCatalogo.listar_todos()])
+        ProdutoCatalogo.buscar_por_id('KEFIR001').atualizar('Kefir Natural 500g')
+        self.assertIn('Kefir Natural 500g', [p.nome for p in ProdutoCatalogo.listar_todos()])
+        ProdutoCatalogo.buscar_por_id('KEFIR001').deletar()
+        self.assertNotIn('KEFIR001', [p.id_produto for p in ProdutoCatalogo.listar_todos()])
+
+        AreaArmazem.listar_todas()
+        AreaArmazem.criar('CONG02', 'Câmara Fria 2', 'congelado')
+        self.assertIn('CONG02', [a.id_area for a in AreaArmazem.listar_todas()])
+
+    def test_escrita_de_outro_processo_invalida_pela_geracao(self):
+        self.assertNotIn('EXTERNA', [a.id_area for a in AreaArmazem.listar_todas()])
+        # Outra conexão (como a de outro processo) não passa pelos métodos do modelo.
+        externa = sqlite3.connect(models.DATABASE_PATH)
+        externa.execute("INSERT INTO areas_armazem (id_area, nome, tipo_armazenamento) VALUES ('EXTERNA', 'Externa', 'seco')")
+        externa.commit()
+        externa.close()
+        self.assertIn('EXTERNA', [a.id_area for a in AreaArmazem.listar_todas()])
+
+    def test_api_estatisticas(self):
+        ProdutoCatalogo.listar_todos()
+        ProdutoCatalogo.listar_todos()
+        response = self.client.get('/api/monitoramento/caches')
+        self.assertEqual(response.status_code, 200)
+        dados = response.get_json()
+        self.assertLessEqual({'usuarios', 'catalogo', 'areas'}, set(dados))
+        self.assertGreaterEqual(dados['catalogo']['acertos'], 1)
+        self.assertGreater(dados['catalogo']['taxa_acerto'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+# laticinios_armazem/tests/tests_conexao.py
+
+import unittest
+import os
+import sqlite3
+import threading
+
+from flask import Flask
+
+from base_testes import DiretorioTemporarioTestCase
+import conexao
+from conexao import PoolConexoes
+
+class PoolConexoesTests(DiretorioTemporarioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+
+    def tearDown(self):
+        conexao.configurar(tamanho=5, timeout=30.0, pragmas={}, perfil=conexao.PERFIL_PADRAO)
+
+    def test_close_devolve_conexao_para_reutilizacao(self):
+        pool = PoolConexoes(self.db_path, tamanho=2)
+        conn = pool.obter()
+        conn.close()
+        self.assertIs(pool.obter(), conn)
+        self.assertEqual(pool.criadas, 1)
+        pool.fechar()
+
+    def test_pragmas_aplicados_na_criacao(self):
+        pool = PoolConexoes(self.db_path, pragmas={'foreign_keys': 'ON', 'cache_size': -4000})
+        conn = pool.obter()
+        self.assertEqual(conn.execute('PRAGMA foreign_keys').fetchone()[0], 1)
+        self.assertEqual(conn.execute('PRAGMA cache_size').fetchone()[0], -4000)
+        self.assertIsInstance(conn.execute('SELECT 1 AS um').fetchone(), sqlite3.Row)
+        conn.close()
+        pool.fechar()
+
+    def test_pool_esgotado_gera_erro_apos_timeout(self):
+        pool = PoolConexoes(self.db_path, tamanho=1, timeout=0.05)
+        conn = pool.obter()
+        with self.assertRaises(sqlite3.OperationalError):
+            pool.obter()
+        conn.close()
+        pool.fechar()
+
+    def test_devolver_descarta_transacao_pendente(self):
+        pool = PoolConexoes(self.db_path, tamanho=1)
+        conn = pool.obter()
+        conn.execute('CREATE TABLE t (x INTEGER)')
+        conn.commit()
+        conn.execute('INSERT INTO t VALUES (1)')
+        conn.close()
+        conn = pool.obter()
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM t').fetchone()[0], 0)
+        conn.close()
+        pool.fechar()
+
+    def test_uso_concorrente_respeita_tamanho(self):
+        pool = PoolConexoes(self.db_path, tamanho=3)
+        erros = []
+
+        def trabalhar():
+            try:
+                for _ in range(20):
+                    conn = pool.obter()
+                    conn.execute('SELECT 1').fetchone()
+                    conn.close()
+            except Exception as e:
+                erros.append(e)
+
+        threads = [threading.Thread(target=trabalhar) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(erros, [])
+        self.assertLessEqual(pool.criadas, 3)
+        pool.fechar()
+
+    def test_conexao_compartilhada_durante_o_request(self):
+        app = Flask(__name__)
+        conexao.init_app(app)
+        with app.test_request_context('/'):
+            conn1 = conexao.obter_conexao(self.db_path)
+            conn1.close()
+            conn2 = conexao.obter_conexao(self.db_path)
+            self.assertIs(conn1, conn2)
+            conn2.close()
+            pool = conexao.obter_pool(self.db_path)
+            self.assertEqual(pool.livres, 0)
+        # Após o teardown a conexão volta para o pool.
+        self.assertEqual(pool.livres, 1)
+
+class PerfilArmazenamentoTests(DiretorioTemporarioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+
+    def tearDown(self):
+        conexao.configurar(tamanho=5, timeout=30.0, pragmas={}, perfil=conexao.PERFIL_PADRAO)
+
+    def test_perfil_desempenho_aplicado_em_cada_conexao(self):
+        conexao.configurar(perfil='desempenho')
+        conn = conexao.obter_conexao(self.db_path)
+        self.assertEqual(conn.execute('PRAGMA synchronous').fetchone()[0], 1)  # NORMAL
+        self.assertEqual(conn.execute('PRAGMA busy_timeout').fetchone()[0], 5000)
+        self.assertEqual(conn.execute('PRAGMA temp_store').fetchone()[0], 2)  # MEMORY
+        conn.close()
+
+    def test_perfil_duravel_usa_synchronous_full(self):
+        conexao.configurar(perfil='duravel')
+        conn = conexao.obter_conexao(self.db_path)
+        self.assertEqual(conn.execute('PRAGMA synchronous').fetchone()[0], 2)  # FULL
+        conn.close()
+
+    def test_pragmas_extras_sobrescrevem_perfil(self):
+        conexao.configurar(perfil='desempenho', pragmas={'busy_timeout': 100})
+        conn = conexao.obter_conexao(self.db_path)
+        self.assertEqual(conn.execute('PRAGMA busy_timeout').fetchone()[0], 100)
+        conn.close()
+
+    def test_perfil_persistente_ativa_wal(self):
+        conn = conexao.obter_conexao(self.db_path)
+        conexao.aplicar_perfil_persistente(conn, 'duravel')
+        self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        conn.close()
+
+    def test_perfil_desconhecido(self):
+        with self.assertRaises(ValueError):
+            conexao.configurar(perfil='turbo')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+# laticinios_armazem/tests/tests_consultas_lentas.py
+
+import unittest
+import io
+import os
+import logging
+import queue
+
+from base_testes import BancoTemporarioTestCase
+from app import app
+import consultas_lentas
+import importacao
+import metricas
+from consultas_lentas import QueueHandlerDescartavel, redigir_parametros
+from models import AreaArmazem, Venda
+
+class ColetorRegistros(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.registros = []
+
+    def emit(self, record):
+        self.registros.append(record)
+
+class FuncoesAuxiliaresTests(unittest.TestCase):
+    def test_redigir_parametros(self):
+        self.assertEqual(redigir_parametros(('REF01', 3, None, 2.5, b'abc')),
+                         ['<texto:5>', 3, None, 2.5, '<binario:3>'])
+        self.assertEqual(redigir_parametros({'destino': 'Cliente X'}), {'destino': '<texto:9>'})
+
+    def test_fila_cheia_descarta_sem_bloquear(self):
+        handler = QueueHandlerDescartavel(queue.Queue(maxsize=1))
+        registro = logging.LogRecord('teste', logging.WARNING, __file__, 1, 'msg', None, None)
+        handler.emit(registro)
+        handler.emit(registro)
+        self.assertEqual(handler.descartados, 1)
+
+class LogConsultasLentasTests(BancoTemporarioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.coletor = ColetorRegistros()
+
+    def tearDown(self):
+        consultas_lentas.desativar()
+
+    def _registros(self):
+        consultas_lentas.desativar()  # Aguarda a thread de escrita esvaziar a fila
+        return self.coletor.registros
+
+    def test_registra_origem_parametros_e_plano(self):
+        antes = metricas.consultas_lentas.valor()
+        consultas_lentas.ativar(limite_ms=0, handlers=[self.coletor])
+        self.assertIsNotNone(AreaArmazem.buscar_por_id('REF01'))
+        registros = [r for r in self._registros() if 'areas_armazem' in r.sql]
+        self.assertTrue(registros)
+        registro = registros[0]
+        self.assertIn('AreaArmazem.buscar_por_id (models.py:', registro.origem)
+        self.assertEqual(registro.parametros, ['<texto:5>'])
+        self.assertNotIn('REF01', registro.getMessage())
+        self.assertTrue(any('areas_armazem' in linha for linha in registro.plano))
+        self.assertGreater(metricas.consultas_lentas.valor(), antes)
+
+    def test_limite_ignora_consultas_rapidas(self):
+        consultas_lentas.ativar(limite_ms=60_000, handlers=[self.coletor])
+        Venda.listar_pagina()
+        self.assertEqual(self._registros(), [])
+
+    def test_executemany_e_cronometrado(self):
+        consultas_lentas.ativar(limite_ms=0, handlers=[self.coletor])
+        csv = ('id_area,id_catalogo_produto,quantidade,data_validade,lote\n'
+               'SECO01,LEITE001,10,2030-01-01,LT1\nSECO01,LEITE001,5,2030-01-01,LT2\n')
+        sucesso, relatorio = importacao.importar_estoque_csv(io.StringIO(csv))
+        self.assertTrue(sucesso, relatorio)
+        registros = [r for r in self._registros() if r.sql.startswith('INSERT INTO produtos_areas')]
+        self.assertEqual(len(registros), 1)
+        self.assertIn('importar_estoque_csv (importacao.py:', registros[0].origem)
+        self.assertIn('<texto:3>', registros[0].parametros)  # Primeiro conjunto: lote LT1
+
+    def test_origem_no_modulo_principal(self):
+        # Com 'python app.py' as funções do app rodam no módulo '__main__'; vale o arquivo.
+        escopo = {'__name__': '__main__', 'metodo_chamador': consultas_lentas.metodo_chamador}
+        exec(compile('def rota():\n    return metodo_chamador()\n',
+                     os.path.join(consultas_lentas.DIRETORIO_PROJETO, 'app.py'), 'exec'), escopo)
+        self.assertTrue(escopo['rota']().startswith('rota (app.py:2)'))
+
+    def test_desativar_restaura_o_logger(self):
+        logger = consultas_lentas.logger
+        estado = (logger.level, logger.propagate)
+        consultas_lentas.ativar(limite_ms=0, handlers=[self.coletor])
+        self.assertFalse(logger.propagate)
+        consultas_lentas.desativar()
+        self.assertEqual((logger.level, logger.propagate), estado)
+
+    def test_init_app_grava_em_arquivo(self):
+        arquivo = os.path.join(self.tmpdir.name, 'logs', 'consultas_lentas.log')
+        config_original = {chave: app.config[chave] for chave in ('CONSULTA_LENTA_LIMITE_MS', 'CONSULTA_LENTA_ARQUIVO')}
+        app.config.update(CONSULTA_LENTA_LIMITE_MS=0, CONSULTA_LENTA_ARQUIVO=arquivo)
+        try:
+            consultas_lentas.init_app(app)
+            self.assertTrue(consultas_lentas.esta_ativo())
+            Venda.listar_pagina(filtros={'destino': 'Cliente Secreto'})
+            consultas_lentas.desativar()
+        finally:
+            app.config.update(config_original)
+        with open(arquivo, encoding='utf-8') as f:
+            conteudo = f.read()
+        self.assertIn('Consulta lenta:', conteudo)
+        self.assertIn('Venda.listar_pagina', conteudo)
+        self.assertNotIn('Cliente Secreto', conteudo)
+
+if __name__ == '__main__':
+    unittest.main()
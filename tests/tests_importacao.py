@@ -0,0 +1,145 @@
+# laticinios_armazem/tests/tests_importacao.py
+
+import unittest
+import os
+import io
+import sqlite3
+from unittest import mock
+
+from base_testes import AppTestCase
+from app import app
+import importacao
+import models
+import relatorios
+from models import AreaArmazem
+
+CABECALHO = 'id_area,id_catalogo_produto,quantidade,data_validade,lote\n'
+
+class ImportacaoEstoqueTests(AppTestCase):
+    def _lotes(self, id_area):
+        return {p.lote: p.quantidade for p in AreaArmazem.buscar_por_id(id_area).listar_produtos()}
+
+    def test_importa_em_blocos_e_soma_lotes_existentes(self):
+        linhas = ''.join(f'SECO01,LEITE001,{i + 1},2030-01-01,IMP{i:04d}\n' for i in range(1200))
+        linhas += 'REF01,QUEIJO001,5,2030-01-01,LOTE2025A\n'
+        sucesso, relatorio = importacao.importar_estoque_csv(io.StringIO(CABECALHO + linhas))
+        self.assertTrue(sucesso, relatorio)
+        self.assertEqual((relatorio['linhas'], relatorio['aplicadas'], relatorio['erros']), (1201, 1201, []))
+        lotes = self._lotes('SECO01')
+        self.assertEqual(len(lotes), 1201)
+        self.assertEqual(lotes['IMP1199'], 1200)
+        self.assertEqual(self._lotes('REF01')['LOTE2025A'], 55)
+        self.assertEqual(relatorios.verificar_resumo_estoque(), [])
+
+    def test_linhas_invalidas_nao_gravam_nada(self):
+        csv = CABECALHO + ('SECO01,LEITE001,10,2030-01-01,OK1\n'
+                           'XXX,LEITE001,10,2030-01-01,L2\n'
+                           'SECO01,NAOEXISTE,10,2030-01-01,L3\n'
+                           'SECO01,LEITE001,-1,2030-01-01,L4\n'
+                           'SECO01,LEITE001,10,01/01/2030,L5\n'
+                           'SECO01,LEITE001,10,2030-01-01,\n')
+        sucesso, relatorio = importacao.importar_estoque_csv(io.StringIO(csv))
+        self.assertFalse(sucesso)
+        self.assertEqual([e['linha'] for e in relatorio['erros']], [3, 4, 5, 6, 7])
+        self.assertIn("Área 'XXX'", relatorio['erros'][0]['mensagem'])
+        self.assertIn('catálogo', relatorio['erros'][1]['mensagem'])
+        self.assertIn('lote', relatorio['erros'][4]['mensagem'])
+        self.assertEqual(relatorio['aplicadas'], 0)
+        self.assertNotIn('OK1', self._lotes('SECO01'))
+
+    def test_cabecalho_invalido(self):
+        sucesso, relatorio = importacao.importar_estoque_csv(io.StringIO('area,produto\nSECO01,LEITE001\n'))
+        self.assertFalse(sucesso)
+        self.assertIn('Coluna(s) ausente(s)', relatorio['erros'][0]['mensagem'])
+
+    def test_upload_pela_rota(self):
+        dados = (CABECALHO + 'CONG01,MANTE001,12,2030-03-01,UPLOAD1\n').encode('utf-8-sig')
+        response = self.client.post('/admin/estoque/importar', data={'arquivo': (io.BytesIO(dados), 'recebimento.csv')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Importação concluída: 1 lote(s)'.encode(), response.data)
+        self.assertEqual(self._lotes('CONG01')['UPLOAD1'], 12)
+
+    def test_campo_entre_aspas_com_quebra_de_linha(self):
+        dados = (CABECALHO + 'CONG01,MANTE001,2,2030-03-01,"LOTE\r\nDUPLO"\r\n'
+                 'CONG01,MANTE001,3,2030-03-01,SIMPLES\r\n').encode('utf-8')
+        response = self.client.post('/admin/estoque/importar', data={'arquivo': (io.BytesIO(dados), 'recebimento.csv')},
+                                    content_type='multipart/form-data')
+        self.assertIn('Importação concluída: 2 lote(s)'.encode(), response.data)
+        lotes = self._lotes('CONG01')
+        self.assertEqual((lotes['LOTE\r\nDUPLO'], lotes['SIMPLES']), (2, 3))
+
+    def test_upload_acima_do_limite_de_tamanho(self):
+        self.addCleanup(app.config.__setitem__, 'MAX_CONTENT_LENGTH', app.config['MAX_CONTENT_LENGTH'])
+        app.config['MAX_CONTENT_LENGTH'] = 1024
+        dados = (CABECALHO + 'CONG01,MANTE001,12,2030-03-01,GRANDE\n' * 100).encode('utf-8')
+        response = self.client.post('/admin/estoque/importar', data={'arquivo': (io.BytesIO(dados), 'recebimento.csv')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('limite de'.encode(), response.data)
+        self.assertNotIn('GRANDE', self._lotes('CONG01'))
+
+    def test_limite_de_linhas(self):
+        csv = CABECALHO + 'SECO01,LEITE001,1,2030-01-01,LIM1\n' * 4
+        with mock.patch.object(importacao, 'LINHAS_IMPORTACAO_MAX', 3):
+            sucesso, relatorio = importacao.importar_estoque_csv(io.StringIO(csv))
+        self.assertFalse(sucesso)
+        self.assertEqual(relatorio['erros'][0]['linha'], 5)
+        self.assertIn('limite de 3 linhas', relatorio['erros'][0]['mensagem'])
+        self.assertNotIn('LIM1', self._lotes('SECO01'))
+
+    def test_lote_minusculo_soma_no_lote_existente(self):
+        sucesso, relatorio = importacao.importar_estoque_csv(
+            io.StringIO(CABECALHO + 'REF01,QUEIJO001,5,2030-01-01, lote2025a \n'))
+        self.assertTrue(sucesso, relatorio)
+        lotes = self._lotes('REF01')
+        self.assertEqual(lotes['LOTE2025A'], 55)
+        self.assertNotIn('lote2025a', lotes)
+
+    def test_arquivo_fora_de_utf8(self):
+        dados = (CABECALHO + 'SECO01,LEITE001,10,2030-01-01,AÇÃO1\n').encode('cp1252')
+        response = self.client.post('/admin/estoque/importar', data={'arquivo': (io.BytesIO(dados), 'planilha.csv')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('não está em UTF-8'.encode(), response.data)
+
+        cabecalho_latin1 = io.TextIOWrapper(io.BytesIO('área,produto\n'.encode('latin-1')), encoding='utf-8')
+        sucesso, relatorio = importacao.importar_estoque_csv(cabecalho_latin1)
+        self.assertFalse(sucesso)
+        self.assertEqual(relatorio['erros'][0]['linha'], 1)
+        self.assertIn('UTF-8', relatorio['erros'][0]['mensagem'])
+
+    def test_bloqueio_de_escrita_livre_durante_a_leitura(self):
+        def linhas():
+            yield CABECALHO
+            for i in range(3):
+                # Outro escritor consegue abrir uma transação enquanto o arquivo é lido.
+                outro = sqlite3.connect(models.DATABASE_PATH, timeout=0, isolation_level=None)
+                try:
+                    outro.execute('BEGIN IMMEDIATE')
+                    outro.rollback()
+                finally:
+                    outro.close()
+                yield f'SECO01,LEITE001,1,2030-01-01,LEITURA{i}\n'
+        sucesso, relatorio = importacao.importar_estoque_csv(linhas())
+        self.assertTrue(sucesso, relatorio)
+        self.assertEqual(relatorio['aplicadas'], 3)
+
+    def test_comando_cli(self):
+        caminho = os.path.join(self.tmpdir.name, 'recebimento.csv')
+        with open(caminho, 'w', encoding='utf-8') as f:
+            f.write(CABECALHO + 'REF01,IOGUR001,3,2030-01-01,CLI1\n')
+        resultado = app.test_cli_runner().invoke(args=['importar-estoque', caminho])
+        self.assertEqual(resultado.exit_code, 0, resultado.output)
+        self.assertEqual(self._lotes('REF01')['CLI1'], 3)
+
+    def test_comando_cli_preserva_quebra_de_linha_entre_aspas(self):
+        caminho = os.path.join(self.tmpdir.name, 'recebimento.csv')
+        with open(caminho, 'wb') as f:
+            f.write((CABECALHO + 'REF01,IOGUR001,4,2030-01-01,"CLI\r\n2"\r\n').encode('utf-8-sig'))
+        resultado = app.test_cli_runner().invoke(args=['importar-estoque', caminho])
+        self.assertEqual(resultado.exit_code, 0, resultado.output)
+        self.assertEqual(self._lotes('REF01')['CLI\r\n2'], 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# laticinios_armazem/tests/tests_instrumentacao.py
+
+import unittest
+from unittest import mock
+
+from base_testes import AppTestCase
+import instrumentacao
+import models
+import relatorios
+from instrumentacao import ColetorConsultas, CursorInstrumentado
+
+class ColetorConsultasTests(unittest.TestCase):
+    def test_guarda_apenas_as_mais_lentas(self):
+        coletor = ColetorConsultas()
+        for i, duracao in enumerate([0.001, 0.005, 0.002, 0.009, 0.003]):
+            coletor.registrar(f'SELECT {i}', duracao)
+        self.assertEqual(coletor.total, 5)
+        self.assertAlmostEqual(coletor.tempo_total, 0.020)
+        self.assertEqual([sql for _, sql in coletor.mais_lentas()], ['SELECT 3', 'SELECT 1', 'SELECT 4'])
+
+class InstrumentacaoRequestTests(AppTestCase):
+    def tearDown(self):
+        instrumentacao.desativar()
+
+    def test_desativada_nao_adiciona_cabecalho(self):
+        response = self.client.get('/armazem')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response.headers)
+
+    def test_server_timing_conta_consultas_do_request(self):
+        instrumentacao.ativar()
+        with self.assertLogs('instrumentacao', level='DEBUG') as logs:
+            response = self.client.get('/armazem/REF01')
+        self.assertEqual(response.status_code, 200)
+        cabecalhos = response.headers.getlist('Server-Timing')
+        self.assertEqual(len(cabecalhos), 2)
+        self.assertRegex(cabecalhos[0], r'^db;dur=\d+\.\d{2};desc="\d+ consultas"$')
+        total = int(cabecalhos[0].split('desc="')[1].split()[0])
+        self.assertGreater(total, 0)
+        self.assertTrue(cabecalhos[1].startswith('app;dur='))
+        self.assertIn('GET /armazem/REF01 -> 200', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    def test_conexao_aberta_passa_a_usar_cursor_instrumentado(self):
+        conn = models.get_db_connection()
+        try:
+            self.assertNotIsInstance(conn.cursor(), CursorInstrumentado)
+            instrumentacao.ativar()
+            self.assertIsInstance(conn.cursor(), CursorInstrumentado)
+            self.assertIsInstance(conn.execute('SELECT 1'), CursorInstrumentado)
+            instrumentacao.desativar()
+            self.assertNotIsInstance(conn.execute('SELECT 1'), CursorInstrumentado)
+        finally:
+            conn.close()
+
+    def test_coletor_do_processo_conta_fora_de_requests(self):
+        with instrumentacao.coletar_processo() as coletor:
+            models.geracao_cache('produtos_areas')
+            self.assertEqual(coletor.total, 1)
+            # Respostas em streaming consultam o banco depois do after_request e também entram.
+            with mock.patch.object(coletor, 'registrar', wraps=coletor.registrar) as registrar:
+                self.client.get('/api/estoque_geral').get_data()
+            self.assertIn(relatorios._SQL_ESTOQUE_GERAL, [chamada.args[0] for chamada in registrar.call_args_list])
+        self.assertFalse(instrumentacao.esta_ativa())
+        conn = models.get_db_connection()
+        try:
+            self.assertNotIsInstance(conn.cursor(), CursorInstrumentado)
+        finally:
+            conn.close()
+
+    def test_api_liga_e_desliga(self):
+        response = self.client.post('/api/monitoramento/instrumentacao', json={'ativa': True})
+        self.assertEqual(response.get_json(), {'ativa': True})
+        self.assertIn('Server-Timing', self.client.get('/armazem').headers)
+
+        response = self.client.post('/api/monitoramento/instrumentacao', json={'ativa': 'sim'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/monitoramento/instrumentacao', json={'ativa': False})
+        self.assertEqual(response.get_json(), {'ativa': False})
+        self.assertNotIn('Server-Timing', self.client.get('/armazem').headers)
+
+    def test_api_exige_gerente(self):
+        self._logar('joao.silva', 'operador123')
+        response = self.client.post('/api/monitoramento/instrumentacao', json={'ativa': True})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(instrumentacao.esta_ativa())
+
+if __name__ == '__main__':
+    unittest.main()
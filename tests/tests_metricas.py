@@ -0,0 +1,129 @@
+# laticinios_armazem/tests/tests_metricas.py
+
+import unittest
+import sqlite3
+import threading
+
+from base_testes import AppTestCase
+from app import app
+import metricas
+import models
+from metricas import Contador, RegistroMetricas
+from models import Venda
+
+class MetricasBasicasTests(unittest.TestCase):
+    def test_contador_seguro_entre_threads(self):
+        contador = Contador('teste_total', 'Teste.', ('tipo',))
+        def incrementar():
+            for _ in range(1000):
+                contador.inc(tipo='a')
+        threads = [threading.Thread(target=incrementar) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(contador.valor(tipo='a'), 8000)
+        with self.assertRaises(ValueError):
+            contador.inc(outro='b')
+        with self.assertRaises(ValueError):
+            contador.inc(-1, tipo='a')
+
+    def test_formato_prometheus(self):
+        registro = RegistroMetricas()
+        registro.contador('vendas_total', 'Vendas.', ('area',)).inc(2, area='REF"01')
+        histograma = registro.histograma('duracao_segundos', 'Duração.', buckets=(0.1, 1.0))
+        for valor in (0.05, 0.5, 5.0):
+            histograma.observar(valor)
+        registro.calculada('pool_tamanho', 'gauge', 'Tamanho.', lambda: [({}, 5)])
+        texto = registro.exportar()
+        self.assertIn('# TYPE vendas_total counter\n', texto)
+        self.assertIn('vendas_total{area="REF\\"01"} 2.0\n', texto)
+        self.assertIn('duracao_segundos_bucket{le="0.1"} 1\n', texto)
+        self.assertIn('duracao_segundos_bucket{le="1.0"} 2\n', texto)
+        self.assertIn('duracao_segundos_bucket{le="+Inf"} 3\n', texto)
+        self.assertIn('duracao_segundos_count 3\n', texto)
+        self.assertIn('pool_tamanho 5.0\n', texto)
+
+class EndpointMetricasTests(AppTestCase):
+    def tearDown(self):
+        app.config.update(METRICAS_TOKEN=None, METRICAS_PUBLICO=False)
+
+    def test_requests_por_rota(self):
+        antes = metricas.duracao_requisicoes.total(rota='/armazem/<id_area>', metodo='GET')
+        self.client.get('/armazem/REF01')
+        self.client.get('/armazem/CONG01')
+        self.assertEqual(metricas.duracao_requisicoes.total(rota='/armazem/<id_area>', metodo='GET'), antes + 2)
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        texto = response.get_data(as_text=True)
+        self.assertIn('laticinios_http_requisicoes_total{rota="/armazem/<id_area>",metodo="GET",status="200"}', texto)
+        self.assertIn('laticinios_http_duracao_segundos_bucket{rota="/armazem/<id_area>",metodo="GET",le="+Inf"}', texto)
+        self.assertIn('laticinios_pool_conexoes{estado="em_uso"}', texto)
+        self.assertIn('laticinios_cache_taxa_acerto{cache="usuarios"}', texto)
+
+    def test_contadores_de_vendas_e_recebimentos(self):
+        vendas_antes = metricas.vendas.valor(operacao='vender')
+        unidades_antes = metricas.unidades_vendidas.valor(operacao='vender')
+        conn = models.get_db_connection()
+        id_instancia = conn.execute("SELECT id FROM produtos_areas WHERE lote = 'LOTE2025A'").fetchone()['id']
+        conn.close()
+        sucesso, _ = Venda.vender('REF01', id_instancia, 3, 'Cliente', 'admin')
+        self.assertTrue(sucesso)
+        sucesso, _ = Venda.vender('REF01', id_instancia, 10000, 'Cliente', 'admin')
+        self.assertFalse(sucesso)
+        self.assertEqual(metricas.vendas.valor(operacao='vender'), vendas_antes + 1)
+        self.assertEqual(metricas.unidades_vendidas.valor(operacao='vender'), unidades_antes + 3)
+
+        recebimentos_antes = metricas.unidades_recebidas.valor(origem='cadastro')
+        area = models.AreaArmazem.buscar_por_id('REF01')
+        produto = models.ProdutoLacteo('QUEIJO001', 'Queijo', 5, '2030-01-01', 'LOTE-M1')
+        area.adicionar_produto(produto)
+        self.assertEqual(metricas.unidades_recebidas.valor(origem='cadastro'), recebimentos_antes + 5)
+
+    def test_espera_e_erro_de_bloqueio(self):
+        esperas_antes = metricas.esperas_bloqueio.valor()
+        erros_antes = metricas.erros_bloqueio.valor()
+
+        outro = sqlite3.connect(models.DATABASE_PATH, isolation_level=None, check_same_thread=False)
+        outro.execute('BEGIN IMMEDIATE')
+        liberar = threading.Timer(0.05, outro.commit)
+        liberar.start()
+        conn = models.get_db_connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')  # Aguarda o outro escritor (busy_timeout)
+            conn.rollback()
+            liberar.join()
+            self.assertEqual(metricas.esperas_bloqueio.valor(), esperas_antes + 1)
+
+            outro.execute('BEGIN IMMEDIATE')
+            conn.execute('PRAGMA busy_timeout = 0')
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute('BEGIN IMMEDIATE')
+            self.assertEqual(metricas.erros_bloqueio.valor(), erros_antes + 1)
+        finally:
+            outro.rollback()
+            outro.close()
+            conn.encerrar()  # Não devolve ao pool a conexão sem busy_timeout
+        self.assertGreater(metricas.tempo_espera_bloqueio.valor(), 0)
+
+    def test_token_de_coleta(self):
+        app.config['METRICAS_TOKEN'] = 'segredo'
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        for invalido in ('Bearer segred', 'Bearer segredo2', 'Bearer sêgredo'):
+            with self.subTest(cabecalho=invalido):
+                self.assertEqual(self.client.get('/metrics', headers={'Authorization': invalido}).status_code, 401)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer segredo'},
+                                   environ_base={'REMOTE_ADDR': '10.0.0.5'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_sem_token_apenas_conexoes_locais(self):
+        remota = {'REMOTE_ADDR': '10.0.0.5'}
+        self.assertEqual(self.client.get('/metrics', environ_base=remota).status_code, 403)
+        self.assertEqual(self.client.get('/metrics', environ_base={'REMOTE_ADDR': '::1'}).status_code, 200)
+        app.config['METRICAS_PUBLICO'] = True
+        self.assertEqual(self.client.get('/metrics', environ_base=remota).status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+# laticinios_armazem/tests/tests_modelos.py
+
+import unittest
+import threading
+from datetime import date, datetime
+
+from base_testes import BancoTemporarioTestCase
+import models
+from models import AreaArmazem, ProdutoCatalogo, ProdutoLacteo, Venda, converter_data_hora_iso, converter_data_iso
+
+class MapeamentoLinhasTests(BancoTemporarioTestCase):
+    def test_modelos_sem_dict_por_instancia(self):
+        objetos = [ProdutoCatalogo('X', 'X'), AreaArmazem('X', 'X', 'seco'),
+                   ProdutoLacteo('X', 'X', 1, '2030-01-01', 'L'),
+                   Venda('X', 'X', 'L', '2030-01-01', 1, 'D', 'A', 'u')]
+        for objeto in objetos:
+            with self.subTest(classe=type(objeto).__name__):
+                self.assertFalse(hasattr(objeto, '__dict__'))
+
+    def test_converter_data_iso(self):
+        self.assertEqual(converter_data_iso('2030-01-31'), date(2030, 1, 31))
+        self.assertIs(converter_data_iso('2030-01-31'), converter_data_iso('2030-01-31'))
+        for invalida in ('20300131', '31/01/2030', '2030-02-30'):
+            with self.subTest(data=invalida), self.assertRaises(ValueError):
+                converter_data_iso(invalida)
+        with self.assertRaises(ValueError):
+            ProdutoLacteo('X', 'X', 1, '2030/01/01', 'L')
+
+    def test_listar_produtos_mapeia_todas_as_colunas(self):
+        area = AreaArmazem.buscar_por_id('REF01')
+        area.adicionar_produto(ProdutoLacteo('LEITE001', 'Leite UHT Integral 1L', 4, '2030-06-01', 'LT9'))
+        produtos = {p.lote: p for p in area.listar_produtos()}
+        produto = produtos['LT9']
+        self.assertEqual((produto.id_catalogo_produto, produto.nome, produto.quantidade, produto.data_validade),
+                         ('LEITE001', 'Leite UHT Integral 1L', 4, date(2030, 6, 1)))
+        self.assertEqual(ProdutoLacteo.buscar_instancia_por_id(produto.id).to_dict(), produto.to_dict())
+
+    def test_venda_de_linha(self):
+        Venda.registrar(Venda('QUEIJO001', 'Queijo Mussarela Peça 1kg', 'LOTE2025A', '2030-01-01', 2,
+                              'Cliente', 'REF01', 'admin', data_hora=datetime(2025, 1, 10, 8, 30, 5)))
+        venda = Venda.listar_todas()[0]
+        self.assertEqual(venda.data_hora, datetime(2025, 1, 10, 8, 30, 5))
+        self.assertEqual(venda.quantidade_vendida, 2)
+        self.assertIs(converter_data_hora_iso('2025-01-10 08:30:05'), converter_data_hora_iso('2025-01-10 08:30:05'))
+
+    def test_linhas_gravadas_fora_do_formato_nao_quebram_a_listagem(self):
+        # Datas sem zeros à esquerda, aceitas pelo strptime usado antes do conversor estrito.
+        area = AreaArmazem.buscar_por_id('REF01')
+        area.adicionar_produto(ProdutoLacteo('LEITE001', 'Leite UHT Integral 1L', 4, '2030-06-01', 'LT9'))
+        conn = models.get_db_connection()
+        try:
+            conn.execute("UPDATE produtos_areas SET data_validade = '2030-6-1' WHERE lote = 'LT9'")
+            conn.commit()
+        finally:
+            conn.close()
+        linha_venda = {'id': 1, 'id_catalogo_produto': 'QUEIJO001', 'nome': 'Queijo', 'lote': 'L',
+                       'data_validade_produto': '2030-01-01', 'quantidade_vendida': 1, 'destino': 'D',
+                       'area_origem_id': 'REF01', 'usuario_responsavel': 'admin', 'data_hora': '2025-1-10 8:30:05'}
+        with self.assertLogs('models', level='WARNING'):
+            produtos = {p.lote: p for p in area.listar_produtos()}
+            venda = Venda._de_linha(linha_venda)
+        self.assertEqual(produtos['LT9'].data_validade, date(2030, 6, 1))
+        self.assertEqual(venda.data_hora, datetime(2025, 1, 10, 8, 30, 5))
+        # A entrada do usuário continua validada no formato estrito.
+        with self.assertRaises(ValueError):
+            ProdutoLacteo('X', 'X', 1, '2030-6-1', 'L')
+
+class AdicionarProdutoTests(BancoTemporarioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.area = AreaArmazem.buscar_por_id('REF01')
+
+    def _produto(self, quantidade, validade='2030-01-01'):
+        return ProdutoLacteo('IOGUR001', 'Iogurte Natural 170g', quantidade, validade, 'CONC1')
+
+    def test_retorna_id_e_soma_no_mesmo_lote(self):
+        id_instancia = self.area.adicionar_produto(self._produto(4))
+        self.assertEqual(self.area.adicionar_produto(self._produto(6, '2031-01-01')), id_instancia)
+        instancia = ProdutoLacteo.buscar_instancia_por_id(id_instancia)
+        self.assertEqual(instancia.quantidade, 10)
+        self.assertEqual(instancia.data_validade, date(2030, 1, 1))  # Validade do primeiro recebimento
+
+    def test_recebimentos_concorrentes_nao_perdem_quantidade(self):
+        ids, erros = [], []
+
+        def receber():
+            try:
+                for _ in range(5):
+                    ids.append(AreaArmazem.buscar_por_id('REF01').adicionar_produto(self._produto(1)))
+            except Exception as e:
+                erros.append(e)
+
+        threads = [threading.Thread(target=receber) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(erros, [])
+        self.assertEqual(len(set(ids)), 1)
+        self.assertEqual(ProdutoLacteo.buscar_instancia_por_id(ids[0]).quantidade, 100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+# laticinios_armazem/tests/tests_perfilador.py
+
+import unittest
+import cProfile
+import os
+from unittest import mock
+
+from base_testes import AppTestCase
+from app import app
+import perfilador
+
+class PerfiladorTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.config_original = {chave: app.config[chave] for chave in
+                                ('PERFILADOR_ATIVO', 'PERFILADOR_AMOSTRAGEM', 'PERFILADOR_DIRETORIO',
+                                 'PERFILADOR_ARQUIVOS_POR_ROTA')}
+        self.diretorio = os.path.join(self.tmpdir.name, 'perfis')
+        app.config['PERFILADOR_DIRETORIO'] = self.diretorio
+
+    def tearDown(self):
+        app.config.update(self.config_original)
+
+    def _get(self, url, **kwargs):
+        # Como um servidor WSGI, fecha a resposta: é no close() que o perfil é gravado.
+        response = self.client.get(url, **kwargs)
+        response.get_data()
+        response.close()
+        return response
+
+    def _perfis(self, endpoint):
+        diretorio = os.path.join(self.diretorio, endpoint)
+        if not os.path.isdir(diretorio):
+            return []
+        return [nome for nome in os.listdir(diretorio) if nome.endswith(perfilador.EXTENSAO_PERFIL)]
+
+    def test_desligado_nao_perfila(self):
+        self._get('/armazem/REF01')
+        self.assertFalse(os.path.exists(self.diretorio))
+
+    def test_amostragem_grava_perfil_por_endpoint_com_rotacao(self):
+        app.config.update(PERFILADOR_ATIVO=True, PERFILADOR_AMOSTRAGEM=1.0, PERFILADOR_ARQUIVOS_POR_ROTA=2)
+        for _ in range(4):
+            self.assertEqual(self._get('/armazem/REF01').status_code, 200)
+        self.assertEqual(len(self._perfis('detalhes_da_area')), 2)
+
+        perfis = perfilador.funcoes_mais_lentas(self.diretorio, limite=500, ordenar_por='cumulative')
+        self.assertEqual(perfis['detalhes_da_area']['perfis'], 2)
+        funcoes = [funcao['funcao'] for funcao in perfis['detalhes_da_area']['funcoes']]
+        self.assertTrue(any(funcao.startswith('listar_produtos (models.py:') for funcao in funcoes))
+
+    def test_perfis_no_mesmo_segundo_nao_se_sobrescrevem(self):
+        middleware = app.wsgi_app
+        self.assertIsInstance(middleware, perfilador.MiddlewarePerfilador)
+        for _ in range(3):
+            middleware._gravar(cProfile.Profile(), 'rota_teste', 0.001)
+        self.assertEqual(len(self._perfis('rota_teste')), 3)
+
+    def test_resposta_em_streaming_entra_no_perfil(self):
+        app.config.update(PERFILADOR_ATIVO=True, PERFILADOR_AMOSTRAGEM=1.0)
+        response = self._get('/api/estoque_geral')
+        self.assertIn(b'LOTE2025A', response.get_data())
+        perfis = perfilador.funcoes_mais_lentas(self.diretorio, limite=500)
+        funcoes = [funcao['funcao'] for funcao in perfis['api_estoque_geral']['funcoes']]
+        self.assertTrue(any(funcao.startswith('estoque_geral_json (relatorios.py:') for funcao in funcoes))
+
+    def test_cabecalho_aceito_apenas_de_gerente(self):
+        self._logar('joao.silva', 'operador123')
+        self._get('/armazem', headers={perfilador.CABECALHO_PERFILAR: '1'})
+        self.assertEqual(self._perfis('pagina_inicial_armazem'), [])
+
+        self._logar('admin', 'admin123')
+        self._get('/armazem', headers={perfilador.CABECALHO_PERFILAR: '1'})
+        self.assertEqual(len(self._perfis('pagina_inicial_armazem')), 1)
+
+    def test_cabecalho_sem_sessao_nao_consulta_o_banco(self):
+        anonimo = app.test_client()
+        with mock.patch.object(app.wsgi_app, 'autorizar') as autorizar:
+            response = anonimo.get('/login', headers={perfilador.CABECALHO_PERFILAR: '1'})
+            self.assertEqual(response.status_code, 200)
+            autorizar.assert_not_called()
+            # Com o cookie de sessão a permissão é verificada.
+            self._get('/armazem', headers={perfilador.CABECALHO_PERFILAR: '1'})
+            autorizar.assert_called_once()
+        self.assertEqual(self._perfis('login'), [])
+
+    def test_pagina_admin(self):
+        self._get('/armazem', headers={perfilador.CABECALHO_PERFILAR: '1'})
+        response = self.client.get('/admin/perfis?ordenar=cumulative')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'pagina_inicial_armazem', response.data)
+
+        self._logar('joao.silva', 'operador123')
+        self.assertEqual(self.client.get('/admin/perfis').status_code, 302)
+
+    def test_ordenacao_invalida(self):
+        with self.assertRaises(ValueError):
+            perfilador.funcoes_mais_lentas(self.diretorio, ordenar_por='nome')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,285 @@
+# laticinios_armazem/tests/tests_relatorios.py
+
+import unittest
+from unittest import mock
+from datetime import date, datetime, timedelta
+
+from base_testes import AppTestCase, BancoTemporarioTestCase
+from app import app
+import models
+import relatorios
+from models import AreaArmazem, ProdutoLacteo, Venda
+
+class RelatoriosTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        hoje = date.today()
+        area = AreaArmazem.buscar_por_id('REF01')
+        area.adicionar_produto(ProdutoLacteo('QUEIJO001', 'Queijo Mussarela Peça 1kg', 5,
+                                             (hoje - timedelta(days=2)).strftime('%Y-%m-%d'), 'VENCIDO1'))
+        outra_area = AreaArmazem.buscar_por_id('SECO01')
+        outra_area.adicionar_produto(ProdutoLacteo('QUEIJO001', 'Queijo Mussarela Peça 1kg', 7,
+                                                   (hoje + timedelta(days=3)).strftime('%Y-%m-%d'), 'PROXIMO1'))
+
+    def test_estoque_total_soma_todas_as_areas(self):
+        totais = {linha['id_catalogo_produto']: linha['quantidade_total']
+                  for linha in relatorios.estoque_total_por_produto()}
+        self.assertEqual(totais['QUEIJO001'], 50 + 5 + 7)
+        self.assertEqual(totais['LEITE001'], 200)
+
+    def test_alertas_validade_apenas_dentro_da_janela(self):
+        alertas = relatorios.alertas_validade(7)
+        self.assertEqual([a['lote'] for a in alertas], ['VENCIDO1', 'PROXIMO1'])
+        self.assertEqual(alertas[0]['status_validade'], 'VENCIDO')
+        self.assertEqual(alertas[0]['dias_para_vencer'], -2)
+        self.assertEqual(alertas[1]['status_validade'], 'PROXIMO_VENCIMENTO')
+        self.assertEqual(alertas[1]['nome_area'], 'Depósito Seco A')
+
+    def _janelas_alerta(self, dias_por_tipo):
+        self.addCleanup(app.config.__setitem__, 'ALERTA_VALIDADE_DIAS_POR_TIPO',
+                        app.config['ALERTA_VALIDADE_DIAS_POR_TIPO'])
+        app.config['ALERTA_VALIDADE_DIAS_POR_TIPO'] = dias_por_tipo
+
+    def test_janela_de_alerta_por_tipo_de_armazenamento(self):
+        # PROXIMO1 (seco) vence em 3 dias; LOTE2025B (refrigerado) em 15.
+        self._janelas_alerta({'seco': 2, 'refrigerado': 20})
+        with app.app_context():
+            self.assertEqual([a['lote'] for a in relatorios.alertas_validade()], ['VENCIDO1', 'LOTE2025B'])
+            self.assertEqual([a['lote'] for a in relatorios.alertas_validade(7)], ['VENCIDO1', 'PROXIMO1'])
+        # Fora do app todos os tipos usam a janela padrão.
+        self.assertEqual([a['lote'] for a in relatorios.alertas_validade()], ['VENCIDO1', 'PROXIMO1'])
+
+    def test_tipo_desconhecido_na_janela_de_alerta_gera_aviso(self):
+        self.addCleanup(relatorios._tipos_alerta_desconhecidos.clear)
+        self._janelas_alerta({'refrigerdo': 30, 'seco': 2})
+        with app.app_context():
+            with self.assertLogs('relatorios', level='WARNING') as logs:
+                janelas = relatorios.janelas_alerta_validade()
+            self.assertIn('refrigerdo', logs.output[0])
+            self.assertEqual(janelas, {'refrigerado': 7, 'congelado': 7, 'seco': 2})
+            # O aviso sai uma vez só, não a cada cálculo.
+            with self.assertNoLogs('relatorios', level='WARNING'):
+                relatorios.janelas_alerta_validade()
+
+    def test_marca_dos_alertas_le_as_geracoes_em_uma_consulta(self):
+        consultas = []
+        conn = models.get_db_connection()
+        conn.set_trace_callback(consultas.append)
+        try:
+            with mock.patch.object(models, 'get_db_connection', return_value=conn):
+                marca = relatorios._marca_alertas_validade('produtos_areas')
+        finally:
+            conn.set_trace_callback(None)
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(marca[1:3], (models.geracao_cache('produtos_areas'), models.geracao_cache('areas_armazem')))
+        self.assertEqual(models.geracoes_cache(('areas_armazem', 'inexistente'))['inexistente'], 0)
+
+    def test_alertas_em_cache_ate_o_estoque_mudar(self):
+        cache = relatorios.cache_alertas_validade
+        self.assertEqual([a['lote'] for a in relatorios.alertas_validade_atuais()], ['VENCIDO1', 'PROXIMO1'])
+        acertos = cache.acertos
+        relatorios.alertas_validade_atuais()
+        self.assertEqual(cache.acertos, acertos + 1)
+
+        hoje = date.today()
+        AreaArmazem.buscar_por_id('CONG01').adicionar_produto(ProdutoLacteo(
+            'MANTE001', 'Manteiga com Sal 200g', 1, (hoje + timedelta(days=1)).strftime('%Y-%m-%d'), 'NOVO1'))
+        self.assertEqual([a['lote'] for a in relatorios.alertas_validade_atuais()], ['VENCIDO1', 'NOVO1', 'PROXIMO1'])
+        self._janelas_alerta({'seco': 1})
+        with app.app_context():
+            self.assertEqual([a['lote'] for a in relatorios.alertas_validade_atuais()], ['VENCIDO1', 'NOVO1'])
+
+    def test_pagina_relatorios(self):
+        response = self.client.get('/relatorios')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Estoque Atual Agregado', response.data)
+        self.assertIn(b'VENCIDO1', response.data)
+        self.assertIn(b'PROXIMO1', response.data)
+
+    def test_api_estoque_geral_igual_ao_to_dict(self):
+        AreaArmazem.criar('VAZIA', 'Área Vazia', 'seco')
+        relatorios_tamanho_original = relatorios.TAMANHO_PARTE_JSON
+        relatorios.TAMANHO_PARTE_JSON = 10  # Força várias partes na resposta
+        try:
+            response = self.client.get('/api/estoque_geral')
+        finally:
+            relatorios.TAMANHO_PARTE_JSON = relatorios_tamanho_original
+        self.assertEqual(response.status_code, 200)
+        # Mesma ordem da resposta original: áreas por nome.
+        self.assertEqual(response.get_json(), [area.to_dict() for area in AreaArmazem.listar_todas()])
+
+    def test_estoque_geral_em_uma_consulta_na_ordem_das_areas(self):
+        # id_area e nome em ordens opostas: a resposta segue o nome, como listar_todas().
+        AreaArmazem.criar('AAA', 'Zeta', 'seco')
+        AreaArmazem.criar('ZZZ', 'Alfa', 'seco')
+        consultas = []
+        conn = models.get_db_connection()
+        conn.set_trace_callback(consultas.append)
+        try:
+            with mock.patch.object(relatorios, 'get_db_connection', return_value=conn):
+                linhas = list(relatorios.iterar_estoque_geral())
+        finally:
+            conn.set_trace_callback(None)
+        self.assertEqual(consultas, [relatorios._SQL_ESTOQUE_GERAL])
+        ordem_areas = list(dict.fromkeys(linha['id_area'] for linha in linhas))
+        self.assertEqual(ordem_areas, [area.id_area for area in AreaArmazem.listar_todas()])
+        self.assertLess(ordem_areas.index('ZZZ'), ordem_areas.index('AAA'))
+
+    def _registrar_vendas(self):
+        # Duas vendas por horário para exercitar o desempate pelo id.
+        for minuto in range(4):
+            for destino in ('Cliente A', 'Cliente B'):
+                Venda.registrar(Venda('QUEIJO001', 'Queijo Mussarela Peça 1kg', 'LOTE2025A', '2030-01-01', 1,
+                                      destino, 'REF01', 'admin', data_hora=datetime(2025, 1, 10, 8, minuto)))
+
+    def test_listar_pagina_percorre_historico_sem_repeticoes(self):
+        self._registrar_vendas()
+        ids, cursor = [], None
+        while True:
+            pagina, cursor = Venda.listar_pagina(cursor, limite=3)
+            ids.extend(v.id_venda for v in pagina)
+            if cursor is None:
+                break
+        self.assertEqual(ids, [v.id_venda for v in Venda.listar_todas()])
+        self.assertEqual(len(ids), 8)
+
+    def test_listar_pagina_com_filtros(self):
+        self._registrar_vendas()
+        pagina, cursor = Venda.listar_pagina(limite=10, filtros={'destino': 'Cliente B', 'data_inicio': '2025-01-10'})
+        self.assertEqual(len(pagina), 4)
+        self.assertIsNone(cursor)
+        with self.assertRaises(ValueError):
+            Venda.listar_pagina(filtros={'senha': 'x'})
+
+    def test_api_vendas_paginada(self):
+        self._registrar_vendas()
+        response = self.client.get('/api/vendas?limite=5')
+        self.assertEqual(response.status_code, 200)
+        dados = response.get_json()
+        self.assertEqual(len(dados['vendas']), 5)
+        response = self.client.get('/api/vendas?limite=5&cursor=' + dados['proximo_cursor'])
+        dados = response.get_json()
+        self.assertEqual(len(dados['vendas']), 3)
+        self.assertIsNone(dados['proximo_cursor'])
+        self.assertEqual(self.client.get('/api/vendas?cursor=invalido').status_code, 400)
+
+class ResumoEstoqueTests(BancoTemporarioTestCase):
+    def _totais(self):
+        return {linha['id_catalogo_produto']: (linha['quantidade_total'], linha['lotes'])
+                for linha in relatorios.estoque_total_por_produto()}
+
+    def test_resumo_acompanha_todas_as_escritas(self):
+        ref = AreaArmazem.buscar_por_id('REF01')
+        seco = AreaArmazem.buscar_por_id('SECO01')
+        ref.adicionar_produto(ProdutoLacteo('LEITE001', 'Leite UHT Integral 1L', 10, '2030-01-01', 'LT1'))
+        ref.adicionar_produto(ProdutoLacteo('LEITE001', 'Leite UHT Integral 1L', 5, '2030-01-01', 'LT1'))
+        self.assertEqual(self._totais()['LEITE001'], (215, 2))
+
+        id_lt1 = next(p.id for p in ref.listar_produtos() if p.lote == 'LT1')
+        self.assertTrue(Venda.vender('REF01', id_lt1, 3, 'Cliente', 'admin')[0])
+        ProdutoLacteo.buscar_instancia_por_id(id_lt1).atualizar_instancia(20, '2030-02-01', 'LT1')
+        self.assertEqual(self._totais()['LEITE001'], (220, 2))
+
+        id_lote_d = next(p.id for p in seco.listar_produtos() if p.lote == 'LOTE2025D')
+        seco.remover_produto(id_lote_d, 200)
+        self.assertEqual(self._totais()['LEITE001'], (20, 1))
+        ProdutoLacteo.buscar_instancia_por_id(id_lt1).deletar_instancia()
+        self.assertNotIn('LEITE001', self._totais())
+
+        # Mudança de área feita diretamente no banco também é acompanhada.
+        conn = models.get_db_connection()
+        conn.execute("UPDATE produtos_areas SET id_area = 'SECO01', quantidade = 40 WHERE lote = 'LOTE2025A'")
+        conn.commit()
+        conn.close()
+        por_area = {(l['id_area'], l['id_catalogo_produto']): l['quantidade_total']
+                    for l in relatorios.estoque_total_por_area()}
+        self.assertEqual(por_area[('SECO01', 'QUEIJO001')], 40)
+        self.assertNotIn(('REF01', 'QUEIJO001'), por_area)
+        self.assertEqual(relatorios.verificar_resumo_estoque(), [])
+
+    def test_verificar_e_reconstruir(self):
+        conn = models.get_db_connection()
+        conn.execute("UPDATE resumo_estoque_produto SET quantidade_total = 1 WHERE id_catalogo_produto = 'QUEIJO001'")
+        conn.execute("DELETE FROM resumo_estoque_area WHERE id_area = 'SECO01'")
+        conn.commit()
+        conn.close()
+        divergencias = relatorios.verificar_resumo_estoque()
+        self.assertEqual({(d['tabela'], d['chave']) for d in divergencias},
+                         {('resumo_estoque_produto', ('QUEIJO001',)), ('resumo_estoque_area', ('SECO01', 'LEITE001'))})
+
+        runner = app.test_cli_runner()
+        resultado = runner.invoke(args=['resumo-estoque'])
+        self.assertEqual(resultado.exit_code, 1)
+        resultado = runner.invoke(args=['resumo-estoque', '--reconstruir'])
+        self.assertEqual(resultado.exit_code, 0, resultado.output)
+        self.assertEqual(relatorios.verificar_resumo_estoque(), [])
+        self.assertEqual(self._totais()['QUEIJO001'], (50, 1))
+
+class VendasDiariasTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        for dia, quantidade, destino in ((1, 2, 'Cliente A'), (1, 3, 'Cliente A'), (1, 1, 'Cliente B'),
+                                         (2, 4, 'Cliente A'), (40, 5, 'Cliente A')):
+            Venda.registrar(Venda('QUEIJO001', 'Queijo Mussarela Peça 1kg', 'LOTE2025A', '2030-01-01', quantidade,
+                                  destino, 'REF01', 'admin', data_hora=datetime(2025, 1, 1, 9) + timedelta(days=dia - 1)))
+
+    def test_consolidacao_por_dia_e_destino(self):
+        linhas = relatorios.vendas_por_periodo('2025-01-01', '2025-01-31', ('data', 'destino'))
+        self.assertEqual([tuple(l) for l in linhas], [('2025-01-01', 'Cliente A', 5, 2), ('2025-01-01', 'Cliente B', 1, 1),
+                                                      ('2025-01-02', 'Cliente A', 4, 1)])
+        por_mes = relatorios.vendas_por_periodo(agrupar_por=('mes',), filtros={'destino': 'Cliente A'})
+        self.assertEqual([tuple(l) for l in por_mes], [('2025-01', 9, 3), ('2025-02', 5, 1)])
+        total = relatorios.vendas_por_periodo(agrupar_por=())
+        self.assertEqual((total[0]['unidades'], total[0]['vendas']), (15, 5))
+        with self.assertRaises(ValueError):
+            relatorios.vendas_por_periodo(agrupar_por=('usuario_responsavel',))
+
+    def test_vendas_pela_baixa_de_estoque_entram_na_consolidacao(self):
+        id_instancia = next(p.id for p in AreaArmazem.buscar_por_id('SECO01').listar_produtos())
+        self.assertTrue(Venda.vender('SECO01', id_instancia, 7, 'Cliente C', 'admin')[0])
+        linhas = relatorios.vendas_por_periodo(date.today().isoformat(), date.today().isoformat(),
+                                               ('id_catalogo_produto', 'area_origem_id'))
+        self.assertEqual([tuple(l) for l in linhas], [('LEITE001', 'SECO01', 7, 1)])
+
+    def test_correcao_de_venda_move_a_consolidacao(self):
+        conn = models.get_db_connection()
+        try:
+            # Uma das duas vendas de 2025-01-01 para o Cliente A passa para o Cliente B, com outra quantidade.
+            conn.execute("UPDATE vendas SET destino = 'Cliente B', quantidade_vendida = 6 "
+                         "WHERE destino = 'Cliente A' AND quantidade_vendida = 3")
+            # A única venda de 2025-01-02 muda de dia: a linha antiga some.
+            conn.execute("UPDATE vendas SET data_hora = '2025-01-03 10:00:00' WHERE data_hora LIKE '2025-01-02%'")
+            conn.commit()
+        finally:
+            conn.close()
+        linhas = relatorios.vendas_por_periodo('2025-01-01', '2025-01-31', ('data', 'destino'))
+        self.assertEqual([tuple(l) for l in linhas], [('2025-01-01', 'Cliente A', 2, 1), ('2025-01-01', 'Cliente B', 7, 2),
+                                                      ('2025-01-03', 'Cliente A', 4, 1)])
+        self.assertEqual(relatorios.verificar_vendas_diarias(), [])
+
+    def test_backfill(self):
+        self.assertEqual(relatorios.verificar_vendas_diarias(), [])
+        conn = models.get_db_connection()
+        conn.execute('DELETE FROM vendas_diarias')
+        conn.commit()
+        conn.close()
+        divergencias = relatorios.verificar_vendas_diarias('2025-01-01', '2025-01-01')
+        self.assertEqual([(d['chave'][3], d['esperado'], d['atual']) for d in divergencias],
+                         [('Cliente A', (5, 2), None), ('Cliente B', (1, 1), None)])
+        self.assertEqual(relatorios.reconstruir_vendas_diarias('2025-01-01', '2025-01-01'), 2)
+        self.assertEqual(relatorios.verificar_vendas_diarias('2025-01-01', '2025-01-01'), [])
+        self.assertEqual(len(relatorios.vendas_por_periodo()), 1)
+        resultado = app.test_cli_runner().invoke(args=['vendas-diarias'])
+        self.assertEqual(resultado.exit_code, 0, resultado.output)
+        self.assertEqual(relatorios.vendas_por_periodo(agrupar_por=())[0]['unidades'], 15)
+
+    def test_api_vendas_diarias(self):
+        response = self.client.get('/api/vendas/diarias?data_inicio=2025-01-02&agrupar=data')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), [{'data': '2025-01-02', 'unidades': 4, 'vendas': 1},
+                                               {'data': '2025-02-09', 'unidades': 5, 'vendas': 1}])
+        self.assertEqual(self.client.get('/api/vendas/diarias?agrupar=senha').status_code, 400)
+        self.assertEqual(self.client.get('/api/vendas/diarias?data_inicio=ontem').status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
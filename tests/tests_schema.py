@@ -0,0 +1,124 @@
+# laticinios_armazem/tests/tests_schema.py
+
+import unittest
+import os
+import sqlite3
+
+from base_testes import BancoTemporarioTestCase, DiretorioTemporarioTestCase
+import esquema
+import models
+
+class IndicesTests(BancoTemporarioTestCase):
+    """Garante que as consultas mais frequentes usam índices em vez de varrer a tabela."""
+
+    popular_dados = False
+
+    CONSULTAS_QUENTES = {
+        'listar_produtos_da_area': (
+            'SELECT id, id_catalogo_produto, nome, quantidade, data_validade, lote FROM produtos_areas '
+            'WHERE id_area = ? ORDER BY data_validade ASC', ('REF01',)),
+        'contar_produto_em_areas': (
+            'SELECT COUNT(*) FROM produtos_areas WHERE id_catalogo_produto = ?', ('QUEIJO001',)),
+        'contar_produto_em_vendas': (
+            'SELECT COUNT(*) FROM vendas WHERE id_catalogo_produto = ?', ('QUEIJO001',)),
+        'alertas_validade': (
+            'SELECT id, quantidade FROM produtos_areas WHERE data_validade <= ?', ('2025-01-01',)),
+        'listar_vendas': (
+            'SELECT * FROM vendas ORDER BY data_hora DESC', ()),
+        'alocacao_fefo': (
+            'SELECT pa.id, pa.id_area, pa.quantidade FROM produtos_areas pa '
+            'JOIN areas_armazem a ON a.id_area = pa.id_area AND a.tipo_armazenamento = ? '
+            'WHERE pa.id_catalogo_produto = ? AND pa.quantidade > 0 AND pa.data_validade >= ? '
+            'ORDER BY pa.data_validade ASC, pa.id ASC', ('refrigerado', 'QUEIJO001', '2025-01-01')),
+        'pagina_vendas': (
+            'SELECT * FROM vendas WHERE data_hora <= ? AND (data_hora < ? OR id < ?) '
+            'ORDER BY data_hora DESC, id DESC LIMIT ?', ('2025-01-01 00:00:00', '2025-01-01 00:00:00', 10, 51)),
+        'vendas_por_lote': (
+            'SELECT * FROM vendas WHERE lote = ?', ('LOTE2025A',)),
+        'vendas_diarias_do_produto': (
+            'SELECT data, SUM(unidades) FROM vendas_diarias WHERE id_catalogo_produto = ? AND data >= ? '
+            'GROUP BY data ORDER BY data', ('QUEIJO001', '2025-01-01')),
+    }
+
+    def _plano(self, sql, params):
+        conn = models.get_db_connection()
+        try:
+            return [row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+        finally:
+            conn.close()
+
+    def test_consultas_quentes_usam_indice(self):
+        for nome, (sql, params) in self.CONSULTAS_QUENTES.items():
+            with self.subTest(consulta=nome):
+                plano = self._plano(sql, params)
+                self.assertTrue(any('USING' in passo and 'INDEX' in passo for passo in plano),
+                                f"{nome} não usa índice: {plano}")
+                self.assertFalse(any(passo.startswith('SCAN') and 'INDEX' not in passo for passo in plano),
+                                 f"{nome} faz varredura completa: {plano}")
+                self.assertFalse(any('TEMP B-TREE' in passo for passo in plano),
+                                 f"{nome} ordena em memória: {plano}")
+
+class MigracoesTests(DiretorioTemporarioTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db_path = os.path.join(self.tmpdir.name, 'teste.db')
+        self.conn = sqlite3.connect(self.db_path)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _criar_migracoes(self, arquivos):
+        diretorio = os.path.join(self.tmpdir.name, 'migracoes')
+        os.makedirs(diretorio)
+        for nome, conteudo in arquivos.items():
+            with open(os.path.join(diretorio, nome), 'w', encoding='utf-8') as f:
+                f.write(conteudo)
+        return diretorio
+
+    def test_banco_novo_recebe_todas_as_migracoes(self):
+        ultima = esquema.listar_migracoes()[-1][0]
+        aplicadas = esquema.aplicar_migracoes(self.conn)
+        self.assertEqual(aplicadas[-1], ultima)
+        self.assertEqual(esquema.versao_atual(self.conn), ultima)
+        self.assertEqual(esquema.aplicar_migracoes(self.conn), [])
+
+    def test_banco_legado_sem_versao_e_atualizado(self):
+        # Banco criado pelo antigo schema.sql: tabelas existem, user_version = 0.
+        with open(esquema.listar_migracoes()[0][1], encoding='utf-8') as f:
+            self.conn.executescript(f.read())
+        self.conn.execute("INSERT INTO areas_armazem VALUES ('A1', 'Área 1', 'seco')")
+        self.conn.commit()
+        esquema.aplicar_migracoes(self.conn)
+        indices = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertIn('idx_vendas_data_hora', indices)
+        self.assertEqual(self.conn.execute('SELECT COUNT(*) FROM areas_armazem').fetchone()[0], 1)
+
+    def test_migracao_com_erro_e_desfeita(self):
+        diretorio = self._criar_migracoes({
+            '0001_tabela.sql': 'CREATE TABLE a (x INTEGER);',
+            '0002_quebrada.sql': 'CREATE TABLE b (x INTEGER);\nINSERT INTO tabela_inexistente VALUES (1);',
+        })
+        with self.assertRaises(sqlite3.OperationalError):
+            esquema.aplicar_migracoes(self.conn, diretorio)
+        self.assertEqual(esquema.versao_atual(self.conn), 1)
+        tabelas = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertIn('a', tabelas)
+        self.assertNotIn('b', tabelas)
+
+    def test_migracao_com_trigger(self):
+        diretorio = self._criar_migracoes({
+            '0001_trigger.sql': (
+                'CREATE TABLE a (x INTEGER);\n'
+                'CREATE TABLE log (x INTEGER);\n'
+                '-- Copia cada inserção para log\n'
+                'CREATE TRIGGER trg AFTER INSERT ON a BEGIN\n'
+                '    INSERT INTO log VALUES (NEW.x);\n'
+                'END;\n'
+            ),
+        })
+        self.assertEqual(esquema.aplicar_migracoes(self.conn, diretorio), [1])
+        self.conn.execute('INSERT INTO a VALUES (7)')
+        self.assertEqual(self.conn.execute('SELECT x FROM log').fetchone()[0], 7)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+# laticinios_armazem/tests/tests_vendas.py
+
+import unittest
+import threading
+from datetime import date, timedelta
+
+from base_testes import AppTestCase, BancoTemporarioTestCase
+from models import AreaArmazem, ProdutoLacteo, Venda
+
+class VendaAtomicaTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.area = AreaArmazem.buscar_por_id('REF01')
+        self.area.adicionar_produto(ProdutoLacteo('LEITE001', 'Leite UHT Integral 1L', 10, '2030-01-01', 'LT01'))
+        self.id_instancia = next(p.id for p in self.area.listar_produtos() if p.lote == 'LT01')
+
+    def _quantidade(self):
+        instancia = ProdutoLacteo.buscar_instancia_por_id(self.id_instancia)
+        return instancia.quantidade if instancia else None
+
+    def test_vender_decrementa_e_registra(self):
+        sucesso, mensagem = Venda.vender('REF01', self.id_instancia, 3, 'Cliente X', 'admin')
+        self.assertTrue(sucesso, mensagem)
+        self.assertEqual(self._quantidade(), 7)
+        vendas = Venda.listar_todas()
+        self.assertEqual(len(vendas), 1)
+        self.assertEqual(vendas[0].quantidade_vendida, 3)
+        self.assertEqual(vendas[0].lote, 'LT01')
+
+    def test_vender_tudo_remove_instancia(self):
+        sucesso, _ = Venda.vender('REF01', self.id_instancia, 10, 'Cliente X', 'admin')
+        self.assertTrue(sucesso)
+        self.assertIsNone(self._quantidade())
+
+    def test_quantidade_insuficiente_nao_altera_nada(self):
+        sucesso, mensagem = Venda.vender('REF01', self.id_instancia, 11, 'Cliente X', 'admin')
+        self.assertFalse(sucesso)
+        self.assertIn('Quantidade insuficiente', mensagem)
+        self.assertEqual(self._quantidade(), 10)
+        self.assertEqual(Venda.listar_todas(), [])
+
+    def test_instancia_de_outra_area(self):
+        sucesso, mensagem = Venda.vender('SECO01', self.id_instancia, 1, 'Cliente X', 'admin')
+        self.assertFalse(sucesso)
+        self.assertIn('não pertence', mensagem)
+        self.assertEqual(self._quantidade(), 10)
+
+    def test_vendas_concorrentes_nao_vendem_acima_do_estoque(self):
+        resultados = []
+
+        def vender():
+            resultados.append(Venda.vender('REF01', self.id_instancia, 1, 'Cliente X', 'admin')[0])
+
+        threads = [threading.Thread(target=vender) for _ in range(25)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(resultados.count(True), 10)
+        self.assertIsNone(self._quantidade())
+        self.assertEqual(sum(v.quantidade_vendida for v in Venda.listar_todas()), 10)
+
+    def test_rota_vender_produto(self):
+        response = self.client.post('/armazem/REF01/vender_produto', data={
+            'id_instancia_venda': str(self.id_instancia),
+            'quantidade_venda': '4',
+            'destino_venda': 'Cliente Rota'
+        }, follow_redirects=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Venda de 4 unidade(s) de &#39;Leite UHT Integral 1L&#39; (Lote: LT01) registrada com sucesso!".encode(),
+                      response.data)
+        self.assertEqual(self._quantidade(), 6)
+
+    def test_buscar_instancia_na_area(self):
+        self.assertEqual(ProdutoLacteo.buscar_instancia_na_area('REF01', self.id_instancia).lote, 'LT01')
+        self.assertIsNone(ProdutoLacteo.buscar_instancia_na_area('SECO01', self.id_instancia))
+
+    def test_rota_excluir_instancia_de_outra_area(self):
+        response = self.client.post(f'/admin/area/SECO01/produto/{self.id_instancia}/excluir', follow_redirects=True)
+        self.assertIn('não pertence à área'.encode(), response.data)
+        self.assertEqual(self._quantidade(), 10)
+        self.client.post(f'/admin/area/REF01/produto/{self.id_instancia}/excluir')
+        self.assertIsNone(self._quantidade())
+
+class VendaLoteTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.instancias = {}
+        for area in AreaArmazem.listar_todas():
+            for produto in area.listar_produtos():
+                self.instancias[produto.lote] = produto
+
+    def test_lote_com_varias_areas(self):
+        response = self.client.post('/api/vendas/lote', json={
+            'destino': 'Caminhão 12',
+            'itens': [
+                {'id_instancia': self.instancias['LOTE2025A'].id, 'quantidade': 10},
+                {'id_instancia': self.instancias['LOTE2025D'].id, 'quantidade': 20, 'id_area': 'SECO01'},
+                {'id_instancia': self.instancias['LOTE2025A'].id, 'quantidade': 40},
+            ]
+        })
+        self.assertEqual(response.status_code, 200)
+        dados = response.get_json()
+        self.assertTrue(dados['sucesso'])
+        self.assertTrue(all(r['sucesso'] for r in dados['resultados']))
+        self.assertIsNone(ProdutoLacteo.buscar_instancia_por_id(self.instancias['LOTE2025A'].id))
+        self.assertEqual(ProdutoLacteo.buscar_instancia_por_id(self.instancias['LOTE2025D'].id).quantidade, 180)
+        vendas = Venda.listar_todas()
+        self.assertEqual(len(vendas), 3)
+        self.assertEqual({v.area_origem_id for v in vendas}, {'REF01', 'SECO01'})
+
+    def test_lote_com_erro_nao_grava_nada(self):
+        sucesso, resultados = Venda.vender_lote([
+            {'id_instancia': self.instancias['LOTE2025B'].id, 'quantidade': 5},
+            {'id_instancia': self.instancias['LOTE2025C'].id, 'quantidade': 71},
+            {'id_instancia': 999999, 'quantidade': 1},
+        ], 'Caminhão 7', 'admin')
+        self.assertFalse(sucesso)
+        self.assertEqual([r['sucesso'] for r in resultados], [False, False, False])
+        self.assertIn('Quantidade insuficiente', resultados[1]['mensagem'])
+        self.assertIn('não encontrado', resultados[2]['mensagem'])
+        self.assertEqual(ProdutoLacteo.buscar_instancia_por_id(self.instancias['LOTE2025B'].id).quantidade, 100)
+        self.assertEqual(Venda.listar_todas(), [])
+
+    def test_lote_invalido(self):
+        self.assertEqual(self.client.post('/api/vendas/lote', json={'destino': 'X', 'itens': []}).status_code, 400)
+        self.assertEqual(self.client.post('/api/vendas/lote', json={'itens': [{'id_instancia': 1, 'quantidade': 1}]}).status_code, 400)
+
+class VendaFefoTests(BancoTemporarioTestCase):
+    def setUp(self):
+        super().setUp()
+        # QUEIJO001 já tem 50 unidades em REF01 com validade em 30 dias (LOTE2025A).
+        hoje = date.today()
+        AreaArmazem.buscar_por_id('SECO01').adicionar_produto(ProdutoLacteo(
+            'QUEIJO001', 'Queijo Mussarela Peça 1kg', 5, (hoje + timedelta(days=2)).strftime('%Y-%m-%d'), 'Q-SECO'))
+        AreaArmazem.buscar_por_id('REF01').adicionar_produto(ProdutoLacteo(
+            'QUEIJO001', 'Queijo Mussarela Peça 1kg', 8, (hoje + timedelta(days=5)).strftime('%Y-%m-%d'), 'Q-REF'))
+        AreaArmazem.buscar_por_id('REF01').adicionar_produto(ProdutoLacteo(
+            'QUEIJO001', 'Queijo Mussarela Peça 1kg', 3, (hoje - timedelta(days=1)).strftime('%Y-%m-%d'), 'Q-VENCIDO'))
+
+    def _estoque(self):
+        return {p.lote: p.quantidade for area in AreaArmazem.listar_todas() for p in area.listar_produtos()
+                if p.id_catalogo_produto == 'QUEIJO001'}
+
+    def test_consome_lotes_pela_validade_em_todas_as_areas(self):
+        sucesso, mensagem, vendas = Venda.vender_fefo('QUEIJO001', 20, 'Cliente FEFO', 'admin')
+        self.assertTrue(sucesso, mensagem)
+        self.assertEqual([(v.lote, v.quantidade_vendida) for v in vendas],
+                         [('Q-SECO', 5), ('Q-REF', 8), ('LOTE2025A', 7)])
+        self.assertEqual(self._estoque(), {'LOTE2025A': 43, 'Q-VENCIDO': 3})
+        self.assertEqual(len(Venda.listar_todas()), 3)
+
+    def test_filtra_por_tipo_de_armazenamento(self):
+        sucesso, _, vendas = Venda.vender_fefo('QUEIJO001', 10, 'Cliente FEFO', 'admin', tipo_armazenamento='refrigerado')
+        self.assertTrue(sucesso)
+        self.assertEqual([(v.lote, v.quantidade_vendida) for v in vendas], [('Q-REF', 8), ('LOTE2025A', 2)])
+
+    def test_estoque_insuficiente_nao_altera_nada(self):
+        sucesso, mensagem, vendas = Venda.vender_fefo('QUEIJO001', 6, 'Cliente FEFO', 'admin', id_area='SECO01')
+        self.assertFalse(sucesso)
+        self.assertIn('Disponível: 5', mensagem)
+        self.assertEqual(vendas, [])
+        self.assertEqual(self._estoque()['Q-SECO'], 5)
+        self.assertEqual(Venda.listar_todas(), [])
+
+if __name__ == '__main__':
+    unittest.main()